@@ -0,0 +1,89 @@
+"""
+Memory benchmark for PEACE_COM world entities.
+
+Builds a large procedurally named sector and reports the bytes allocated per
+character and per place, including a few turns of update history.
+
+Usage: python bench_memory.py [num_characters] [num_places] [turns]
+"""
+
+import random
+import sys
+import tracemalloc
+
+from models import Character, Place
+
+ROLES = ["smuggler", "enforcer", "netrunner", "ore miner", "bartender", "medic"]
+PLACE_TYPES = ["tavern", "market", "tunnel", "server room", "dock", "shrine"]
+ITEMS = ["crowbar", "datachip", "plasma cutter", "moonshine", "keycard", "lamp"]
+UPDATES = [
+    "Keeps watch by the door.",
+    "Haggles over a crate of ore.",
+    "Slips into the crowd.",
+    "Repairs a flickering neon sign.",
+]
+
+
+def build_characters(count: int, places: list[str], turns: int) -> list[Character]:
+    rng = random.Random(7)
+    characters = []
+    for i in range(count):
+        character = Character(
+            name=f"NPC-{i}",
+            role=rng.choice(ROLES),
+            location=rng.choice(places),
+            inventory=rng.sample(ITEMS, 2),
+            initial_state=rng.choice(UPDATES),
+        )
+        for turn in range(turns):
+            character.updates.append(turn * 30, rng.choice(UPDATES))
+        characters.append(character)
+    return characters
+
+
+def build_places(count: int, turns: int) -> list[Place]:
+    rng = random.Random(11)
+    places = []
+    for i in range(count):
+        place = Place(
+            name=f"Sector 7-{i}",
+            type=rng.choice(PLACE_TYPES),
+            inventory=rng.sample(ITEMS, 2),
+            initial_state=rng.choice(UPDATES),
+        )
+        for turn in range(turns):
+            place.updates.append(turn * 30, rng.choice(UPDATES))
+        places.append(place)
+    return places
+
+
+def measure(build, count: int) -> float:
+    """Return the bytes allocated per entity by a builder."""
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    entities = build()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del entities
+    return allocated / count
+
+
+def main():
+    num_characters = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    num_places = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    turns = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+
+    place_names = [f"Sector 7-{i}" for i in range(num_places)]
+    per_character = measure(
+        lambda: build_characters(num_characters, place_names, turns), num_characters
+    )
+    per_place = measure(lambda: build_places(num_places, turns), num_places)
+
+    print(f"Characters: {num_characters:>7}  {per_character:8.0f} bytes/entity")
+    print(f"Places:     {num_places:>7}  {per_place:8.0f} bytes/entity")
+    print(f"(each with {turns} updates of history)")
+
+
+if __name__ == "__main__":
+    main()
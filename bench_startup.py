@@ -0,0 +1,63 @@
+"""
+Startup benchmark for PEACE_COM.
+
+Times `import main` in fresh interpreters, which is everything that runs
+before the title screen, and checks that litellm is not among it. Exits
+non-zero if the median exceeds --max-seconds, so CI can guard cold starts.
+
+Usage: python bench_startup.py [--runs N] [--max-seconds S]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+PROBE = """
+import sys, time
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start, "litellm" in sys.modules)
+"""
+
+
+def time_import(module: str) -> tuple[float, bool]:
+    """Seconds to import module in a fresh interpreter, and whether litellm loaded."""
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE.format(module=module)],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    seconds, loaded = result.stdout.split()
+    return float(seconds), loaded == "True"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-seconds", type=float, default=None)
+    args = parser.parse_args()
+
+    samples = [time_import("main") for _ in range(args.runs)]
+    median = statistics.median(seconds for seconds, _ in samples)
+    litellm_loaded = any(loaded for _, loaded in samples)
+    deferred = statistics.median(time_import("litellm")[0] for _ in range(args.runs))
+
+    print(f"import main:    {median * 1000:7.0f} ms (median of {args.runs})")
+    print(f"import litellm: {deferred * 1000:7.0f} ms (now loaded in the background)")
+
+    failed = False
+    if litellm_loaded:
+        print("FAIL: importing main pulled in litellm")
+        failed = True
+    if args.max_seconds is not None and median > args.max_seconds:
+        print(f"FAIL: startup exceeds {args.max_seconds * 1000:.0f} ms")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,111 @@ Configuration constants for PEACE_COM.
 
 # LLM Settings
 MODEL = "anthropic/claude-sonnet-4-20250514"
+FAST_MODEL = "anthropic/claude-3-5-haiku-20241022"  # used when a turn runs late
+
+LLM_TIMEOUT_SECONDS = 60.0  # deadline for each attempt at a call
+LLM_MAX_RETRIES = 3  # retries for transient provider errors and malformed JSON
+LLM_BACKOFF_BASE_SECONDS = 0.5
+LLM_BACKOFF_MAX_SECONDS = 8.0
+LLM_HEDGING = False  # send a duplicate request when a call runs past its p95
+LLM_HEDGE_PERCENTILE = 0.95
+LLM_HEDGE_MIN_SAMPLES = 20  # latency samples needed before hedging a call site
+
+# Pre-warmed before the first call. None uses the base URL litellm resolves
+# for MODEL, which honors litellm.api_base and ANTHROPIC_BASE_URL
+LLM_ENDPOINT = None
+LLM_PREWARM_CONNECTIONS = 4
+
+# LLM Scheduler Settings
+LLM_INITIAL_CONCURRENCY = 8
+LLM_MAX_CONCURRENCY = 64
+LLM_FOREGROUND_RESERVE = 2  # slots background calls may never take
+LLM_LATENCY_TARGET_SECONDS = 15.0  # slower calls shrink the concurrency limit
+# Call sites not listed here are treated as foreground
+LLM_CALL_SITE_PRIORITIES = {
+    "feasibility": "foreground",
+    "adjudication": "foreground",
+    "time_estimate": "foreground",
+    "opening": "foreground",
+    "narration": "foreground",
+    "character_simulation": "background",
+    "place_simulation": "background",
+    "arc_resolution": "background",
+    "world_generation": "background",
+    "prefetch": "background",
+}
 
 # Game Settings
 QUIT_COMMANDS = ("quit", "exit", "q")
+UNDO_COMMANDS = ("undo",)
+STATS_COMMANDS = ("/stats",)
+DEV_OUTPUT = True  # print [DEV] dumps and progress notes
+COMBINED_ADJUDICATION = False  # one LLM call for feasibility, time, and arc checks
+
+# Narrative Arc Settings
+ARC_RELEVANCE_THRESHOLD = 0.5  # minimum local score before an arc is sent to the LLM
+
+# Context Settings
+CONTEXT_TOKEN_BUDGET = 1500  # approximate tokens of world detail per prompt
+RECENT_UPDATES_SHOWN = 1  # current state is a field; older updates via retrieval
+HISTORY_RESULTS = 5  # past events retrieved for the current action
+# Past exchanges narration sees verbatim (between this and twice this); older
+# ones reach it as retrieved past events. None sends the whole history
+NARRATION_HISTORY_EXCHANGES = 4
+DEGRADED_CONTEXT_TOKEN_BUDGET = 600  # used when a turn is running late
+
+# Prefetch Settings
+PREFETCH = False  # speculate on the next turn while the player types
+PREFETCH_ACTIONS = ("look around",)  # always guessed, before world-specific ones
+PREFETCH_MAX_ACTIONS = 3  # likely actions prefetched per idle period
+PREFETCH_TTL_SECONDS = 300.0  # unused results are dropped after this
+PREFETCH_MAX_ENTRIES = 256
+PREFETCH_WAIT_SECONDS = 0.25  # longest a turn waits on an unfinished prefetch
+
+# Save Settings
+SAVE_PATH = "savegame.json"
+AUTOSAVE_EVERY_TURNS = 5  # 0 disables autosave
+
+# World Generation Settings
+WORLD_GENERATION_MODES = ("llm", "hybrid", "offline")
+# "llm" generates everything, "hybrid" uses the LLM only for the situation and
+# arcs, and "offline" builds the whole world from procgen.py's tables
+WORLD_GENERATION_MODE = "llm"
+PROCGEN_PLACES = 3  # places in a procedurally generated world, 1 to 8
+PROCGEN_CHARACTERS = 3
+
+# World Pool Settings
+USE_WORLD_POOL = False  # claim pre-generated worlds made by pool.py
+WORLD_POOL_DIR = "world_pool"
+WORLD_POOL_TARGET = 3  # worlds to keep ready
+WORLD_POOL_MAX_AGE_HOURS = 72  # older worlds are discarded as stale
+WORLD_POOL_MAX_SIMILARITY = 0.5  # reject worlds too close to pooled ones
+
+# Journal Settings
+JOURNAL_PATH = "session_journal.jsonl"
+JOURNAL_FSYNC = "turn"  # "always", "turn", or "never"
+
+# Server Settings
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 7777
+SERVER_MAX_SESSIONS = 32  # concurrent players per process
+SERVER_WORKERS = 16  # threads shared by all sessions for LLM calls
+SERVER_JOURNAL_DIR = "journals"
+
+# Latency Settings
+TURN_LATENCY_BUDGET_SECONDS = 30.0  # target time from action to narration
+NARRATION_MIN_SECONDS = 5.0  # narration always gets at least this long
+
+# Tracing Settings
+TRACE_PATH = "trace.json"  # Chrome trace of the session, written on exit
+TRACE_MAX_SPANS = 20000  # oldest spans are dropped past this
+
+# Usage Settings
+SESSION_TOKEN_BUDGET = None  # max tokens per session; None for no limit
+SESSION_COST_BUDGET_USD = None  # max spend per session; None for no limit
+
+# Metrics Settings
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = None  # serve Prometheus metrics on this port, e.g. 9464
+METRICS_PATH = None  # or write them to this file periodically
+METRICS_WRITE_INTERVAL_SECONDS = 15.0
@@ -0,0 +1,180 @@
+"""
+World context assembly for PEACE_COM prompts.
+
+Entities are ranked by how relevant they are to the player right now and
+added to the context in rank order until the token budget is spent. Whatever
+does not fit is summarized in aggregate.
+"""
+
+from collections import Counter
+
+from config import CONTEXT_TOKEN_BUDGET, RECENT_UPDATES_SHOWN, HISTORY_RESULTS
+from models import Character, Place, GameWorld, format_clock
+from relevance import tokenize
+
+# Relevance weights for ranking entities
+SAME_LOCATION_WEIGHT = 6.0
+ADJACENT_WEIGHT = 3.0
+MENTIONED_WEIGHT = 4.0
+ARC_WEIGHT = 2.0
+RECENCY_WEIGHT = 1.0
+
+
+def estimate_tokens(text: str) -> int:
+    """Roughly estimate the token count of a piece of text."""
+    return len(text) // 4 + 1
+
+
+def build_character_summary(character: Character) -> str:
+    """Build a summary string for a character including updates."""
+    base = f"- {character.name} ({character.role}) @ {character.location} [has: {', '.join(character.inventory) or 'nothing'}]: {character.current_state}"
+    if character.updates:
+        updates_str = "\n    ".join(character.updates.recent(RECENT_UPDATES_SHOWN))
+        base += f"\n    RECENT: {updates_str}"
+    return base
+
+
+def build_place_summary(place: Place) -> str:
+    """Build a summary string for a place including updates."""
+    base = f"- {place.name} ({place.type}) [contains: {', '.join(place.inventory) or 'nothing'}]: {place.current_state}"
+    if place.updates:
+        updates_str = "\n    ".join(place.updates.recent(RECENT_UPDATES_SHOWN))
+        base += f"\n    RECENT: {updates_str}"
+    return base
+
+
+def score_entity(
+    world: GameWorld,
+    entity: Character | Place,
+    place_name: str,
+    nearby: set[str],
+    action_tokens: set[str],
+    arcs_text: str,
+) -> float:
+    """Score how relevant a character or place is to the player right now."""
+    score = 0.0
+    if place_name == world.player.location:
+        score += SAME_LOCATION_WEIGHT
+    elif place_name in nearby:
+        score += ADJACENT_WEIGHT
+    name_tokens = set(tokenize(entity.name))
+    if action_tokens and name_tokens:
+        matched = len(action_tokens & name_tokens) / len(name_tokens)
+        score += MENTIONED_WEIGHT * matched
+    if entity.name.lower() in arcs_text:
+        score += ARC_WEIGHT
+    if entity.updates:
+        hours_since = (world.clock - entity.updates.offsets[-1]) / 60
+        score += RECENCY_WEIGHT / (1 + hours_since)
+    return score
+
+
+def rank_entities(
+    world: GameWorld, player_action: str = ""
+) -> list[tuple[float, Character | Place]]:
+    """Rank every character and place by relevance, most relevant first."""
+    here = world.get_place(world.player.location)
+    nearby = set(here.adjacent) if here else set()
+    action_tokens = set(tokenize(player_action))
+    arcs_text = " ".join(
+        f"{arc.name} {arc.problem} {arc.resolution_criteria}"
+        for arc in world.narrative_arcs
+        if not arc.resolved
+    ).lower()
+
+    ranked = []
+    for character in world.characters:
+        score = score_entity(
+            world, character, character.location, nearby, action_tokens, arcs_text
+        )
+        ranked.append((score, character))
+    for place in world.places:
+        score = score_entity(
+            world, place, place.name, nearby, action_tokens, arcs_text
+        )
+        ranked.append((score, place))
+    # Stable sort keeps creation order among equally relevant entities
+    ranked.sort(key=lambda pair: pair[0], reverse=True)
+    return ranked
+
+
+def summarize_omitted(label: str, kinds: list[str]) -> str:
+    """Summarize entities that did not fit in the budget, e.g. '12 more characters'."""
+    counts = Counter(kinds).most_common(5)
+    breakdown = ", ".join(f"{count} {kind}" for kind, count in counts)
+    return f"- ...and {len(kinds)} more {label} ({breakdown})"
+
+
+def build_past_events(world: GameWorld, player_action: str) -> str:
+    """Retrieve the past events most relevant to the player's action."""
+    if not player_action:
+        return ""
+    entries = world.history.search(player_action, k=HISTORY_RESULTS)
+    return "\n".join(f"- [{format_clock(e.clock)}] {e.text}" for e in entries)
+
+
+def build_world_context(
+    world: GameWorld, player_action: str = "", token_budget: int | None = None
+) -> str:
+    """Build a context string from the world state for the system prompt.
+
+    Characters and places are included in relevance order until the token
+    budget runs out; the rest are summarized by role or type.
+    """
+    if token_budget is None:
+        token_budget = CONTEXT_TOKEN_BUDGET
+
+    header = f"""
+CURRENT SITUATION:
+{world.situation}
+
+PLAYER CHARACTER:
+Name: {world.player.name}
+Skill: {world.player.skill}
+Fatal Flaw: {world.player.fatal_flaw}
+Location: {world.player.location}
+Inventory: {', '.join(world.player.inventory) or 'nothing'}
+"""
+    remaining = token_budget - estimate_tokens(header)
+
+    character_lines, place_lines = [], []
+    omitted_roles, omitted_types = [], []
+    for _, entity in rank_entities(world, player_action):
+        if isinstance(entity, Character):
+            summary = build_character_summary(entity)
+        else:
+            summary = build_place_summary(entity)
+        cost = estimate_tokens(summary)
+        if cost <= remaining:
+            remaining -= cost
+            if isinstance(entity, Character):
+                character_lines.append(summary)
+            else:
+                place_lines.append(summary)
+        elif isinstance(entity, Character):
+            omitted_roles.append(entity.role)
+        else:
+            omitted_types.append(entity.type)
+
+    if omitted_roles:
+        character_lines.append(summarize_omitted("characters", omitted_roles))
+    if omitted_types:
+        place_lines.append(summarize_omitted("locations", omitted_types))
+
+    characters_summary = "\n".join(character_lines)
+    places_summary = "\n".join(place_lines)
+
+    context = f"""{header}
+KEY CHARACTERS:
+{characters_summary}
+
+NOTABLE LOCATIONS:
+{places_summary}
+"""
+    past_events = build_past_events(world, player_action)
+    if past_events:
+        context += f"""
+RELEVANT PAST EVENTS:
+{past_events}
+"""
+    return context
@@ -2,9 +2,38 @@
 Core game logic for PEACE_COM.
 """
 
-import json
-
-from config import QUIT_COMMANDS
+import re
+import time
+import weakref
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Callable
+
+from config import (
+    QUIT_COMMANDS,
+    UNDO_COMMANDS,
+    STATS_COMMANDS,
+    COMBINED_ADJUDICATION,
+    ARC_RELEVANCE_THRESHOLD,
+    SAVE_PATH,
+    AUTOSAVE_EVERY_TURNS,
+    USE_WORLD_POOL,
+    JOURNAL_PATH,
+    DEV_OUTPUT,
+    MODEL,
+    FAST_MODEL,
+    DEGRADED_CONTEXT_TOKEN_BUDGET,
+    NARRATION_HISTORY_EXCHANGES,
+    NARRATION_MIN_SECONDS,
+    TRACE_PATH,
+    WORLD_GENERATION_MODE,
+    WORLD_GENERATION_MODES,
+    PROCGEN_PLACES,
+    PROCGEN_CHARACTERS,
+    PREFETCH,
+    PREFETCH_MAX_ACTIONS,
+)
 from prompts import (
     SYSTEM_PROMPT,
     SITUATION_PROMPT,
@@ -18,8 +47,41 @@ from prompts import (
     PLACE_SIMULATION_PROMPT,
     NARRATIVE_ARCS_PROMPT,
     ARC_RESOLUTION_PROMPT,
+    ADJUDICATION_PROMPT,
+)
+from llm import (
+    get_response,
+    get_structured_response,
+    listening,
+    warm_up,
+    LLMTimeoutError,
+)
+from slo import (
+    COMBINED_TURN_STAGES,
+    TURN_STAGES,
+    TurnBudget,
+    DEFER_ARCS,
+    NEARBY_SIMULATION,
+    SMALL_CONTEXT,
+    FAST_NARRATION,
+)
+from tracing import (
+    Tracer,
+    tracing,
+    span,
+    current_span,
+    waterfall,
+    write_chrome_trace,
 )
-from llm import get_response, get_structured_response
+from usage import UsageLedger, accounting, BudgetExceededError
+from metrics import registry
+from context import build_world_context
+from persistence import save_session, load_session
+from world_pool import WorldPool, trigger_refill
+from journal import Journal
+from timeline import Timeline
+from procgen import ProceduralGenerator
+from prefetch import Prefetcher, prefetch_cache, likely_actions, normalize_action
 from models import Character, Place, PlayerCharacter, GameWorld, NarrativeArc
 from schemas import (
     WorldEntitiesResponse,
@@ -27,6 +89,11 @@ from schemas import (
     FeasibilityResponse,
     NarrativeArcsResponse,
     ArcResolutionResponse,
+    ArcResolutionSchema,
+    AdjudicationResponse,
+    CharacterDeltaSchema,
+    DiceRollSchema,
+    PlaceDeltaSchema,
 )
 from ui import (
     print_title,
@@ -37,215 +104,561 @@ from ui import (
 )
 
 
+_dev_output = DEV_OUTPUT
+
+
+def set_dev_output(enabled: bool) -> None:
+    """Turn development and progress output on or off (e.g. for the server)."""
+    global _dev_output
+    _dev_output = enabled
+
+
 def print_dev(label: str, content: str):
     """Print development/debug information."""
+    if not _dev_output:
+        return
     print(f"\n[DEV] {label}")
     print("-" * 40)
     print(content)
     print("-" * 40)
 
 
-def initialize_world() -> GameWorld:
-    """Initialize the game world through the 5-step LLM flow."""
+def print_status(message: str):
+    """Print a progress note such as '[Simulating world...]'."""
+    if _dev_output:
+        print(f"\n[{message}]")
 
-    # Step 1: Generate the situation
-    print("\n[Generating situation...]")
-    situation_messages = [{"role": "user", "content": SITUATION_PROMPT}]
-    situation = get_response(situation_messages)
-    print_dev("SITUATION", situation)
 
-    # Step 2: Generate characters and places
-    print("\n[Generating characters and places...]")
-    entities_prompt = WORLD_ENTITIES_PROMPT.format(situation=situation)
-    entities_messages = [{"role": "user", "content": entities_prompt}]
-    entities_data = get_structured_response(entities_messages, WorldEntitiesResponse)
-
-    places = [
-        Place(name=p.name, type=p.type, inventory=list(p.inventory))
-        for p in entities_data.places
-    ]
-    characters = [
-        Character(
-            name=c.name,
-            role=c.role,
-            location=c.location,
-            inventory=list(c.inventory),
+def initialize_world(mode: str | None = None) -> GameWorld:
+    """Initialize the game world through the 5-step flow.
+
+    mode is one of WORLD_GENERATION_MODES, defaulting to WORLD_GENERATION_MODE:
+    "llm" generates everything with the LLM, "hybrid" uses it only for the
+    situation and the arcs, and "offline" makes no LLM calls at all.
+    """
+    mode = mode or WORLD_GENERATION_MODE
+    if mode not in WORLD_GENERATION_MODES:
+        raise ValueError(
+            f"Unknown world generation mode {mode!r}; "
+            f"expected one of {', '.join(WORLD_GENERATION_MODES)}"
         )
-        for c in entities_data.characters
-    ]
+    generator = ProceduralGenerator() if mode != "llm" else None
 
-    print_dev(
-        "PLACES",
-        "\n".join(
-            f"- {p.name} ({p.type}) [items: {', '.join(p.inventory) or 'none'}]"
-            for p in places
-        ),
-    )
-    print_dev(
-        "CHARACTERS",
-        "\n".join(
-            f"- {c.name} ({c.role}) @ {c.location} [items: {', '.join(c.inventory) or 'none'}]"
-            for c in characters
-        ),
-    )
+    # Connections and schemas get ready while the situation is generated
+    if mode != "offline":
+        warm_up()
 
-    # Step 3: Get initial states for each entity
-    print("\n[Generating initial states...]")
-    for character in characters:
-        state_prompt = ENTITY_STATE_PROMPT.format(
-            situation=situation,
-            entity_type="CHARACTER",
-            name=character.name,
-            role_or_type=character.role,
+    # Step 1: Generate the situation
+    with span("situation"):
+        print_status("Generating situation...")
+        if mode == "offline":
+            situation = generator.situation()
+        else:
+            situation_messages = [{"role": "user", "content": SITUATION_PROMPT}]
+            situation = get_response(situation_messages, call_site="world_generation")
+        print_dev("SITUATION", situation)
+
+    # Step 2: Generate characters and places
+    with span("world_entities"):
+        print_status("Generating characters and places...")
+        if generator:
+            entities_data = generator.entities(PROCGEN_PLACES, PROCGEN_CHARACTERS)
+        else:
+            entities_prompt = WORLD_ENTITIES_PROMPT.format(situation=situation)
+            entities_messages = [{"role": "user", "content": entities_prompt}]
+            entities_data = get_structured_response(
+                entities_messages, WorldEntitiesResponse, call_site="world_generation"
+            )
+
+        places = [
+            Place(name=p.name, type=p.type, inventory=list(p.inventory))
+            for p in entities_data.places
+        ]
+        characters = [
+            Character(
+                name=c.name,
+                role=c.role,
+                location=c.location,
+                inventory=list(c.inventory),
+            )
+            for c in entities_data.characters
+        ]
+        if generator:
+            adjacency = generator.adjacency([p.name for p in places])
+            for place in places:
+                place.adjacent = adjacency[place.name]
+
+        print_dev(
+            "PLACES",
+            "\n".join(
+                f"- {p.name} ({p.type}) [items: {', '.join(p.inventory) or 'none'}]"
+                for p in places
+            ),
         )
-        state_messages = [{"role": "user", "content": state_prompt}]
-        character.initial_state = get_response(state_messages)
-        print_dev(f"STATE: {character.name}", character.initial_state)
-
-    for place in places:
-        state_prompt = ENTITY_STATE_PROMPT.format(
-            situation=situation,
-            entity_type="PLACE",
-            name=place.name,
-            role_or_type=place.type,
+        print_dev(
+            "CHARACTERS",
+            "\n".join(
+                f"- {c.name} ({c.role}) @ {c.location} [items: {', '.join(c.inventory) or 'none'}]"
+                for c in characters
+            ),
         )
-        state_messages = [{"role": "user", "content": state_prompt}]
-        place.initial_state = get_response(state_messages)
-        print_dev(f"STATE: {place.name}", place.initial_state)
 
-    # Step 4: Generate player character
-    print("\n[Generating player character...]")
-    places_list = "\n".join(f"- {p.name}" for p in places)
-    pc_prompt = PLAYER_CHARACTER_PROMPT.format(
-        situation=situation,
-        places_list=places_list,
-    )
-    pc_messages = [{"role": "user", "content": pc_prompt}]
-    pc_data = get_structured_response(pc_messages, PlayerCharacterResponse)
-
-    player = PlayerCharacter(
-        name=pc_data.name,
-        skill=pc_data.skill,
-        fatal_flaw=pc_data.fatal_flaw,
-        location=pc_data.location,
-        inventory=list(pc_data.inventory),
-    )
-    print_dev(
-        "PLAYER CHARACTER",
-        f"Name: {player.name}\n"
-        f"Skill: {player.skill}\n"
-        f"Fatal Flaw: {player.fatal_flaw}\n"
-        f"Location: {player.location}\n"
-        f"Inventory: {', '.join(player.inventory) or 'none'}",
-    )
+    # Step 3: Get initial states for each entity
+    with span("initial_states"):
+        print_status("Generating initial states...")
+        for character in characters:
+            if generator:
+                character.initial_state = generator.character_state(
+                    character.name, character.role, character.location
+                )
+            else:
+                state_prompt = ENTITY_STATE_PROMPT.format(
+                    situation=situation,
+                    entity_type="CHARACTER",
+                    name=character.name,
+                    role_or_type=character.role,
+                )
+                state_messages = [{"role": "user", "content": state_prompt}]
+                character.initial_state = get_response(
+                    state_messages, call_site="world_generation"
+                )
+            print_dev(f"STATE: {character.name}", character.initial_state)
+
+        for place in places:
+            if generator:
+                place.initial_state = generator.place_state(place.type)
+            else:
+                state_prompt = ENTITY_STATE_PROMPT.format(
+                    situation=situation,
+                    entity_type="PLACE",
+                    name=place.name,
+                    role_or_type=place.type,
+                )
+                state_messages = [{"role": "user", "content": state_prompt}]
+                place.initial_state = get_response(
+                    state_messages, call_site="world_generation"
+                )
+            print_dev(f"STATE: {place.name}", place.initial_state)
 
-    # Step 5: Generate narrative arcs
-    print("\n[Generating narrative arcs...]")
-    arcs_prompt = NARRATIVE_ARCS_PROMPT.format(
-        situation=situation,
-        player_name=player.name,
-        player_skill=player.skill,
-        player_flaw=player.fatal_flaw,
-    )
-    arcs_messages = [{"role": "user", "content": arcs_prompt}]
-    arcs_data = get_structured_response(arcs_messages, NarrativeArcsResponse)
-
-    narrative_arcs = [
-        NarrativeArc(
-            name=arc.name,
-            problem=arc.problem,
-            stakes=arc.stakes,
-            resolution_criteria=arc.resolution_criteria,
-            possible_resolutions=list(arc.possible_resolutions),
+    # Step 4: Generate player character
+    with span("player_character"):
+        print_status("Generating player character...")
+        if generator:
+            pc_data = generator.player(
+                [p.name for p in places], {c.name for c in characters}
+            )
+        else:
+            places_list = "\n".join(f"- {p.name}" for p in places)
+            pc_prompt = PLAYER_CHARACTER_PROMPT.format(
+                situation=situation,
+                places_list=places_list,
+            )
+            pc_messages = [{"role": "user", "content": pc_prompt}]
+            pc_data = get_structured_response(
+                pc_messages, PlayerCharacterResponse, call_site="world_generation"
+            )
+
+        player = PlayerCharacter(
+            name=pc_data.name,
+            skill=pc_data.skill,
+            fatal_flaw=pc_data.fatal_flaw,
+            location=pc_data.location,
+            inventory=list(pc_data.inventory),
         )
-        for arc in arcs_data.arcs
-    ]
-
-    for arc in narrative_arcs:
         print_dev(
-            f"NARRATIVE ARC: {arc.name}",
-            f"Problem: {arc.problem}\n"
-            f"Stakes: {arc.stakes}\n"
-            f"Resolution: {arc.resolution_criteria}\n"
-            f"Ideas: {', '.join(arc.possible_resolutions)}",
+            "PLAYER CHARACTER",
+            f"Name: {player.name}\n"
+            f"Skill: {player.skill}\n"
+            f"Fatal Flaw: {player.fatal_flaw}\n"
+            f"Location: {player.location}\n"
+            f"Inventory: {', '.join(player.inventory) or 'none'}",
         )
 
+    # Step 5: Generate narrative arcs
+    with span("narrative_arcs"):
+        print_status("Generating narrative arcs...")
+        if mode == "offline":
+            arcs_data = generator.arcs(
+                player.name,
+                [p.name for p in places],
+                [c.name for c in characters],
+            )
+        else:
+            arcs_prompt = NARRATIVE_ARCS_PROMPT.format(
+                situation=situation,
+                player_name=player.name,
+                player_skill=player.skill,
+                player_flaw=player.fatal_flaw,
+            )
+            arcs_messages = [{"role": "user", "content": arcs_prompt}]
+            arcs_data = get_structured_response(
+                arcs_messages, NarrativeArcsResponse, call_site="world_generation"
+            )
+
+        narrative_arcs = [
+            NarrativeArc(
+                name=arc.name,
+                problem=arc.problem,
+                stakes=arc.stakes,
+                resolution_criteria=arc.resolution_criteria,
+                possible_resolutions=list(arc.possible_resolutions),
+            )
+            for arc in arcs_data.arcs
+        ]
+
+        for arc in narrative_arcs:
+            print_dev(
+                f"NARRATIVE ARC: {arc.name}",
+                f"Problem: {arc.problem}\n"
+                f"Stakes: {arc.stakes}\n"
+                f"Resolution: {arc.resolution_criteria}\n"
+                f"Ideas: {', '.join(arc.possible_resolutions)}",
+            )
+
     # Create the world object
     world = GameWorld(
         situation=situation,
         characters=characters,
         places=places,
-        narrative_arcs=narrative_arcs,
         player=player,
     )
+    for arc in narrative_arcs:
+        world.add_arc(arc)
 
     return world
 
 
-def check_feasibility(world: GameWorld, player_action: str) -> FeasibilityResponse:
-    """Check if the player's action is feasible and get initial outcome."""
-    world_context = build_world_context(world)
+def feasibility_messages(
+    world: GameWorld, player_action: str, token_budget: int | None = None
+) -> list[dict]:
+    world_context = build_world_context(world, player_action, token_budget)
     prompt = FEASIBILITY_PROMPT.format(
         world_context=world_context,
         player_action=player_action,
         fatal_flaw=world.player.fatal_flaw,
     )
-    messages = [{"role": "user", "content": prompt}]
-    return get_structured_response(messages, FeasibilityResponse)
+    return [{"role": "user", "content": prompt}]
 
 
-def estimate_time(player_action: str) -> str:
-    """Ask the LLM how long the player's action will take."""
-    prompt = TIME_ESTIMATE_PROMPT.format(player_action=player_action)
-    messages = [{"role": "user", "content": prompt}]
-    return get_response(messages).strip()
+def check_feasibility(
+    world: GameWorld,
+    player_action: str,
+    token_budget: int | None = None,
+    timeout: float | None = None,
+) -> FeasibilityResponse:
+    """Check if the player's action is feasible and get initial outcome."""
+    prefetched = prefetch_cache.take(
+        ("feasibility", world.version, normalize_action(player_action))
+    )
+    if prefetched is not None:
+        return prefetched
+    return get_structured_response(
+        feasibility_messages(world, player_action, token_budget),
+        FeasibilityResponse,
+        call_site="feasibility",
+        timeout=timeout,
+    )
 
 
-def simulate_time_passage(world: GameWorld, time_elapsed: str) -> None:
-    """Simulate what each character and place does during the time period."""
-    print_dev("TIME ELAPSED", time_elapsed)
+def adjudication_messages(
+    world: GameWorld, player_action: str, token_budget: int | None = None
+) -> list[dict]:
+    world_context = build_world_context(world, player_action, token_budget)
+    prompt = ADJUDICATION_PROMPT.format(
+        world_context=world_context,
+        arcs_summary=build_arcs_summary(world),
+        player_action=player_action,
+        fatal_flaw=world.player.fatal_flaw,
+    )
+    return [{"role": "user", "content": prompt}]
+
+
+def adjudicate_action(
+    world: GameWorld,
+    player_action: str,
+    token_budget: int | None = None,
+    timeout: float | None = None,
+) -> AdjudicationResponse:
+    """Check feasibility, duration, and arc resolution in a single LLM call."""
+    prefetched = prefetch_cache.take(
+        ("adjudication", world.version, normalize_action(player_action))
+    )
+    if prefetched is not None:
+        return prefetched
+    return get_structured_response(
+        adjudication_messages(world, player_action, token_budget),
+        AdjudicationResponse,
+        call_site="adjudication",
+        timeout=timeout,
+    )
 
-    # Simulate each character
-    for character in world.characters:
-        current_state = character.initial_state
-        if character.updates:
-            current_state = character.updates[-1]
-
-        prompt = CHARACTER_SIMULATION_PROMPT.format(
-            situation=world.situation,
-            name=character.name,
-            role=character.role,
-            location=character.location,
-            current_state=current_state,
-            time_elapsed=time_elapsed,
-        )
-        messages = [{"role": "user", "content": prompt}]
-        update = get_response(messages).strip()
-        character.updates.append(f"[{time_elapsed}] {update}")
-        print_dev(f"CHARACTER UPDATE: {character.name}", update)
-
-    # Simulate each place
-    for place in world.places:
-        current_state = place.initial_state
-        if place.updates:
-            current_state = place.updates[-1]
-
-        prompt = PLACE_SIMULATION_PROMPT.format(
-            situation=world.situation,
-            name=place.name,
-            type=place.type,
-            current_state=current_state,
-            time_elapsed=time_elapsed,
+
+def assumed_adjudication(player_action: str) -> AdjudicationResponse:
+    """What a turn goes on with when adjudication runs out of time.
+
+    The action simply happens, with no roll, flaw, or resolved arcs, and
+    narration describes it from there.
+    """
+    return AdjudicationResponse(
+        feasible=True,
+        flaw_triggered=False,
+        dice_roll=DiceRollSchema(needed=False),
+        initial_outcome=f"You {player_action}.",
+        duration_minutes=DEFAULT_DURATION_MINUTES,
+        resolutions=[],
+    )
+
+
+def format_duration(minutes: int) -> str:
+    """Format a duration in minutes the way TIME_ESTIMATE_PROMPT answers look."""
+    minutes = max(int(minutes), 1)
+    for unit, size in (("day", 1440), ("hour", 60)):
+        if minutes >= size and minutes % size == 0:
+            count = minutes // size
+            return f"{count} {unit}{'s' if count != 1 else ''}"
+    if minutes >= 60:
+        hours, rest = divmod(minutes, 60)
+        return (
+            f"{hours} hour{'s' if hours != 1 else ''} "
+            f"{rest} minute{'s' if rest != 1 else ''}"
         )
-        messages = [{"role": "user", "content": prompt}]
-        update = get_response(messages).strip()
-        place.updates.append(f"[{time_elapsed}] {update}")
-        print_dev(f"PLACE UPDATE: {place.name}", update)
+    return f"{minutes} minute{'s' if minutes != 1 else ''}"
+
+
+# Minutes per unit, keyed by singular unit name or abbreviation
+DURATION_UNITS = {
+    "second": 0,
+    "sec": 0,
+    "minute": 1,
+    "min": 1,
+    "hour": 60,
+    "hr": 60,
+    "day": 1440,
+    "week": 10080,
+}
+# An amount ("2", "1.5", "an", "one", "half an", "a half") then a unit,
+# optionally followed by "and a half". Words need whole-word matches, so the
+# "a" of "about" is not an amount
+DURATION_PATTERN = re.compile(
+    r"\b(?:(?:an?\s+)?(half)\s+(?:an?\s+)?|(\d+(?:\.\d+)?)\s*|(?:an?|one)\s+)"
+    r"([a-z]+)\b(\s+and\s+a\s+half\b)?"
+)
+
+# How long an action takes when there's no usable estimate
+DEFAULT_DURATION_MINUTES = 5
+
 
+def parse_duration(text: str) -> int:
+    """Parse a free-form time estimate like '2 hours' into whole minutes.
+
+    Unrecognized text counts as a short action (DEFAULT_DURATION_MINUTES).
+    """
+    total = 0.0
+    matched = False
+    for half, amount, unit, and_half in DURATION_PATTERN.findall(text.lower()):
+        unit = unit.rstrip("s") or unit
+        if unit not in DURATION_UNITS:
+            continue
+        count = 0.5 if half else float(amount or 1)
+        if and_half:
+            count += 0.5
+        total += count * DURATION_UNITS[unit]
+        matched = True
+    if not matched:
+        return DEFAULT_DURATION_MINUTES
+    return max(round(total), 1)
 
-def build_arcs_summary(world: GameWorld) -> str:
+
+def estimate_time(player_action: str, timeout: float | None = None) -> str:
+    """Ask the LLM how long the player's action will take."""
+    # The estimate depends on nothing but the action, so no world version
+    prefetched = prefetch_cache.take(
+        ("time_estimate", None, normalize_action(player_action))
+    )
+    if prefetched is not None:
+        return prefetched
+    prompt = TIME_ESTIMATE_PROMPT.format(player_action=player_action)
+    messages = [{"role": "user", "content": prompt}]
+    return get_response(messages, call_site="time_estimate", timeout=timeout).strip()
+
+
+def people_at(world: GameWorld, place_name: str, exclude: str = "") -> list[str]:
+    """Names of the characters, and the player, at a place."""
+    names = [c.name for c in world.characters_at(place_name) if c.name != exclude]
+    if world.player.location == place_name and world.player.name != exclude:
+        names.append(world.player.name)
+    return names
+
+
+def destinations(world: GameWorld, place_name: str) -> list[str]:
+    """Places a character can move to: the connected ones, or any if unmapped."""
+    place = world.get_place(place_name)
+    if place and place.adjacent:
+        return list(place.adjacent)
+    return [p.name for p in world.places if p.name != place_name]
+
+
+def apply_character_delta(
+    world: GameWorld, character: Character, delta: CharacterDeltaSchema
+) -> list[str]:
+    """Apply a character's simulated changes to the world. Returns what changed.
+
+    Items change hands only with the place the character is in or someone in
+    it, and moves only go to one of destinations(). Anything else the LLM
+    reports, like an item the giver doesn't have, is dropped.
+    """
+    changes = []
+    here = character.location
+    in_reach = {here, *people_at(world, here, character.name)}
+    for transfer in delta.items_given:
+        if transfer.other in in_reach and world.transfer_item(
+            transfer.item, character.name, transfer.other
+        ):
+            changes.append(f"gave {transfer.item} to {transfer.other}")
+    for transfer in delta.items_taken:
+        if transfer.other in in_reach and world.transfer_item(
+            transfer.item, transfer.other, character.name
+        ):
+            changes.append(f"took {transfer.item} from {transfer.other}")
+    if delta.moved_to in destinations(world, here):
+        world.move_character(character, delta.moved_to)
+        changes.append(f"moved to {delta.moved_to}")
+    character.state = delta.new_state.strip()
+    world.touch()
+    return changes
+
+
+def apply_place_delta(
+    world: GameWorld, place: Place, delta: PlaceDeltaSchema
+) -> list[str]:
+    """Apply a place's simulated changes to the world. Returns what changed."""
+    changes = []
+    for item in delta.items_removed:
+        if world.remove_item(place.name, item):
+            changes.append(f"lost {item}")
+    for item in delta.items_added:
+        world.add_item(place.name, item)
+        changes.append(f"gained {item}")
+    place.state = delta.new_state.strip()
+    world.touch()
+    return changes
+
+
+def describe_delta(text: str, changes: list[str]) -> str:
+    """An update log entry: the prose, plus the changes that were applied."""
+    text = text.strip()
+    if changes:
+        text += f" ({'; '.join(changes)})"
+    return text
+
+
+def time_left(deadline: float | None) -> float | None:
+    """Seconds until a time.monotonic() deadline, or None if there isn't one."""
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def simulate_time_passage(
+    world: GameWorld,
+    time_elapsed: str,
+    nearby_only: bool = False,
+    timeout: float | None = None,
+) -> dict[str, str]:
+    """Simulate what each character and place does during the time period.
+
+    With nearby_only, only the player's place, the places next to it, and the
+    characters in them are simulated. Each entity's structured delta is
+    applied to the world as it arrives. If timeout runs out, the entities not
+    reached yet stay as they are this turn. Returns the new update for each
+    simulated entity, keyed by name.
+    """
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    print_dev("TIME ELAPSED", time_elapsed)
+    world.clock += parse_duration(time_elapsed)
+    updates = {}
+
+    characters, places = world.characters, world.places
+    if nearby_only:
+        here = world.get_place(world.player.location)
+        nearby = [world.player.location, *(here.adjacent if here else [])]
+        places = [world.get_place(name) for name in nearby if world.get_place(name)]
+        characters = [c for name in nearby for c in world.characters_at(name)]
+
+    try:
+        # Simulate each character
+        for character in characters:
+            place = world.get_place(character.location)
+            people = people_at(world, character.location, character.name)
+            items_here = place.inventory if place else []
+            exits = destinations(world, character.location)
+            prompt = CHARACTER_SIMULATION_PROMPT.format(
+                situation=world.situation,
+                name=character.name,
+                role=character.role,
+                location=character.location,
+                inventory=", ".join(character.inventory) or "nothing",
+                current_state=character.current_state,
+                people_here=", ".join(people) or "nobody",
+                items_here=", ".join(items_here) or "nothing",
+                destinations=", ".join(exits) or "none",
+                time_elapsed=time_elapsed,
+            )
+            messages = [{"role": "user", "content": prompt}]
+            delta = get_structured_response(
+                messages,
+                CharacterDeltaSchema,
+                call_site="character_simulation",
+                timeout=time_left(deadline),
+            )
+            update = describe_delta(
+                delta.action, apply_character_delta(world, character, delta)
+            )
+            character.updates.append(world.clock, update)
+            updates[character.name] = update
+            world.history.add("update", f"{character.name}: {update}", world.clock)
+            print_dev(f"CHARACTER UPDATE: {character.name}", update)
+
+        # Simulate each place
+        for place in places:
+            prompt = PLACE_SIMULATION_PROMPT.format(
+                situation=world.situation,
+                name=place.name,
+                type=place.type,
+                inventory=", ".join(place.inventory) or "nothing",
+                people_here=", ".join(people_at(world, place.name)) or "nobody",
+                current_state=place.current_state,
+                time_elapsed=time_elapsed,
+            )
+            messages = [{"role": "user", "content": prompt}]
+            delta = get_structured_response(
+                messages,
+                PlaceDeltaSchema,
+                call_site="place_simulation",
+                timeout=time_left(deadline),
+            )
+            update = describe_delta(delta.event, apply_place_delta(world, place, delta))
+            place.updates.append(world.clock, update)
+            updates[place.name] = update
+            world.history.add("update", f"{place.name}: {update}", world.clock)
+            print_dev(f"PLACE UPDATE: {place.name}", update)
+    except LLMTimeoutError:
+        skipped = len(characters) + len(places) - len(updates)
+        print_dev("SIMULATION CUT SHORT", f"{skipped} entities not simulated")
+        active = current_span()
+        if active is not None:
+            active.attrs["skipped"] = skipped
+
+    world.touch()
+
+    return updates
+
+
+def build_arcs_summary(
+    world: GameWorld, arcs: list[NarrativeArc] | None = None
+) -> str:
     """Build a summary of active (unresolved) narrative arcs."""
-    active_arcs = [arc for arc in world.narrative_arcs if not arc.resolved]
+    if arcs is None:
+        arcs = world.narrative_arcs
+    active_arcs = [arc for arc in arcs if not arc.resolved]
     if not active_arcs:
         return "No active narrative arcs."
     
@@ -261,15 +674,30 @@ def build_arcs_summary(world: GameWorld) -> str:
 
 
 def check_arc_resolution(
-    world: GameWorld, player_action: str, outcome: str
+    world: GameWorld,
+    player_action: str,
+    outcome: str,
+    token_budget: int | None = None,
+    timeout: float | None = None,
 ) -> list[NarrativeArc]:
     """Check if any narrative arcs have been resolved by the player's action."""
     active_arcs = [arc for arc in world.narrative_arcs if not arc.resolved]
     if not active_arcs:
         return []
 
-    world_context = build_world_context(world)
-    arcs_summary = build_arcs_summary(world)
+    # Only ask the LLM about arcs the action plausibly touches
+    candidate_arcs = world.arc_index.candidates(
+        active_arcs, f"{player_action}\n{outcome}", ARC_RELEVANCE_THRESHOLD
+    )
+    print_dev(
+        "ARC CANDIDATES",
+        ", ".join(arc.name for arc in candidate_arcs) or "none (skipping check)",
+    )
+    if not candidate_arcs:
+        return []
+
+    world_context = build_world_context(world, player_action, token_budget)
+    arcs_summary = build_arcs_summary(world, candidate_arcs)
 
     prompt = ARC_RESOLUTION_PROMPT.format(
         world_context=world_context,
@@ -278,70 +706,46 @@ def check_arc_resolution(
         arcs_summary=arcs_summary,
     )
     messages = [{"role": "user", "content": prompt}]
-    resolution_data = get_structured_response(messages, ArcResolutionResponse)
-
-    resolved_arcs = []
-    for resolution in resolution_data.resolutions:
-        if resolution.resolved:
-            # Find and update the matching arc
-            for arc in world.narrative_arcs:
-                if arc.name == resolution.arc_name and not arc.resolved:
-                    arc.resolved = True
-                    arc.resolution_outcome = resolution.resolution_outcome or ""
-                    resolved_arcs.append(arc)
-                    print_dev(
-                        f"ARC RESOLVED: {arc.name}",
-                        arc.resolution_outcome,
-                    )
-                    break
-
-    return resolved_arcs
-
-
-def build_character_summary(character: Character) -> str:
-    """Build a summary string for a character including updates."""
-    base = f"- {character.name} ({character.role}) @ {character.location} [has: {', '.join(character.inventory) or 'nothing'}]: {character.initial_state}"
-    if character.updates:
-        updates_str = "\n    ".join(character.updates)
-        base += f"\n    RECENT: {updates_str}"
-    return base
-
-
-def build_place_summary(place: Place) -> str:
-    """Build a summary string for a place including updates."""
-    base = f"- {place.name} ({place.type}) [contains: {', '.join(place.inventory) or 'nothing'}]: {place.initial_state}"
-    if place.updates:
-        updates_str = "\n    ".join(place.updates)
-        base += f"\n    RECENT: {updates_str}"
-    return base
-
-
-def build_world_context(world: GameWorld) -> str:
-    """Build a context string from the world state for the system prompt."""
-    characters_summary = "\n".join(
-        build_character_summary(c) for c in world.characters
+    resolution_data = get_structured_response(
+        messages, ArcResolutionResponse, call_site="arc_resolution", timeout=timeout
     )
-    places_summary = "\n".join(
-        build_place_summary(p) for p in world.places
+
+    return apply_arc_resolutions(
+        world, resolution_data.resolutions, candidate_arcs
     )
 
-    return f"""
-CURRENT SITUATION:
-{world.situation}
 
-PLAYER CHARACTER:
-Name: {world.player.name}
-Skill: {world.player.skill}
-Fatal Flaw: {world.player.fatal_flaw}
-Location: {world.player.location}
-Inventory: {', '.join(world.player.inventory) or 'nothing'}
+def apply_arc_resolutions(
+    world: GameWorld,
+    resolutions: list[ArcResolutionSchema],
+    arcs: list[NarrativeArc],
+) -> list[NarrativeArc]:
+    """Mark the arcs the LLM reported as resolved and return them.
 
-KEY CHARACTERS:
-{characters_summary}
+    Only arcs in `arcs` (the ones the LLM was asked about) can be resolved.
+    """
+    checked = {arc.name for arc in arcs}
+    resolved_arcs = []
+    for resolution in resolutions:
+        if not resolution.resolved or resolution.arc_name not in checked:
+            continue
+        arc = world.get_arc(resolution.arc_name)
+        if arc is None or arc.resolved:
+            continue
+        arc.resolved = True
+        arc.resolution_outcome = resolution.resolution_outcome or ""
+        resolved_arcs.append(arc)
+        world.history.add(
+            "arc", f"{arc.name} resolved: {arc.resolution_outcome}", world.clock
+        )
+        print_dev(
+            f"ARC RESOLVED: {arc.name}",
+            arc.resolution_outcome,
+        )
+    if resolved_arcs:
+        world.touch()
 
-NOTABLE LOCATIONS:
-{places_summary}
-"""
+    return resolved_arcs
 
 
 def create_session(world: GameWorld) -> list[dict]:
@@ -351,15 +755,46 @@ def create_session(world: GameWorld) -> list[dict]:
     return [{"role": "system", "content": full_system_prompt}]
 
 
-def refresh_session(messages: list[dict], world: GameWorld) -> None:
+def refresh_session(
+    messages: list[dict],
+    world: GameWorld,
+    player_action: str = "",
+    token_budget: int | None = None,
+) -> None:
     """Refresh the system message with updated world state."""
-    world_context = build_world_context(world)
+    world_context = build_world_context(world, player_action, token_budget)
     full_system_prompt = SYSTEM_PROMPT + "\n\n" + world_context
     messages[0] = {"role": "system", "content": full_system_prompt}
 
 
-def generate_opening(world: GameWorld) -> str:
+def narration_messages(messages: list[dict], exchanges: int | None) -> list[dict]:
+    """The messages sent for narration: the system prompt and opening, then
+    a window of the most recent exchanges ending with the current one.
+
+    The window drops the oldest `exchanges` exchanges at a time rather than
+    one per turn, so the prompt keeps the same prefix for several turns in a
+    row. Older narration reaches the model through RELEVANT PAST EVENTS.
+    """
+    starts = [
+        i for i, m in enumerate(messages) if i >= 2 and m["role"] == "user"
+    ]
+    if not exchanges or not starts:
+        return messages
+    dropped = max(0, ((len(starts) - 1) // exchanges - 1) * exchanges)
+    return messages[:2] + messages[starts[dropped] :]
+
+
+def generate_opening(world: GameWorld, mode: str | None = None) -> str:
     """Generate the opening message for the player."""
+    if (mode or WORLD_GENERATION_MODE) == "offline":
+        place = world.get_place(world.player.location)
+        return ProceduralGenerator().opening(
+            world.situation,
+            world.player.name,
+            world.player.location,
+            place.type if place else "",
+        )
+
     characters_summary = "\n".join(
         f"- {c.name} ({c.role}) @ {c.location} [has: {', '.join(c.inventory) or 'nothing'}]: {c.initial_state}"
         for c in world.characters
@@ -381,71 +816,388 @@ def generate_opening(world: GameWorld) -> str:
     )
 
     messages = [{"role": "user", "content": opening_prompt}]
-    return get_response(messages)
+    return get_response(messages, call_site="opening")
 
 
-def run_game():
-    """Run the main game loop."""
-    print_title()
+def start_session(world: GameWorld, mode: str | None = None) -> list[dict]:
+    """Create a session for a new world, ending with its opening message."""
+    messages = create_session(world)
+    opening = generate_opening(world, mode)
+    messages.append({"role": "assistant", "content": opening})
+    world.history.add("message", opening, world.clock)
+    return messages
+
+
+@dataclass(eq=False)
+class GameSession:
+    """One player's game: the world, message history, and turn bookkeeping."""
+
+    world: GameWorld
+    messages: list[dict]
+    turn: int = 0
+    journal_path: str | None = JOURNAL_PATH
+    save_path: str | None = SAVE_PATH
+    # (action, outcome) pairs whose arc check was deferred by the latency budget
+    deferred_arc_checks: list[tuple[str, str]] = field(default_factory=list)
+    trace_path: str | None = TRACE_PATH
+    tracer: Tracer = field(default_factory=Tracer, repr=False)
+    usage: UsageLedger = field(default_factory=UsageLedger, repr=False)
+    timeline: Timeline = field(init=False, repr=False)
+    journal: Journal | None = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.timeline = Timeline(self.world, self.messages)
+        self.journal = Journal(self.journal_path) if self.journal_path else None
+
+    @property
+    def last_narration(self) -> str:
+        """The most recent thing the Game Master said."""
+        return next(
+            (m["content"] for m in reversed(self.messages) if m["role"] == "assistant"),
+            "",
+        )
 
-    # Initialize the world
-    world = initialize_world()
+    def record(self, event: str, **data) -> None:
+        """Write an event to the session journal, if there is one."""
+        if self.journal:
+            self.journal.record(event, **data)
 
-    # Create session with world context
-    messages = create_session(world)
+    def close(self) -> None:
+        """Flush and close the session journal and write the session trace."""
+        _live_sessions.discard(self)
+        self.record("session_usage", **self.usage.session.to_dict())
+        if self.journal:
+            self.journal.close()
+        if self.trace_path:
+            write_chrome_trace(self.trace_path, self.tracer.snapshot())
 
-    # Step 5: Generate and show opening message
-    print("\n[Generating opening scene...]")
-    print_separator()
-    opening = generate_opening(world)
-    messages.append({"role": "assistant", "content": opening})
-    print_response(opening)
 
-    # Main game loop
-    while True:
-        print_separator()
+# Sessions that have been opened and not yet closed, for the metrics gauges
+_live_sessions: "weakref.WeakSet[GameSession]" = weakref.WeakSet()
 
-        user_input = get_input()
+stage_seconds = registry.histogram(
+    "peace_com_stage_seconds",
+    "Time spent in each turn stage, whole turns, and world generation.",
+    ("stage",),
+)
+registry.callback(
+    "peace_com_active_sessions",
+    "Open game sessions.",
+    "gauge",
+    lambda: {(): len(_live_sessions)},
+)
+registry.callback(
+    "peace_com_history_entries",
+    "Retrievable history entries across open sessions.",
+    "gauge",
+    lambda: {(): sum(len(s.world.history) for s in list(_live_sessions))},
+)
+registry.callback(
+    "peace_com_world_entities",
+    "Characters, places, and narrative arcs across open sessions.",
+    "gauge",
+    lambda: {
+        (kind,): sum(len(getattr(s.world, kind)) for s in list(_live_sessions))
+        for kind in ("characters", "places", "narrative_arcs")
+    },
+    ("kind",),
+)
 
-        if not user_input:
-            continue
 
-        if user_input.lower() in QUIT_COMMANDS:
-            print_goodbye()
-            break
-
-        messages.append({"role": "user", "content": user_input})
-
-        # Step 1: Check feasibility and get initial outcome
-        print("\n[Checking feasibility...]")
-        feasibility = check_feasibility(world, user_input)
-        print_dev("FEASIBILITY CHECK", 
-            f"Feasible: {feasibility.feasible}\n"
-            f"Interruption: {feasibility.immediate_interruption}\n"
-            f"Flaw triggered: {feasibility.flaw_triggered} ({feasibility.flaw_effect})\n"
-            f"Dice: {feasibility.dice_roll}\n"
-            f"Initial outcome: {feasibility.initial_outcome}"
+def _load_or_generate(resume_path: str | None) -> tuple[GameWorld, list[dict], int]:
+    """The world, messages, and turn a new session starts from."""
+    turn = 0
+    if resume_path:
+        # Resume skips world generation and the opening scene entirely
+        print_status(f"Resuming session from {resume_path}...")
+        world, messages, turn = load_session(resume_path)
+    else:
+        claimed = WorldPool().claim() if USE_WORLD_POOL else None
+        if claimed:
+            world, messages = claimed
+            print_status("Claimed a pre-generated world")
+            trigger_refill()
+        else:
+            # Initialize the world
+            started = time.monotonic()
+            with span("initialize_world"):
+                world = initialize_world()
+            stage_seconds.observe(time.monotonic() - started, stage="initialize_world")
+
+            # Create session with world context and opening message
+            print_status("Generating opening scene...")
+            with span("opening"):
+                messages = start_session(world)
+    return world, messages, turn
+
+
+def open_session(
+    resume_path: str | None = None,
+    journal_path: str | None = JOURNAL_PATH,
+    save_path: str | None = SAVE_PATH,
+    trace_path: str | None = TRACE_PATH,
+) -> GameSession:
+    """Resume a saved session, claim a pooled world, or generate a new one."""
+    tracer, usage = Tracer(), UsageLedger()
+    with tracing(tracer), accounting(usage):
+        world, messages, turn = _load_or_generate(resume_path)
+
+    session = GameSession(
+        world,
+        messages,
+        turn,
+        journal_path=journal_path,
+        save_path=save_path,
+        trace_path=trace_path,
+        tracer=tracer,
+        usage=usage,
+    )
+    session.record("session_start", resumed=bool(resume_path), turn=turn)
+    _live_sessions.add(session)
+    return session
+
+
+def undo_turn(session: GameSession) -> str | None:
+    """Roll the session back one turn. Returns the narration to show, or None."""
+    restored = session.timeline.undo()
+    if restored is None:
+        return None
+    session.world, session.messages = restored
+    # Arc checks deferred by the undone turn must not see its action
+    session.deferred_arc_checks = list(session.timeline.head.extra or ())
+    session.turn -= 1
+    session.record("undo", turn=session.turn)
+    return session.last_narration
+
+
+def start_prefetch(session: GameSession) -> Prefetcher | None:
+    """Start speculating on the session's next turn, unless it's out of budget.
+
+    For each likely action this prefetches the feasibility check (or the
+    combined adjudication) and the time estimate. Simulation isn't
+    prefetched, since it depends on how long the action turns out to take.
+    """
+    try:
+        session.usage.check()
+    except BudgetExceededError:
+        return None
+    world = session.world
+    if COMBINED_ADJUDICATION:
+        kind, messages_for, schema = (
+            "adjudication", adjudication_messages, AdjudicationResponse
+        )
+    else:
+        kind, messages_for, schema = (
+            "feasibility", feasibility_messages, FeasibilityResponse
         )
 
-        # Show initial outcome to player immediately
-        print_response(feasibility.initial_outcome)
+    def check(action: str):
+        messages = messages_for(world, action)
+        return lambda: get_structured_response(messages, schema, call_site="prefetch")
 
-        # Step 2: Estimate how long this action takes
-        print("\n[Estimating time...]")
-        time_elapsed = estimate_time(user_input)
+    def estimate(action: str):
+        prompt = TIME_ESTIMATE_PROMPT.format(player_action=action)
+        messages = [{"role": "user", "content": prompt}]
+        return lambda: get_response(messages, call_site="prefetch").strip()
+
+    tasks = []
+    for action in likely_actions(world, PREFETCH_MAX_ACTIONS):
+        key = normalize_action(action)
+        tasks.append(((kind, world.version, key), partial(check, action)))
+        if not COMBINED_ADJUDICATION:
+            tasks.append((("time_estimate", None, key), partial(estimate, action)))
+
+    with accounting(session.usage):
+        return Prefetcher(tasks).start()
+
+
+@contextmanager
+def prefetching(session: GameSession):
+    """Prefetch for the next turn while the block waits for the player's input."""
+    prefetcher = start_prefetch(session) if PREFETCH else None
+    try:
+        yield
+    finally:
+        if prefetcher:
+            prefetcher.cancel()
+
+
+def play_turn(
+    session: GameSession,
+    user_input: str,
+    on_outcome: Callable[[str], None] | None = None,
+) -> str:
+    """Run one full turn for a player action and return the final narration.
+
+    on_outcome is called with the initial outcome as soon as it is known, so
+    the caller can show it before the rest of the turn finishes. Raises
+    BudgetExceededError, before doing anything, once the session has spent
+    its token or cost budget. If the turn fails partway, the session is put
+    back as it was before the turn, so the action can simply be tried again.
+    """
+    session.usage.check()
+    listener = session.journal.record_llm_call if session.journal else None
+    head = session.timeline.head
+    deferred_arc_checks = list(session.deferred_arc_checks)
+    started = time.monotonic()
+    with listening(listener), tracing(session.tracer), accounting(session.usage):
+        with span("turn", turn=session.turn, action=user_input):
+            try:
+                response = _play_turn(session, user_input, on_outcome)
+            except Exception:
+                if session.timeline.head is not head:
+                    raise  # the turn was committed; only saving it failed
+                # Messages, the clock, and simulation deltas may already have
+                # changed; none of it was committed to the timeline
+                session.world, session.messages = session.timeline.revert()
+                session.deferred_arc_checks = deferred_arc_checks
+                session.record("turn_reverted", turn=session.turn)
+                raise
+    stage_seconds.observe(time.monotonic() - started, stage="turn")
+    print_dev("TURN WATERFALL", waterfall(session.tracer.last_turn()))
+    return response
+
+
+@contextmanager
+def turn_stage(session: GameSession, budget: TurnBudget, stage: str):
+    """Run one stage of a turn under the latency budget, traced as a span.
+
+    Any degradations the budget needs are applied before the stage starts.
+    """
+    for degradation in budget.plan(stage):
+        print_dev(
+            "DEGRADATION",
+            f"{degradation} before {stage} ({budget.remaining():.1f}s left)",
+        )
+        session.record(
+            "degradation",
+            stage=stage,
+            degradation=degradation,
+            remaining=round(budget.remaining(), 2),
+        )
+    started = time.monotonic()
+    with span(stage, degradations=list(budget.active)):
+        yield
+    budget.finish_stage(stage, started)
+    stage_seconds.observe(time.monotonic() - started, stage=stage)
+
+
+def _play_turn(
+    session: GameSession,
+    user_input: str,
+    on_outcome: Callable[[str], None] | None,
+) -> str:
+    world, messages = session.world, session.messages
+
+    messages.append({"role": "user", "content": user_input})
+    world.history.add("message", f"Player: {user_input}", world.clock)
+    session.record("input", text=user_input)
+
+    budget = TurnBudget(
+        stages=COMBINED_TURN_STAGES if COMBINED_ADJUDICATION else TURN_STAGES
+    )
 
-        # Step 3: Simulate world during that time
-        print("\n[Simulating world...]")
-        simulate_time_passage(world, time_elapsed)
+    def context_budget() -> int | None:
+        if budget.is_degraded(SMALL_CONTEXT):
+            return DEGRADED_CONTEXT_TOKEN_BUDGET
+        return None
+
+    def out_of_time(stage: str, degradation: str) -> None:
+        session.record("degradation", stage=stage, degradation=degradation)
+
+    # Step 1: Check feasibility and get initial outcome
+    with turn_stage(session, budget, "feasibility"):
+        try:
+            if COMBINED_ADJUDICATION:
+                print_status("Adjudicating action...")
+                active_arcs = [arc for arc in world.narrative_arcs if not arc.resolved]
+                feasibility = adjudicate_action(
+                    world, user_input, context_budget(), timeout=budget.remaining()
+                )
+            else:
+                print_status("Checking feasibility...")
+                feasibility = check_feasibility(
+                    world, user_input, context_budget(), timeout=budget.remaining()
+                )
+        except LLMTimeoutError:
+            feasibility = assumed_adjudication(user_input)
+            out_of_time("feasibility", "assume_feasible")
+    print_dev("FEASIBILITY CHECK", 
+        f"Feasible: {feasibility.feasible}\n"
+        f"Interruption: {feasibility.immediate_interruption}\n"
+        f"Flaw triggered: {feasibility.flaw_triggered} ({feasibility.flaw_effect})\n"
+        f"Dice: {feasibility.dice_roll}\n"
+        f"Initial outcome: {feasibility.initial_outcome}"
+    )
 
-        # Step 4: Check if any narrative arcs are resolved
-        print("\n[Checking arc resolution...]")
-        resolved_arcs = check_arc_resolution(
-            world, user_input, feasibility.initial_outcome
+    # Show initial outcome to player immediately
+    if on_outcome:
+        on_outcome(feasibility.initial_outcome)
+
+    # Step 2: Estimate how long this action takes
+    if COMBINED_ADJUDICATION:
+        time_elapsed = format_duration(feasibility.duration_minutes)
+    else:
+        with turn_stage(session, budget, "time_estimate"):
+            print_status("Estimating time...")
+            try:
+                time_elapsed = estimate_time(user_input, timeout=budget.remaining())
+            except LLMTimeoutError:
+                time_elapsed = format_duration(DEFAULT_DURATION_MINUTES)
+                out_of_time("time_estimate", "default_duration")
+
+    # Step 3: Simulate world during that time
+    with turn_stage(session, budget, "simulation"):
+        print_status("Simulating world...")
+        updates = simulate_time_passage(
+            world,
+            time_elapsed,
+            nearby_only=budget.is_degraded(NEARBY_SIMULATION),
+            timeout=budget.remaining(),
+        )
+    session.record(
+        "world_delta", clock=world.clock, time_elapsed=time_elapsed, updates=updates
+    )
+
+    # Step 4: Check if any narrative arcs are resolved
+    if COMBINED_ADJUDICATION:
+        resolved_arcs = apply_arc_resolutions(
+            world, feasibility.resolutions, active_arcs
+        )
+    else:
+        with turn_stage(session, budget, "arc_resolution"):
+            pending = [
+                *session.deferred_arc_checks,
+                (user_input, feasibility.initial_outcome),
+            ]
+            resolved_arcs = []
+            if budget.is_degraded(DEFER_ARCS):
+                # Checked together with the next turn that has time to spare
+                session.deferred_arc_checks = pending
+            else:
+                print_status("Checking arc resolution...")
+                try:
+                    resolved_arcs = check_arc_resolution(
+                        world,
+                        "\n".join(action for action, _ in pending),
+                        "\n".join(outcome for _, outcome in pending),
+                        context_budget(),
+                        timeout=budget.remaining(),
+                    )
+                    session.deferred_arc_checks = []
+                except LLMTimeoutError:
+                    session.deferred_arc_checks = pending
+                    out_of_time("arc_resolution", DEFER_ARCS)
+
+    if resolved_arcs:
+        session.record(
+            "arcs_resolved",
+            arcs={arc.name: arc.resolution_outcome for arc in resolved_arcs},
         )
 
+    with turn_stage(session, budget, "narration"):
         # Step 5: Refresh session with updated world state
-        refresh_session(messages, world)
+        refresh_session(messages, world, user_input, context_budget())
 
         # Build context for final response including feasibility results
         feasibility_context = f"""
@@ -467,19 +1219,90 @@ WHAT JUST HAPPENED:
 
         # Add feasibility context as a system message for the final response
         messages.append({"role": "system", "content": feasibility_context})
+        session.record("message", message=messages[-1])
 
-        # For dev
-        with open("messages_dump.json", "w") as f:
-            json.dump(messages, f, indent=2)
-        print("[DEV] Messages dumped to messages_dump.json")
+        # Step 6: Generate final response with all context
+        try:
+            response = get_response(
+                narration_messages(messages, NARRATION_HISTORY_EXCHANGES),
+                call_site="narration",
+                model=FAST_MODEL if budget.is_degraded(FAST_NARRATION) else MODEL,
+                timeout=max(budget.remaining(), NARRATION_MIN_SECONDS),
+            )
+        except LLMTimeoutError:
+            # Out of time entirely: the initial outcome stands in for narration
+            response = feasibility.initial_outcome
+            out_of_time("narration", "initial_outcome")
+
+    messages.append({"role": "assistant", "content": response})
+    world.history.add("message", response, world.clock)
+    session.record("message", message=messages[-1])
+
+    session.record("usage", **session.usage.end_turn().to_dict())
+    if session.journal:
+        session.journal.end_turn()
+    session.turn += 1
+    session.timeline.commit(
+        world,
+        messages,
+        label=user_input,
+        extra=tuple(session.deferred_arc_checks),
+    )
+    if (
+        session.save_path
+        and AUTOSAVE_EVERY_TURNS
+        and session.turn % AUTOSAVE_EVERY_TURNS == 0
+    ):
+        save_session(session.save_path, world, messages, session.turn)
+        print_status(f"Autosaved to {session.save_path}")
 
-        print("==========\nMESSAGES\n==========")
-        for message in messages:
-            print(f"{message['role']}: {message['content'][:100]}...")
-        print("==========\n")
+    return response
 
-        # Step 6: Generate final response with all context
-        response = get_response(messages)
-        messages.append({"role": "assistant", "content": response})
 
-        print_response(response)
+def run_game(resume_path: str | None = None):
+    """Run the main game loop in the terminal, optionally resuming a saved session."""
+    print_title()
+    # litellm loads and connects while the title is on screen, not before it
+    if WORLD_GENERATION_MODE != "offline":
+        warm_up()
+
+    session = open_session(resume_path)
+
+    # Show the opening message (or where a resumed session left off)
+    print_separator()
+    print_response(session.last_narration)
+
+    # Main game loop
+    try:
+        while True:
+            print_separator()
+
+            with prefetching(session):
+                user_input = get_input()
+
+            if not user_input:
+                continue
+
+            if user_input.lower() in QUIT_COMMANDS:
+                print_goodbye()
+                break
+
+            if user_input.lower() in UNDO_COMMANDS:
+                narration = undo_turn(session)
+                print_response(narration or "There is nothing to undo.")
+                continue
+
+            if user_input.lower() in STATS_COMMANDS:
+                print_response(session.usage.report())
+                continue
+
+            try:
+                response = play_turn(session, user_input, on_outcome=print_response)
+            except BudgetExceededError as error:
+                print_response(f"This session has reached its budget: {error}.")
+                print_goodbye()
+                break
+            print_response(response)
+    finally:
+        print_dev("SESSION USAGE", session.usage.report())
+        session.close()
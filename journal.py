@@ -0,0 +1,175 @@
+"""
+Append-only session journal for PEACE_COM.
+
+Each turn appends only its own events (player input, LLM requests and
+responses, world changes) as JSON lines. Writes happen on a background
+thread so the turn loop never waits on disk, and the file doubles as an
+audit and replay log.
+
+An LLM request usually repeats most of an earlier one, since the narration
+history only grows, so it is stored as a delta on the last request in the
+same thread. Requests belong to a thread by their second message (for
+narration, the opening prompt), since the first, the system prompt, is
+rewritten every turn. A delta holds the first message if it changed, how
+many of the messages after it the two requests share, and the rest.
+read_journal puts the full requests back together.
+"""
+
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+
+from config import JOURNAL_PATH, JOURNAL_FSYNC
+
+FSYNC_POLICIES = ("always", "turn", "never")
+
+_END_TURN = object()
+_CLOSE = object()
+
+# Threads the writer remembers; requests in older ones are written whole
+DELTA_THREADS = 16
+
+
+def thread_key(messages: list[dict]) -> str | None:
+    """The thread a request belongs to, or None if it is too short to share."""
+    if len(messages) < 2:
+        return None
+    encoded = json.dumps(messages[1], sort_keys=True).encode("utf-8")
+    return hashlib.sha1(encoded).hexdigest()[:16]
+
+
+def shared_prefix(first: list[dict], second: list[dict]) -> int:
+    """How many leading messages two lists have in common."""
+    count = 0
+    for a, b in zip(first, second):
+        # Histories hold the same dicts from call to call, so identity is the
+        # usual answer and the comparison stays cheap
+        if a is not b and a != b:
+            break
+        count += 1
+    return count
+
+
+def encode_request(previous: list[dict] | None, messages: list[dict]) -> dict:
+    """Describe a request as a delta on the previous one in its thread.
+
+    first is None when the request keeps the previous first message (or is
+    empty); keep is how many messages after the first the two share.
+    """
+    keep = shared_prefix(previous[1:], messages[1:]) if previous else 0
+    first = messages[0] if messages else None
+    if keep and previous[0] == first:
+        first = None
+    return {
+        "thread": thread_key(messages),
+        "first": first,
+        "keep": keep,
+        "added": messages[1 + keep :],
+    }
+
+
+def decode_request(previous: list[dict] | None, delta: dict) -> list[dict]:
+    """Rebuild a request from encode_request's delta and the same previous one."""
+    if not delta["keep"]:
+        first = [delta["first"]] if delta["first"] is not None else []
+        return first + delta["added"]
+    first = delta["first"] if delta["first"] is not None else previous[0]
+    return [first, *previous[1 : 1 + delta["keep"]], *delta["added"]]
+
+
+class Journal:
+    """Buffered JSONL writer with a configurable fsync policy.
+
+    fsync_policy is "always" (after every event), "turn" (at the end of each
+    turn), or "never" (leave it to the OS).
+    """
+
+    def __init__(self, path: str = JOURNAL_PATH, fsync_policy: str = JOURNAL_FSYNC):
+        if fsync_policy not in FSYNC_POLICIES:
+            raise ValueError(
+                f"Unknown fsync policy {fsync_policy!r}, "
+                f"expected one of {FSYNC_POLICIES}"
+            )
+        self.path = path
+        self.fsync_policy = fsync_policy
+        self.turn = 0
+        # The last request written in each thread, most recently used last
+        self.threads: OrderedDict[str, list[dict]] = OrderedDict()
+        self.threads_lock = threading.Lock()
+        self.queue: queue.Queue = queue.Queue()
+        self.file = open(path, "a", encoding="utf-8")
+        self.thread = threading.Thread(target=self._write_loop, daemon=True)
+        self.thread.start()
+
+    def record(self, event: str, **data) -> None:
+        """Queue an event for writing."""
+        self.queue.put({"time": time.time(), "turn": self.turn, "event": event, **data})
+
+    def record_llm_call(self, messages: list[dict], response: str) -> None:
+        """Record one LLM request, as a delta on its thread, and its response."""
+        thread = thread_key(messages)
+        # Calls arrive from several threads; deltas must be queued in the
+        # order they were computed or replay would apply them to the wrong base
+        with self.threads_lock:
+            previous = self.threads.pop(thread, None) if thread else None
+            self.record(
+                "llm_call", **encode_request(previous, messages), response=response
+            )
+            if thread:
+                self.threads[thread] = list(messages)
+                if len(self.threads) > DELTA_THREADS:
+                    self.threads.popitem(last=False)
+
+    def end_turn(self) -> None:
+        """Mark the end of a turn; later events belong to the next one."""
+        self.queue.put(_END_TURN)
+        self.turn += 1
+
+    def close(self) -> None:
+        """Write everything still queued and close the file."""
+        self.queue.put(_CLOSE)
+        self.thread.join()
+
+    def _sync(self) -> None:
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def _write_loop(self) -> None:
+        while True:
+            item = self.queue.get()
+            if item is _CLOSE:
+                self._sync()
+                self.file.close()
+                return
+            if item is _END_TURN:
+                if self.fsync_policy == "turn":
+                    self._sync()
+                continue
+            self.file.write(json.dumps(item, separators=(",", ":")) + "\n")
+            if self.fsync_policy == "always":
+                self._sync()
+            elif self.queue.empty():
+                # Hand the buffer to the OS once the backlog is drained
+                self.file.flush()
+
+
+def read_journal(path: str) -> list[dict]:
+    """Read every event from a journal, e.g. for auditing or replay.
+
+    LLM calls come back with their full request rebuilt from the deltas.
+    """
+    with open(path, encoding="utf-8") as f:
+        events = [json.loads(line) for line in f if line.strip()]
+    threads: dict[str, list[dict]] = {}
+    for event in events:
+        if event["event"] != "llm_call":
+            continue
+        delta = {key: event.pop(key) for key in ("thread", "first", "keep", "added")}
+        event["request"] = decode_request(threads.get(delta["thread"]), delta)
+        if delta["thread"]:
+            threads[delta["thread"]] = event["request"]
+    return events
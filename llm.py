@@ -2,35 +2,508 @@
 LLM interaction layer for PEACE_COM.
 """
 
+import hashlib
+import json
+import random
+import threading
+import time
 import warnings
-from typing import TypeVar
+from collections import Counter, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, TypeVar
 
-import litellm
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError
 
-from config import MODEL
+from config import (
+    MODEL,
+    LLM_TIMEOUT_SECONDS,
+    LLM_MAX_RETRIES,
+    LLM_BACKOFF_BASE_SECONDS,
+    LLM_BACKOFF_MAX_SECONDS,
+    LLM_HEDGING,
+    LLM_HEDGE_PERCENTILE,
+    LLM_HEDGE_MIN_SAMPLES,
+    LLM_MAX_CONCURRENCY,
+)
+from scheduler import FOREGROUND, priority_for, scheduler
+from tracing import span, current_span
+from usage import UsageLedger, current_ledger, usage_from_response
+from metrics import registry
+from llm_client import get_client
 
 # Suppress Pydantic serialization warnings from LiteLLM
 warnings.filterwarnings("ignore", message="Pydantic serializer warnings")
 
+
+def load_litellm():
+    """Import litellm, which takes seconds, the first time it is needed."""
+    import litellm
+
+    globals()["litellm"] = litellm
+    return litellm
+
+
+def __getattr__(name: str):
+    # Keeps `llm.litellm` (and patch("llm.litellm.completion")) working
+    # without importing litellm when llm is imported
+    if name == "litellm":
+        return load_litellm()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+_warm_up_thread: threading.Thread | None = None
+_warm_up_lock = threading.Lock()
+
+
+def _warm_up() -> None:
+    load_litellm()
+    client = get_client()
+    client.precompile()
+    client.prewarm()
+
+
+def warm_up() -> threading.Thread:
+    """Get ready for the first call on a background thread.
+
+    Imports litellm, compiles the response schemas, and opens connections
+    to the provider. Only the first call starts anything.
+    """
+    global _warm_up_thread
+    with _warm_up_lock:
+        if _warm_up_thread is None:
+            _warm_up_thread = threading.Thread(
+                target=_warm_up, name="llm-warm-up", daemon=True
+            )
+            _warm_up_thread.start()
+        return _warm_up_thread
+
 T = TypeVar("T", bound=BaseModel)
 
+# Callables notified with (messages, response content) after every call
+_listeners: list[Callable[[list[dict], str], None]] = []
+
+
+def add_listener(listener: Callable[[list[dict], str], None]) -> None:
+    """Register a callable to be told about every LLM request and response."""
+    _listeners.append(listener)
+
+
+def remove_listener(listener: Callable[[list[dict], str], None]) -> None:
+    """Stop notifying a previously added listener."""
+    _listeners.remove(listener)
+
+
+# Listeners scoped to the current context, e.g. one game session's turn
+_scoped_listeners: ContextVar[tuple] = ContextVar("llm_listeners", default=())
+
+
+@contextmanager
+def listening(listener: Callable[[list[dict], str], None] | None):
+    """Notify a listener of calls made in this context only (None is a no-op)."""
+    if listener is None:
+        yield
+        return
+    token = _scoped_listeners.set(_scoped_listeners.get() + (listener,))
+    try:
+        yield
+    finally:
+        _scoped_listeners.reset(token)
+
+
+def _notify(messages: list[dict], content: str) -> None:
+    for listener in (*_listeners, *_scoped_listeners.get()):
+        listener(messages, content)
 
-def get_response(messages: list[dict]) -> str:
-    """Get a response from the LLM."""
-    response = litellm.completion(
-        model=MODEL,
-        messages=messages,
-    )
-    return response.choices[0].message.content
 
+class LLMTimeoutError(TimeoutError):
+    """An LLM call did not finish before its deadline."""
 
-def get_structured_response(messages: list[dict], response_model: type[T]) -> T:
-    """Get a structured response from the LLM, validated against a Pydantic model."""
-    response = litellm.completion(
-        model=MODEL,
-        messages=messages,
-        response_format=response_model,
+
+class _Flight:
+    """One in-flight request and the callers waiting on it."""
+
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    """Coalesce concurrent identical requests onto one provider call.
+
+    Nothing is cached: once a call finishes, the next identical request goes
+    to the provider again. A waiter never waits past its own deadline, even
+    if the call it joined has a longer one or none at all.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.flights: dict[str, _Flight] = {}
+        self.calls = 0  # provider calls actually made
+        self.coalesced = 0  # requests served by another caller's call
+
+    def do(self, key: str, fn: Callable[[], str], timeout: float | None = None) -> str:
+        """Run fn for this key, or wait for the identical call already running.
+
+        A waiter raises LLMTimeoutError after timeout seconds. The leader's
+        deadline is fn's business.
+        """
+        with self.lock:
+            flight = self.flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.flights[key] = _Flight()
+                self.calls += 1
+            else:
+                self.coalesced += 1
+
+        if leader:
+            try:
+                flight.result = fn()
+            except BaseException as error:
+                flight.error = error
+            finally:
+                with self.lock:
+                    del self.flights[key]
+                flight.done.set()
+        elif not flight.done.wait(timeout):
+            _count("timeouts")
+            raise LLMTimeoutError(
+                f"identical call in flight did not finish within {timeout:.0f}s"
+            )
+
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    def stats(self) -> dict[str, int]:
+        """Report provider calls made and requests coalesced onto them."""
+        with self.lock:
+            return {
+                "calls": self.calls,
+                "coalesced": self.coalesced,
+                "in_flight": len(self.flights),
+            }
+
+
+single_flight = SingleFlight()
+registry.callback(
+    "peace_com_cache_hits_total",
+    "Requests served without a provider call of their own.",
+    "counter",
+    lambda: {("single_flight",): single_flight.stats()["coalesced"]},
+    ("cache",),
+)
+
+
+def request_key(
+    messages: list[dict],
+    response_model: type[BaseModel] | None,
+    model: str = MODEL,
+    priority: str = FOREGROUND,
+) -> str:
+    """Identify a request by everything that determines its response.
+
+    The priority class is part of the key, so a foreground call never ends up
+    waiting behind a background one that the scheduler is holding back.
+    """
+    payload = json.dumps(
+        [
+            model,
+            messages,
+            response_model.__name__ if response_model else None,
+            priority,
+        ],
+        sort_keys=True,
     )
-    content = response.choices[0].message.content
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+# Status codes and exception names worth retrying
+TRANSIENT_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504, 529}
+TRANSIENT_ERROR_NAMES = {
+    "APIConnectionError",
+    "InternalServerError",
+    "RateLimitError",
+    "ServiceUnavailableError",
+    "Timeout",
+}
+
+# Attempts run on worker threads so a deadline can be enforced on them
+_executor = ThreadPoolExecutor(
+    max_workers=LLM_MAX_CONCURRENCY * 2, thread_name_prefix="llm"
+)
+
+# Counts of retries, hedged requests, and deadline timeouts
+call_counters: Counter = Counter()
+_counters_lock = threading.Lock()
+
+
+def _count(name: str) -> None:
+    with _counters_lock:
+        call_counters[name] += 1
+
+
+def _counter_snapshot() -> dict[tuple, float]:
+    with _counters_lock:
+        return {(name,): count for name, count in call_counters.items()}
+
+
+llm_call_seconds = registry.histogram(
+    "peace_com_llm_call_seconds",
+    "LLM call latency, including retries and waits for a coalesced call.",
+    ("call_site",),
+)
+llm_calls = registry.counter(
+    "peace_com_llm_calls_total", "LLM calls by outcome.", ("call_site", "outcome")
+)
+registry.callback(
+    "peace_com_llm_events_total",
+    "LLM retries, hedged requests, and deadline timeouts.",
+    "counter",
+    _counter_snapshot,
+    ("event",),
+)
+
+
+def _scheduler_snapshot() -> dict[tuple, float]:
+    depths = scheduler.queue_depths()
+    return {
+        (state, priority): count
+        for state in ("waiting", "in_flight")
+        for priority, count in depths[state].items()
+    }
+
+
+registry.callback(
+    "peace_com_llm_scheduler_calls",
+    "LLM calls waiting for or holding a scheduler slot.",
+    "gauge",
+    _scheduler_snapshot,
+    ("state", "priority"),
+)
+registry.callback(
+    "peace_com_llm_scheduler_limit",
+    "Current adaptive concurrency limit.",
+    "gauge",
+    lambda: {(): scheduler.queue_depths()["limit"]},
+)
+
+
+class LatencyTracker:
+    """Recent successful call latencies per call site."""
+
+    def __init__(self, size: int = 200):
+        self.size = size
+        self.lock = threading.Lock()
+        self.samples: dict[str, deque] = {}
+
+    def record(self, call_site: str, seconds: float) -> None:
+        with self.lock:
+            samples = self.samples.setdefault(call_site, deque(maxlen=self.size))
+            samples.append(seconds)
+
+    def percentile(self, call_site: str, fraction: float) -> float | None:
+        """Latency at the given percentile, or None without enough samples."""
+        with self.lock:
+            samples = sorted(self.samples.get(call_site, ()))
+        if len(samples) < LLM_HEDGE_MIN_SAMPLES:
+            return None
+        return samples[min(int(len(samples) * fraction), len(samples) - 1)]
+
+
+latency_tracker = LatencyTracker()
+
+
+def is_transient(error: BaseException) -> bool:
+    """Whether an error is worth retrying: provider hiccups and malformed JSON."""
+    if isinstance(error, (LLMTimeoutError, ValidationError)):
+        return True
+    if getattr(error, "status_code", None) in TRANSIENT_STATUS_CODES:
+        return True
+    return type(error).__name__ in TRANSIENT_ERROR_NAMES
+
+
+def backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff before the given retry (0-based)."""
+    cap = min(LLM_BACKOFF_MAX_SECONDS, LLM_BACKOFF_BASE_SECONDS * 2**attempt)
+    return random.uniform(0, cap)
+
+
+def _run_attempt(fn: Callable[[], str], call_site: str, timeout: float) -> str:
+    """Run one attempt under a deadline, hedging it if it runs long."""
+    start = time.monotonic()
+    deadline = start + timeout
+    pending = {_executor.submit(fn)}
+
+    hedge_delay = None
+    if LLM_HEDGING:
+        hedge_delay = latency_tracker.percentile(call_site, LLM_HEDGE_PERCENTILE)
+    if hedge_delay is not None and hedge_delay < timeout:
+        done, _ = wait(pending, timeout=hedge_delay)
+        if not done:
+            _count("hedges")
+            pending.add(_executor.submit(fn))
+
+    error = None
+    while pending:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                latency_tracker.record(call_site, time.monotonic() - start)
+                return future.result()
+            error = future.exception()
+    if error is not None and not pending:
+        raise error
+    _count("timeouts")
+    raise LLMTimeoutError(f"{call_site} call exceeded its {timeout:.0f}s deadline")
+
+
+def _call_with_retries(
+    fn: Callable[[], str], call_site: str, timeout: float | None = None
+) -> str:
+    """Run a call with jittered retries.
+
+    Each attempt gets LLM_TIMEOUT_SECONDS. If timeout is given, it caps the
+    whole call, retries included.
+    """
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        attempt_timeout = LLM_TIMEOUT_SECONDS
+        if deadline is not None:
+            attempt_timeout = min(attempt_timeout, deadline - time.monotonic())
+            if attempt_timeout <= 0:
+                # Don't start a request nobody will wait for
+                _count("timeouts")
+                raise LLMTimeoutError(f"{call_site} call had no time left")
+        try:
+            return _run_attempt(fn, call_site, attempt_timeout)
+        except Exception as error:
+            if attempt == LLM_MAX_RETRIES or not is_transient(error):
+                raise
+            delay = backoff_delay(attempt)
+            if deadline is not None and time.monotonic() + delay >= deadline:
+                raise
+            _count("retries")
+            active = current_span()
+            if active is not None:
+                active.attrs["retries"] = active.attrs.get("retries", 0) + 1
+            time.sleep(delay)
+
+
+def response_cost(response) -> float:
+    """USD cost of a completion, or 0.0 if litellm can't price it."""
+    try:
+        cost = load_litellm().completion_cost(completion_response=response)
+    except Exception:
+        return 0.0
+    return cost if isinstance(cost, float) else 0.0
+
+
+def _charge(ledger: UsageLedger | None, call_site: str, response) -> None:
+    # Runs in the worker thread, so the caller's ledger is passed in explicitly
+    if ledger is not None:
+        ledger.record(call_site, usage_from_response(response, response_cost(response)))
+
+
+@contextmanager
+def _observed(messages: list[dict], call_site: str, model: str):
+    """Trace one LLM call and record it in the metrics."""
+    started = time.monotonic()
+    outcome = "error"
+    try:
+        with span(f"llm {call_site}", "llm", **call_attrs(messages, call_site, model)):
+            yield
+        outcome = "ok"
+    finally:
+        llm_call_seconds.observe(time.monotonic() - started, call_site=call_site)
+        llm_calls.inc(call_site=call_site, outcome=outcome)
+
+
+def call_attrs(messages: list[dict], call_site: str, model: str) -> dict:
+    """Trace attributes describing an LLM call."""
+    return {
+        "model": model,
+        "call_site": call_site,
+        "prompt_chars": sum(len(m["content"]) for m in messages),
+        "retries": 0,
+    }
+
+
+def get_response(
+    messages: list[dict],
+    call_site: str = "narration",
+    model: str = MODEL,
+    timeout: float | None = None,
+) -> str:
+    """Get a response from the LLM.
+
+    call_site names the stage making the call; it decides the call's priority
+    in the scheduler. timeout caps the whole call, retries included.
+    """
+    ledger = current_ledger()
+    client = get_client()
+
+    def call() -> str:
+        with scheduler.slot(call_site):
+            response = load_litellm().completion(
+                model=model,
+                messages=messages,
+                client=client.http,
+            )
+        _charge(ledger, call_site, response)
+        return response.choices[0].message.content
+
+    with _observed(messages, call_site, model):
+        content = single_flight.do(
+            request_key(messages, None, model, priority_for(call_site)),
+            lambda: _call_with_retries(call, call_site, timeout),
+            timeout,
+        )
+    _notify(messages, content)
+    return content
+
+
+def get_structured_response(
+    messages: list[dict],
+    response_model: type[T],
+    call_site: str = "structured",
+    timeout: float | None = None,
+) -> T:
+    """Get a structured response from the LLM, validated against a Pydantic model.
+
+    timeout caps the whole call, retries included, as in get_response.
+    """
+    ledger = current_ledger()
+    client = get_client()
+
+    def call() -> str:
+        with scheduler.slot(call_site):
+            response = load_litellm().completion(
+                model=MODEL,
+                messages=messages,
+                response_format=client.response_format(response_model),
+                client=client.http,
+            )
+        _charge(ledger, call_site, response)
+        content = response.choices[0].message.content
+        # Validate here too so malformed JSON is retried like any other failure
+        response_model.model_validate_json(content)
+        return content
+
+    with _observed(messages, call_site, MODEL):
+        content = single_flight.do(
+            request_key(messages, response_model, priority=priority_for(call_site)),
+            lambda: _call_with_retries(call, call_site, timeout),
+            timeout,
+        )
+    _notify(messages, content)
+    # Each waiter validates its own copy, so no two callers share a model
     return response_model.model_validate_json(content)
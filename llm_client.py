@@ -0,0 +1,129 @@
+"""
+Shared LLM client state for PEACE_COM.
+
+Work that used to happen on every call now happens once per process:
+- a persistent HTTP connection pool, pre-warmed (TLS handshake included)
+  against the provider endpoint before the first call needs it
+- the JSON schema response_format of every response model in schemas.py,
+  which litellm would otherwise rebuild from the Pydantic class each call
+"""
+
+import inspect
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from pydantic import BaseModel
+
+import schemas
+from config import (
+    MODEL,
+    LLM_ENDPOINT,
+    LLM_PREWARM_CONNECTIONS,
+    LLM_MAX_CONCURRENCY,
+    LLM_TIMEOUT_SECONDS,
+)
+
+
+def schema_models() -> list[type[BaseModel]]:
+    """Every response model defined in schemas.py."""
+    return [
+        cls
+        for _, cls in inspect.getmembers(schemas, inspect.isclass)
+        if issubclass(cls, BaseModel) and cls.__module__ == schemas.__name__
+    ]
+
+
+def model_endpoint(model: str = MODEL) -> str | None:
+    """The base URL litellm will send a model's calls to, if it knows one."""
+    import litellm
+    from litellm.utils import ProviderConfigManager
+
+    model, provider, _, api_base = litellm.get_llm_provider(
+        model, api_base=litellm.api_base
+    )
+    if api_base:
+        return api_base
+    info = ProviderConfigManager.get_provider_model_info(
+        model, litellm.LlmProviders(provider)
+    )
+    return info.get_api_base() if info else None
+
+
+class LLMClient:
+    """A connection pool and compiled response schemas, shared by all calls."""
+
+    def __init__(
+        self,
+        endpoint: str | None = LLM_ENDPOINT,
+        pool_size: int = LLM_MAX_CONCURRENCY,
+    ):
+        # Imported here rather than at module level to keep startup fast
+        import httpx
+        from litellm.llms.custom_httpx.http_handler import HTTPHandler
+
+        self.endpoint = endpoint or model_endpoint()
+        self.pool = httpx.Client(
+            limits=httpx.Limits(
+                max_connections=pool_size, max_keepalive_connections=pool_size
+            ),
+            timeout=LLM_TIMEOUT_SECONDS,
+        )
+        # What litellm.completion takes as client=
+        self.http = HTTPHandler(client=self.pool, timeout=LLM_TIMEOUT_SECONDS)
+        self.lock = threading.Lock()
+        self.schemas: dict[type[BaseModel], dict] = {}
+
+    def response_format(self, response_model: type[BaseModel]) -> dict:
+        """The compiled response_format for a model, built on first use."""
+        with self.lock:
+            compiled = self.schemas.get(response_model)
+        if compiled is None:
+            from litellm.utils import type_to_response_format_param
+
+            compiled = type_to_response_format_param(response_model)
+            with self.lock:
+                self.schemas[response_model] = compiled
+        return compiled
+
+    def precompile(self, models: list[type[BaseModel]] | None = None) -> None:
+        """Compile the schemas of the given models, or all of schemas.py."""
+        for response_model in models if models is not None else schema_models():
+            self.response_format(response_model)
+
+    def prewarm(self, connections: int = LLM_PREWARM_CONNECTIONS) -> int:
+        """Open connections to the endpoint so the first calls skip the handshake.
+
+        Any HTTP response counts, since only the connection matters. Returns
+        how many connections were opened.
+        """
+        def connect(_) -> bool:
+            try:
+                self.pool.head(self.endpoint)
+            except Exception:
+                return False
+            return True
+
+        if connections <= 0 or not self.endpoint:
+            return 0
+        with ThreadPoolExecutor(max_workers=connections) as executor:
+            return sum(executor.map(connect, range(connections)))
+
+    def close(self) -> None:
+        self.pool.close()
+
+
+_client: LLMClient | None = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> LLMClient:
+    """The process-wide client, created on first use."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            import litellm
+
+            _client = LLMClient()
+            # Providers that read litellm's global session share the pool too
+            litellm.client_session = _client.pool
+        return _client
@@ -0,0 +1,298 @@
+"""
+Headless load test for PEACE_COM.
+
+Plays N concurrent sessions, each driven by scripted or randomly sampled
+player actions, through the full turn pipeline. The backend is either the
+real provider or a fake one that answers instantly (or with simulated
+latency) with schema-valid responses. Reports throughput, turn latency
+percentiles, LLM calls per turn, and error rates.
+
+Usage: python loadtest.py [--sessions N] [--turns N] [--actions FILE]
+                          [--backend fake|real] [--latency S] [--error-rate P]
+"""
+
+import argparse
+import json
+import math
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from types import SimpleNamespace
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from game import open_session, play_turn, set_dev_output
+from llm import load_litellm, call_counters
+
+# Sampled when no action script is given
+ACTIONS = [
+    "look around",
+    "talk to the nearest person",
+    "search the room for anything useful",
+    "head to the next area",
+    "check my inventory",
+    "ask about the reactor leak",
+    "pick the lock on the maintenance hatch",
+    "buy a drink and listen for rumors",
+    "hide in the shadows and wait",
+    "hack the nearest terminal",
+]
+
+# Filler for fake responses
+WORDS = [
+    "neon", "ore", "dwarf", "elf", "reactor", "datachip", "tunnel", "crater",
+    "smuggler", "lamp", "vault", "signal", "dome", "airlock", "rumor", "drone",
+]
+
+
+class FakeProviderError(Exception):
+    """A transient provider failure injected by the fake backend."""
+
+    status_code = 503
+
+
+def fake_value(schema: dict, defs: dict, rng: random.Random):
+    """A random value that satisfies a JSON schema."""
+    if "$ref" in schema:
+        return fake_value(defs[schema["$ref"].split("/")[-1]], defs, rng)
+    if "anyOf" in schema:
+        options = [s for s in schema["anyOf"] if s.get("type") != "null"]
+        return fake_value(options[0], defs, rng) if options else None
+    kind = schema.get("type")
+    if kind == "object":
+        return {
+            name: fake_value(prop, defs, rng)
+            for name, prop in schema.get("properties", {}).items()
+        }
+    if kind == "array":
+        count = rng.randint(2, 4)
+        return [fake_value(schema["items"], defs, rng) for _ in range(count)]
+    if kind == "string":
+        return f"{rng.choice(WORDS).title()} {rng.choice(WORDS)}"
+    if kind == "integer":
+        return rng.randint(1, 120)
+    if kind == "number":
+        return rng.random()
+    if kind == "boolean":
+        return rng.random() < 0.5
+    return None
+
+
+class FakeBackend:
+    """Stands in for litellm.completion with schema-valid canned responses.
+
+    Latency is log-normal around latency seconds; error_rate of calls fail
+    with a retryable 503.
+    """
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def completion(
+        self, model: str, messages: list[dict], response_format=None, **kwargs
+    ):
+        with self.lock:
+            fails = self.rng.random() < self.error_rate
+            delay = 0.0
+            if self.latency > 0:
+                delay = self.rng.lognormvariate(math.log(self.latency) - 0.125, 0.5)
+            rng = random.Random(self.rng.random())
+        time.sleep(delay)
+        if fails:
+            raise FakeProviderError("HTTP 503 (injected)")
+
+        if response_format is None:
+            content = (
+                f"The {rng.choice(WORDS)} flickers as the {rng.choice(WORDS)} hums."
+                f" About {rng.randint(1, 60)} minutes pass."
+            )
+        else:
+            if isinstance(response_format, dict):
+                schema = response_format["json_schema"]["schema"]
+            else:
+                schema = response_format.model_json_schema()
+            data = fake_value(schema, schema.get("$defs", {}), rng)
+            content = json.dumps(data)
+
+        prompt_chars = sum(len(m["content"]) for m in messages)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=SimpleNamespace(
+                prompt_tokens=prompt_chars // 4 + 1,
+                completion_tokens=len(content) // 4 + 1,
+            ),
+        )
+
+
+@contextmanager
+def installed(backend: FakeBackend | None):
+    """Route LLM calls to backend for the duration, or leave the real one."""
+    if backend is None:
+        yield
+        return
+    litellm = load_litellm()
+    original = litellm.completion
+    litellm.completion = backend.completion
+    try:
+        yield
+    finally:
+        litellm.completion = original
+
+
+@dataclass(slots=True)
+class TurnResult:
+    session: int
+    seconds: float
+    llm_calls: int
+    error: str | None = None
+
+
+def play_session(
+    index: int, actions: list[str]
+) -> tuple[list[TurnResult], str | None]:
+    """Open a session and play actions. Returns turn results and any open error."""
+    try:
+        session = open_session(journal_path=None, save_path=None, trace_path=None)
+    except Exception as error:
+        return [], type(error).__name__
+
+    results = []
+    try:
+        for action in actions:
+            calls_before = session.usage.session.calls
+            started = time.monotonic()
+            error = None
+            try:
+                play_turn(session, action)
+            except Exception as failure:
+                error = type(failure).__name__
+            results.append(
+                TurnResult(
+                    session=index,
+                    seconds=time.monotonic() - started,
+                    llm_calls=session.usage.session.calls - calls_before,
+                    error=error,
+                )
+            )
+    finally:
+        session.close()
+    return results, None
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Nearest-rank percentile; 0.0 for no values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+
+def run(
+    sessions: int,
+    turns: int,
+    script: list[str] | None = None,
+    backend: FakeBackend | None = None,
+    seed: int = 0,
+) -> dict:
+    """Play the sessions concurrently and summarize the results."""
+    plans = []
+    for index in range(sessions):
+        if script:
+            plans.append([script[i % len(script)] for i in range(turns)])
+        else:
+            rng = random.Random(seed + index)
+            plans.append([rng.choice(ACTIONS) for _ in range(turns)])
+
+    events_before = dict(call_counters)
+    started = time.monotonic()
+    with installed(backend), ThreadPoolExecutor(max_workers=sessions) as executor:
+        outcomes = list(executor.map(play_session, range(sessions), plans))
+    elapsed = time.monotonic() - started
+
+    results = [result for session_results, _ in outcomes for result in session_results]
+    open_errors = [error for _, error in outcomes if error]
+    turn_errors = [result.error for result in results if result.error]
+    completed = [result for result in results if not result.error]
+    latencies = [result.seconds for result in completed]
+    return {
+        "sessions": sessions,
+        "turns": len(results),
+        "elapsed_seconds": elapsed,
+        "turns_per_second": len(completed) / elapsed if elapsed else 0.0,
+        "latency_p50": percentile(latencies, 0.50),
+        "latency_p90": percentile(latencies, 0.90),
+        "latency_p99": percentile(latencies, 0.99),
+        "latency_max": max(latencies, default=0.0),
+        "llm_calls_per_turn": (
+            sum(r.llm_calls for r in completed) / len(completed) if completed else 0.0
+        ),
+        "turn_error_rate": len(turn_errors) / len(results) if results else 0.0,
+        "session_error_rate": len(open_errors) / sessions if sessions else 0.0,
+        "errors": sorted(set(turn_errors + open_errors)),
+        "llm_events": {
+            name: count - events_before.get(name, 0)
+            for name, count in call_counters.items()
+            if count - events_before.get(name, 0)
+        },
+    }
+
+
+def format_report(report: dict) -> str:
+    lines = [
+        f"Sessions:          {report['sessions']}",
+        f"Turns:             {report['turns']} in {report['elapsed_seconds']:.1f}s",
+        f"Throughput:        {report['turns_per_second']:.2f} turns/s",
+        "Turn latency:      "
+        f"p50 {report['latency_p50']:.2f}s  p90 {report['latency_p90']:.2f}s  "
+        f"p99 {report['latency_p99']:.2f}s  max {report['latency_max']:.2f}s",
+        f"LLM calls/turn:    {report['llm_calls_per_turn']:.1f}",
+        f"Turn errors:       {report['turn_error_rate']:.1%}",
+        f"Session errors:    {report['session_error_rate']:.1%}",
+    ]
+    if report["errors"]:
+        lines.append(f"Error types:       {', '.join(report['errors'])}")
+    if report["llm_events"]:
+        events = ", ".join(f"{k} {v}" for k, v in sorted(report["llm_events"].items()))
+        lines.append(f"LLM events:        {events}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless PEACE_COM load test")
+    parser.add_argument("--sessions", type=int, default=4)
+    parser.add_argument("--turns", type=int, default=5, help="turns per session")
+    parser.add_argument(
+        "--actions", help="file of actions, one per line, replayed in order"
+    )
+    parser.add_argument("--backend", choices=("fake", "real"), default="fake")
+    parser.add_argument(
+        "--latency", type=float, default=0.5, help="mean fake call latency (s)"
+    )
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fake 503 rate")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    script = None
+    if args.actions:
+        with open(args.actions) as f:
+            script = [line.strip() for line in f if line.strip()]
+    backend = None
+    if args.backend == "fake":
+        backend = FakeBackend(args.latency, args.error_rate, args.seed)
+
+    # Many sessions share stdout, so per-turn progress output would interleave
+    set_dev_output(False)
+    report = run(args.sessions, args.turns, script, backend, args.seed)
+    print(format_report(report))
+
+
+if __name__ == "__main__":
+    main()
@@ -5,15 +5,27 @@ PEACE_COM: A CLI Dungeon Crawler
 Entry point.
 """
 
+import argparse
+
 from dotenv import load_dotenv
 
 load_dotenv()
 
+from config import SAVE_PATH
 from game import run_game
 
 
 def main():
-    run_game()
+    parser = argparse.ArgumentParser(description="PEACE_COM: A CLI Dungeon Crawler")
+    parser.add_argument(
+        "--resume",
+        nargs="?",
+        const=SAVE_PATH,
+        metavar="PATH",
+        help=f"resume a saved session (default: {SAVE_PATH})",
+    )
+    args = parser.parse_args()
+    run_game(resume_path=args.resume)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,297 @@
+"""
+Metrics for long-running PEACE_COM deployments.
+
+A registry of counters, gauges, and histograms, rendered in the Prometheus
+text exposition format. The registry can be served over HTTP for scraping
+or written to a file periodically, e.g. for node_exporter's textfile
+collector.
+"""
+
+import math
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable
+
+from config import (
+    METRICS_HOST,
+    METRICS_PORT,
+    METRICS_PATH,
+    METRICS_WRITE_INTERVAL_SECONDS,
+)
+
+# Histogram buckets in seconds, spanning a cached lookup to a slow LLM call
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    pairs = (f'{name}="{_escape(str(value))}"' for name, value in labels.items())
+    return "{" + ",".join(pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    """Base for metrics whose samples are keyed by a tuple of label values."""
+
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.lock = threading.Lock()
+
+    def key(self, labels: dict[str, str]) -> tuple:
+        if set(labels) != set(self.labels):
+            raise ValueError(
+                f"{self.name} takes labels {self.labels}, got {tuple(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def samples(self) -> list[tuple[str, dict[str, str], float]]:
+        """(name, labels, value) triples to expose."""
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    """A value that only goes up."""
+
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        super().__init__(name, help, labels)
+        self.values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self.key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0.0) + amount
+
+    def get(self, **labels) -> float:
+        with self.lock:
+            return self.values.get(self.key(labels), 0.0)
+
+    def samples(self):
+        with self.lock:
+            items = list(self.values.items())
+        return [
+            (self.name, dict(zip(self.labels, key)), value) for key, value in items
+        ]
+
+
+class Gauge(Counter):
+    """A value that can go up and down."""
+
+    type = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        key = self.key(labels)
+        with self.lock:
+            self.values[key] = value
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    """Counts of observations in cumulative buckets, plus their sum."""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self.counts: dict[tuple, list[int]] = {}
+        self.sums: dict[tuple, float] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self.key(labels)
+        with self.lock:
+            counts = self.counts.setdefault(key, [0] * len(self.buckets))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self.sums[key] = self.sums.get(key, 0.0) + value
+
+    def count(self, **labels) -> int:
+        with self.lock:
+            return sum(self.counts.get(self.key(labels), ()))
+
+    def samples(self):
+        with self.lock:
+            items = [
+                (key, list(counts), self.sums[key])
+                for key, counts in self.counts.items()
+            ]
+        samples = []
+        for key, counts, total in items:
+            labels = dict(zip(self.labels, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = "+Inf" if math.isinf(bound) else _format_value(bound)
+                bucket_labels = {**labels, "le": le}
+                samples.append((f"{self.name}_bucket", bucket_labels, cumulative))
+            samples.append((f"{self.name}_sum", labels, total))
+            samples.append((f"{self.name}_count", labels, cumulative))
+        return samples
+
+
+class CallbackMetric(Metric):
+    """A counter or gauge whose values are read from a function at scrape time.
+
+    Useful for state that is already tracked elsewhere, like the number of
+    live sessions, so it is never double-counted.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        type: str,
+        labels: tuple[str, ...],
+        collect: Callable[[], dict[tuple, float]],
+    ):
+        super().__init__(name, help, labels)
+        self.type = type
+        self.collect = collect
+
+    def samples(self):
+        return [
+            (self.name, dict(zip(self.labels, key)), value)
+            for key, value in self.collect().items()
+        ]
+
+
+class MetricsRegistry:
+    """A named set of metrics. Asking for an existing name returns it."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics: dict[str, Metric] = {}
+
+    def _get_or_add(self, metric: Metric) -> Metric:
+        with self.lock:
+            return self.metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, help: str, labels: tuple[str, ...] = ()) -> Counter:
+        return self._get_or_add(Counter(name, help, labels))
+
+    def gauge(self, name: str, help: str, labels: tuple[str, ...] = ()) -> Gauge:
+        return self._get_or_add(Gauge(name, help, labels))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._get_or_add(Histogram(name, help, labels, buckets))
+
+    def callback(
+        self,
+        name: str,
+        help: str,
+        type: str,
+        collect: Callable[[], dict[tuple, float]],
+        labels: tuple[str, ...] = (),
+    ) -> CallbackMetric:
+        return self._get_or_add(CallbackMetric(name, help, type, labels, collect))
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        with self.lock:
+            metrics = sorted(self.metrics.values(), key=lambda m: m.name)
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+def serve_metrics(
+    port: int, host: str = METRICS_HOST, metrics: MetricsRegistry = registry
+) -> ThreadingHTTPServer:
+    """Serve /metrics from a background thread. Returns the running server."""
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # scrapes would otherwise flood stderr
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def write_metrics(path: str, metrics: MetricsRegistry = registry) -> None:
+    """Write the metrics to path atomically, so readers never see half a file."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(metrics.render())
+    os.replace(tmp_path, path)
+
+
+def write_metrics_periodically(
+    path: str,
+    interval: float = METRICS_WRITE_INTERVAL_SECONDS,
+    metrics: MetricsRegistry = registry,
+) -> threading.Event:
+    """Rewrite the metrics file every interval seconds. Set the event to stop."""
+    stop = threading.Event()
+
+    def run():
+        while not stop.wait(interval):
+            write_metrics(path, metrics)
+        write_metrics(path, metrics)
+
+    threading.Thread(target=run, daemon=True).start()
+    return stop
+
+
+def start_exporter(
+    port: int | None = METRICS_PORT, path: str | None = METRICS_PATH
+) -> None:
+    """Start whichever exporters are configured."""
+    if port is not None:
+        serve_metrics(port)
+    if path:
+        write_metrics_periodically(path)
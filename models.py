@@ -2,10 +2,85 @@
 Data models for PEACE_COM game world.
 """
 
+import itertools
+import sys
+from array import array
 from dataclasses import dataclass, field
 
+from relevance import ArcIndex
+from retrieval import HistoryIndex
 
-@dataclass
+
+# Source of GameWorld versions, unique across every world in the process
+_versions = itertools.count(1)
+
+
+def intern_all(items: list[str]) -> list[str]:
+    """Intern every string in a list so repeated names share one object."""
+    return [sys.intern(item) for item in items]
+
+
+def format_clock(minutes: int) -> str:
+    """Format a world clock offset, e.g. 'T+1d02h05m'."""
+    days, rest = divmod(minutes, 1440)
+    hours, mins = divmod(rest, 60)
+    if days:
+        return f"T+{days}d{hours:02d}h{mins:02d}m"
+    return f"T+{hours}h{mins:02d}m"
+
+
+class UpdateLog:
+    """Compact history of an entity's updates.
+
+    Each entry is a world clock offset (minutes since the start of the game)
+    plus a reference to the update text. The "[time] text" form is rendered
+    on demand rather than stored.
+    """
+
+    __slots__ = ("offsets", "texts")
+
+    def __init__(self):
+        self.offsets = array("I")
+        self.texts: list[str] = []
+
+    def append(self, clock: int, text: str) -> None:
+        """Record an update made at the given world clock offset."""
+        self.offsets.append(clock)
+        self.texts.append(text)
+
+    def latest(self) -> str:
+        """Return the text of the most recent update."""
+        return self.texts[-1]
+
+    def recent(self, count: int) -> list[str]:
+        """Render the most recent updates, oldest first."""
+        start = max(len(self.texts) - count, 0)
+        return [self[index] for index in range(start, len(self.texts))]
+
+    def entries(self):
+        """Yield (clock offset, text) pairs in order."""
+        return zip(self.offsets, self.texts)
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def __getitem__(self, index: int) -> str:
+        return f"[{format_clock(self.offsets[index])}] {self.texts[index]}"
+
+    def __iter__(self):
+        for clock, text in self.entries():
+            yield f"[{format_clock(clock)}] {text}"
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, UpdateLog):
+            return NotImplemented
+        return self.offsets == other.offsets and self.texts == other.texts
+
+    def __repr__(self) -> str:
+        return f"UpdateLog({list(self.entries())!r})"
+
+
+@dataclass(slots=True)
 class Character:
     """An NPC in the game world."""
 
@@ -14,10 +89,22 @@ class Character:
     location: str = ""  # name of the Place they're in
     inventory: list[str] = field(default_factory=list)  # items they carry
     initial_state: str = ""  # filled during initialization
-    updates: list[str] = field(default_factory=list)
+    state: str = ""  # one-line current state, replaced by each simulation
+    updates: UpdateLog = field(default_factory=UpdateLog)
 
+    def __post_init__(self):
+        self.name = sys.intern(self.name)
+        self.role = sys.intern(self.role)
+        self.location = sys.intern(self.location)
+        self.inventory = intern_all(self.inventory)
 
-@dataclass
+    @property
+    def current_state(self) -> str:
+        """The latest simulated state, or the initial one before any simulation."""
+        return self.state or self.initial_state
+
+
+@dataclass(slots=True)
 class Place:
     """A location in the game world."""
 
@@ -26,10 +113,22 @@ class Place:
     adjacent: list[str] = field(default_factory=list)  # names of connected places
     inventory: list[str] = field(default_factory=list)  # items found here
     initial_state: str = ""  # filled during initialization
-    updates: list[str] = field(default_factory=list)
+    state: str = ""  # one-line current state, replaced by each simulation
+    updates: UpdateLog = field(default_factory=UpdateLog)
 
+    def __post_init__(self):
+        self.name = sys.intern(self.name)
+        self.type = sys.intern(self.type)
+        self.adjacent = intern_all(self.adjacent)
+        self.inventory = intern_all(self.inventory)
 
-@dataclass
+    @property
+    def current_state(self) -> str:
+        """The latest simulated state, or the initial one before any simulation."""
+        return self.state or self.initial_state
+
+
+@dataclass(slots=True)
 class NarrativeArc:
     """A narrative arc representing an ongoing problem or situation in the world."""
 
@@ -41,8 +140,11 @@ class NarrativeArc:
     resolved: bool = False
     resolution_outcome: str = ""  # how it was resolved, if resolved
 
+    def __post_init__(self):
+        self.name = sys.intern(self.name)
 
-@dataclass
+
+@dataclass(slots=True)
 class PlayerCharacter:
     """The player's character."""
 
@@ -52,13 +154,180 @@ class PlayerCharacter:
     location: str = ""  # name of the Place they're in
     inventory: list[str] = field(default_factory=list)  # items they carry
 
+    def __post_init__(self):
+        self.name = sys.intern(self.name)
+        self.location = sys.intern(self.location)
+        self.inventory = intern_all(self.inventory)
+
 
 @dataclass
 class GameWorld:
-    """The complete game world state."""
+    """The complete game world state.
+
+    The lists keep entities in creation order. Name, location, and item
+    indexes are maintained alongside them, so changes to a location or an
+    inventory should go through the methods below rather than mutating the
+    entities directly. Call reindex() after any direct edits.
+
+    version changes on every mutation, so anything derived from the world can
+    be cached against it. Versions are never reused, even across worlds. Code
+    that edits fields directly (the clock, updates, arcs) must call touch().
+    """
 
     situation: str
     characters: list[Character] = field(default_factory=list)
     places: list[Place] = field(default_factory=list)
     narrative_arcs: list[NarrativeArc] = field(default_factory=list)
     player: PlayerCharacter = None
+    clock: int = 0  # minutes of in-game time since the world was created
+    arc_index: ArcIndex = field(default_factory=ArcIndex, repr=False, compare=False)
+    history: HistoryIndex = field(
+        default_factory=HistoryIndex, repr=False, compare=False
+    )
+    characters_by_name: dict[str, Character] = field(
+        init=False, repr=False, compare=False
+    )
+    places_by_name: dict[str, Place] = field(init=False, repr=False, compare=False)
+    arcs_by_name: dict[str, NarrativeArc] = field(
+        init=False, repr=False, compare=False
+    )
+    # place name -> names of characters there (dict used as an ordered set)
+    characters_by_location: dict[str, dict[str, None]] = field(
+        init=False, repr=False, compare=False
+    )
+    # item -> names of characters, places, or the player holding it
+    item_holders: dict[str, dict[str, None]] = field(
+        init=False, repr=False, compare=False
+    )
+    version: int = field(default=0, init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self.reindex()
+
+    def touch(self) -> None:
+        """Mark the world as changed, invalidating anything cached against it."""
+        self.version = next(_versions)
+
+    def reindex(self) -> None:
+        """Rebuild every index from the entity lists."""
+        self.touch()
+        self.characters_by_name = {c.name: c for c in self.characters}
+        self.places_by_name = {p.name: p for p in self.places}
+        self.arcs_by_name = {arc.name: arc for arc in self.narrative_arcs}
+        self.characters_by_location = {}
+        self.item_holders = {}
+        for character in self.characters:
+            self._index_location(character)
+            self._index_inventory(character)
+        for place in self.places:
+            self._index_inventory(place)
+        if self.player is not None:
+            self._index_inventory(self.player)
+
+    def _index_location(self, character: Character) -> None:
+        if character.location:
+            names = self.characters_by_location.setdefault(character.location, {})
+            names[character.name] = None
+
+    def _index_inventory(self, holder) -> None:
+        for item in holder.inventory:
+            self.item_holders.setdefault(item, {})[holder.name] = None
+
+    def _unindex_item(self, holder_name: str, item: str) -> None:
+        holders = self.item_holders.get(item)
+        if holders is not None:
+            holders.pop(holder_name, None)
+            if not holders:
+                del self.item_holders[item]
+
+    # --- Lookups ---
+
+    def get_character(self, name: str) -> Character | None:
+        """Return the character with this name, if any."""
+        return self.characters_by_name.get(name)
+
+    def get_place(self, name: str) -> Place | None:
+        """Return the place with this name, if any."""
+        return self.places_by_name.get(name)
+
+    def get_arc(self, name: str) -> NarrativeArc | None:
+        """Return the narrative arc with this name, if any."""
+        return self.arcs_by_name.get(name)
+
+    def get_holder(self, name: str):
+        """Return the player, character, or place with this name, if any."""
+        if self.player is not None and self.player.name == name:
+            return self.player
+        return self.characters_by_name.get(name) or self.places_by_name.get(name)
+
+    def characters_at(self, place_name: str) -> list[Character]:
+        """Return the characters currently at a place."""
+        names = self.characters_by_location.get(place_name, {})
+        return [self.characters_by_name[name] for name in names]
+
+    def holders_of(self, item: str) -> list[str]:
+        """Return the names of everything holding an item."""
+        return list(self.item_holders.get(item, {}))
+
+    # --- Mutations ---
+
+    def add_character(self, character: Character) -> None:
+        """Add a character and index it."""
+        self.characters.append(character)
+        self.characters_by_name[character.name] = character
+        self._index_location(character)
+        self._index_inventory(character)
+        self.touch()
+
+    def add_place(self, place: Place) -> None:
+        """Add a place and index it."""
+        self.places.append(place)
+        self.places_by_name[place.name] = place
+        self._index_inventory(place)
+        self.touch()
+
+    def add_arc(self, arc: NarrativeArc) -> None:
+        """Add a narrative arc and index it."""
+        self.narrative_arcs.append(arc)
+        self.arcs_by_name[arc.name] = arc
+        self.arc_index.add(arc)
+        self.touch()
+
+    def move_character(self, character: Character, place_name: str) -> None:
+        """Move a character to another place, keeping the location index current."""
+        names = self.characters_by_location.get(character.location)
+        if names is not None:
+            names.pop(character.name, None)
+            if not names:
+                del self.characters_by_location[character.location]
+        character.location = sys.intern(place_name)
+        self._index_location(character)
+        self.touch()
+
+    def add_item(self, holder_name: str, item: str) -> None:
+        """Put an item in a holder's inventory."""
+        holder = self.get_holder(holder_name)
+        if holder is None:
+            raise KeyError(f"No character, place, or player named {holder_name!r}")
+        item = sys.intern(item)
+        holder.inventory.append(item)
+        self.item_holders.setdefault(item, {})[holder.name] = None
+        self.touch()
+
+    def remove_item(self, holder_name: str, item: str) -> bool:
+        """Take an item out of a holder's inventory. Returns False if absent."""
+        holder = self.get_holder(holder_name)
+        if holder is None or item not in holder.inventory:
+            return False
+        holder.inventory.remove(item)
+        if item not in holder.inventory:
+            self._unindex_item(holder.name, item)
+        self.touch()
+        return True
+
+    def transfer_item(self, item: str, from_name: str, to_name: str) -> bool:
+        """Move an item between holders. Returns False if the giver lacks it."""
+        if self.get_holder(to_name) is None or not self.remove_item(from_name, item):
+            return False
+        self.add_item(to_name, item)
+        return True
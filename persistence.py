@@ -0,0 +1,165 @@
+"""
+Save and resume for PEACE_COM sessions.
+
+A save file is a single compact JSON document holding the GameWorld, its
+narrative arcs, the session history index, and the messages list. Entities
+are stored as positional arrays to keep files small and loads fast. The
+format is versioned so old saves can be rejected cleanly.
+"""
+
+import json
+import os
+
+from models import (
+    Character,
+    Place,
+    NarrativeArc,
+    PlayerCharacter,
+    GameWorld,
+    UpdateLog,
+)
+
+SAVE_FORMAT_VERSION = 2
+
+
+def encode_updates(updates: UpdateLog) -> list:
+    return [list(updates.offsets), updates.texts]
+
+
+def decode_updates(data: list) -> UpdateLog:
+    updates = UpdateLog()
+    for clock, text in zip(*data):
+        updates.append(clock, text)
+    return updates
+
+
+def encode_character(c: Character) -> list:
+    return [
+        c.name,
+        c.role,
+        c.location,
+        c.inventory,
+        c.initial_state,
+        c.state,
+        encode_updates(c.updates),
+    ]
+
+
+def decode_character(data: list) -> Character:
+    name, role, location, inventory, initial_state, state, updates = data
+    return Character(
+        name=name,
+        role=role,
+        location=location,
+        inventory=inventory,
+        initial_state=initial_state,
+        state=state,
+        updates=decode_updates(updates),
+    )
+
+
+def encode_place(p: Place) -> list:
+    return [
+        p.name,
+        p.type,
+        p.adjacent,
+        p.inventory,
+        p.initial_state,
+        p.state,
+        encode_updates(p.updates),
+    ]
+
+
+def decode_place(data: list) -> Place:
+    name, type_, adjacent, inventory, initial_state, state, updates = data
+    return Place(
+        name=name,
+        type=type_,
+        adjacent=adjacent,
+        inventory=inventory,
+        initial_state=initial_state,
+        state=state,
+        updates=decode_updates(updates),
+    )
+
+
+def encode_arc(a: NarrativeArc) -> list:
+    return [
+        a.name,
+        a.problem,
+        a.stakes,
+        a.resolution_criteria,
+        a.possible_resolutions,
+        a.resolved,
+        a.resolution_outcome,
+    ]
+
+
+def decode_arc(data: list) -> NarrativeArc:
+    return NarrativeArc(*data)
+
+
+def encode_player(p: PlayerCharacter) -> list:
+    return [p.name, p.skill, p.fatal_flaw, p.location, p.inventory]
+
+
+def decode_player(data: list) -> PlayerCharacter:
+    return PlayerCharacter(*data)
+
+
+def encode_world(world: GameWorld) -> dict:
+    """Encode a world as JSON-ready data."""
+    return {
+        "situation": world.situation,
+        "clock": world.clock,
+        "player": encode_player(world.player),
+        "characters": [encode_character(c) for c in world.characters],
+        "places": [encode_place(p) for p in world.places],
+        "arcs": [encode_arc(a) for a in world.narrative_arcs],
+        "history": [[e.kind, e.text, e.clock] for e in world.history.entries],
+    }
+
+
+def decode_world(data: dict) -> GameWorld:
+    """Rebuild a world, and all of its indexes, from encoded data."""
+    world = GameWorld(
+        situation=data["situation"],
+        characters=[decode_character(c) for c in data["characters"]],
+        places=[decode_place(p) for p in data["places"]],
+        player=decode_player(data["player"]),
+        clock=data["clock"],
+    )
+    for arc in data["arcs"]:
+        world.add_arc(decode_arc(arc))
+    for kind, text, clock in data["history"]:
+        world.history.add(kind, text, clock)
+    return world
+
+
+def save_session(
+    path: str, world: GameWorld, messages: list[dict], turn: int = 0
+) -> None:
+    """Write a session to disk atomically."""
+    data = {
+        "version": SAVE_FORMAT_VERSION,
+        "turn": turn,
+        "world": encode_world(world),
+        "messages": messages,
+    }
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w") as f:
+        json.dump(data, f, separators=(",", ":"))
+    os.replace(temp_path, path)
+
+
+def load_session(path: str) -> tuple[GameWorld, list[dict], int]:
+    """Load a session saved by save_session. Returns (world, messages, turn)."""
+    with open(path) as f:
+        data = json.load(f)
+    version = data.get("version")
+    if version != SAVE_FORMAT_VERSION:
+        raise ValueError(
+            f"Unsupported save format version {version} "
+            f"(expected {SAVE_FORMAT_VERSION})"
+        )
+    return decode_world(data["world"]), data["messages"], data["turn"]
@@ -0,0 +1,61 @@
+"""
+PEACE_COM world pool generator.
+
+Fills the local world pool with ready-to-play worlds so new games can start
+without waiting on world generation.
+
+Usage: python pool.py [--target N] [--directory DIR] [--stats]
+"""
+
+import argparse
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from config import WORLD_POOL_DIR, WORLD_POOL_TARGET, WORLD_POOL_MAX_SIMILARITY
+from game import initialize_world, start_session
+from world_pool import WorldPool
+
+
+def refill(pool: WorldPool, target: int, max_attempts: int) -> int:
+    """Generate worlds until the pool holds target worlds. Returns how many were added."""
+    pool.prune()
+    added = 0
+    attempts = 0
+    while len(pool) < target and attempts < max_attempts:
+        attempts += 1
+        world = initialize_world()
+        similarity = pool.max_similarity(world.situation)
+        if similarity > WORLD_POOL_MAX_SIMILARITY:
+            print(f"[Discarding world: {similarity:.0%} similar to a pooled one]")
+            continue
+        messages = start_session(world)
+        path = pool.add(world, messages)
+        added += 1
+        print(f"[Pooled world {path}]")
+    return added
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fill the PEACE_COM world pool")
+    parser.add_argument("--target", type=int, default=WORLD_POOL_TARGET)
+    parser.add_argument("--directory", default=WORLD_POOL_DIR)
+    parser.add_argument("--stats", action="store_true", help="only print pool stats")
+    args = parser.parse_args()
+
+    pool = WorldPool(args.directory)
+    if not args.stats:
+        if not pool.acquire_refill_lock():
+            print("[Another refill is already running]")
+            return
+        try:
+            refill(pool, args.target, max_attempts=args.target * 3)
+        finally:
+            pool.release_refill_lock()
+    for key, value in pool.stats().items():
+        print(f"{key}: {value:.2f}" if isinstance(value, float) else f"{key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""
+Speculative prefetch for PEACE_COM.
+
+While the player is typing, the process would otherwise sit idle. A
+Prefetcher spends that time on calls the next turn will probably make, such
+as the feasibility check for a likely action, at background priority. Each
+result goes into a short-lived cache keyed on the world version it was
+computed from. A turn that finds its answer there skips the call, and the
+world's next change makes every older entry unreachable.
+"""
+
+import contextvars
+import threading
+import time
+from concurrent.futures import Future, wait
+from typing import Callable, Hashable
+
+from config import (
+    PREFETCH_ACTIONS,
+    PREFETCH_TTL_SECONDS,
+    PREFETCH_MAX_ENTRIES,
+    PREFETCH_WAIT_SECONDS,
+)
+from metrics import registry
+from models import GameWorld
+
+prefetch_lookups = registry.counter(
+    "peace_com_prefetch_lookups_total",
+    "Turn lookups of speculatively prefetched results",
+    ("kind", "outcome"),
+)
+
+
+def normalize_action(action: str) -> str:
+    """The form actions are matched in, so 'Look around.' finds 'look around'."""
+    return " ".join(action.lower().split()).rstrip(".!")
+
+
+def likely_actions(world: GameWorld, limit: int) -> list[str]:
+    """The actions the player is most likely to try next, best guess first."""
+    here = world.get_place(world.player.location)
+    actions = list(PREFETCH_ACTIONS)
+    actions += [f"talk to {c.name}" for c in world.characters_at(world.player.location)]
+    actions += [f"go to {name}" for name in (here.adjacent if here else [])]
+    unique: dict[str, str] = {}
+    for action in actions:
+        unique.setdefault(normalize_action(action), action)
+    return list(unique.values())[:limit]
+
+
+class PrefetchCache:
+    """Futures for speculative results, dropped after ttl seconds.
+
+    Keys should include everything a result depends on, usually a kind, the
+    world version, and the normalized action. Entries start as running
+    futures, so a turn can use a prefetch that is nearly done instead of
+    repeating it. It waits at most wait_seconds, since a background-priority
+    call may not get a slot until the turn's own calls are finished.
+    """
+
+    def __init__(
+        self,
+        ttl: float = PREFETCH_TTL_SECONDS,
+        max_entries: int = PREFETCH_MAX_ENTRIES,
+        wait_seconds: float = PREFETCH_WAIT_SECONDS,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.wait_seconds = wait_seconds
+        self.lock = threading.Lock()
+        self.entries: dict[Hashable, tuple[float, Future]] = {}
+
+    def _prune(self, now: float) -> None:
+        expired = [key for key, (expires, _) in self.entries.items() if expires <= now]
+        for key in expired:
+            del self.entries[key]
+        # Oldest first, since dicts keep insertion order
+        while len(self.entries) > self.max_entries:
+            del self.entries[next(iter(self.entries))]
+
+    def reserve(self, key: Hashable) -> Future | None:
+        """A new future to fill for key, or None if one is already cached."""
+        now = time.monotonic()
+        with self.lock:
+            self._prune(now)
+            if key in self.entries:
+                return None
+            future = Future()
+            self.entries[key] = (now + self.ttl, future)
+            self._prune(now)
+            return future
+
+    def take(self, key: Hashable):
+        """Remove and return the result for key, or None if there isn't one.
+
+        Waits up to wait_seconds if the prefetch is still running. One that
+        doesn't finish in time, or that failed, counts as a miss, so the
+        caller just makes the call itself.
+        """
+        with self.lock:
+            self._prune(time.monotonic())
+            entry = self.entries.pop(key, None)
+        kind = key[0] if isinstance(key, tuple) else "other"
+        if entry is None:
+            prefetch_lookups.inc(kind=kind, outcome="miss")
+            return None
+        future = entry[1]
+        if not wait([future], timeout=self.wait_seconds).done:
+            prefetch_lookups.inc(kind=kind, outcome="pending")
+            return None
+        try:
+            result = future.result()
+        except Exception:
+            prefetch_lookups.inc(kind=kind, outcome="failed")
+            return None
+        prefetch_lookups.inc(kind=kind, outcome="hit")
+        return result
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self) -> int:
+        with self.lock:
+            self._prune(time.monotonic())
+            return len(self.entries)
+
+
+# Shared by every session; world versions never repeat, so keys can't collide
+prefetch_cache = PrefetchCache()
+
+# A task is a cache key and a function that reads whatever it needs from the
+# world and returns the call to make. Only the reads happen under the lock.
+PrefetchTask = tuple[Hashable, Callable[[], Callable[[], object]]]
+
+
+class Prefetcher:
+    """Runs prefetch tasks in order on a background thread until cancelled.
+
+    The thread runs in a copy of the starting thread's context, so usage is
+    charged to whichever ledger was active when start() was called.
+    """
+
+    def __init__(
+        self, tasks: list[PrefetchTask], cache: PrefetchCache = prefetch_cache
+    ):
+        self.tasks = tasks
+        self.cache = cache
+        self.cancelled = threading.Event()
+        # Held while a task reads the world, so cancel() can wait those out
+        self.lock = threading.Lock()
+        self.thread: threading.Thread | None = None
+
+    def start(self) -> "Prefetcher":
+        context = contextvars.copy_context()
+        self.thread = threading.Thread(
+            target=context.run, args=(self._run,), name="prefetch", daemon=True
+        )
+        self.thread.start()
+        return self
+
+    def _run(self) -> None:
+        for key, prepare in self.tasks:
+            with self.lock:
+                if self.cancelled.is_set():
+                    return
+                future = self.cache.reserve(key)
+                if future is None:
+                    continue
+                try:
+                    call = prepare()
+                except Exception as error:
+                    future.set_exception(error)
+                    continue
+            # The call itself runs unlocked; its result stays useful after a
+            # cancel, as long as the world hasn't changed
+            try:
+                future.set_result(call())
+            except Exception as error:
+                future.set_exception(error)
+
+    def cancel(self) -> None:
+        """Start no more tasks. Returns once the world is no longer being read."""
+        self.cancelled.set()
+        with self.lock:
+            pass
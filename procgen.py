@@ -0,0 +1,330 @@
+"""
+Procedural world generation for PEACE_COM.
+
+Table-driven generator for Sector 7 of Luna Station Omega. It builds the
+same entities, states, player character, and arcs the LLM would, instantly
+and with no network, from hand-written vocabularies. Output uses the
+schemas.py response models, so it drops into initialize_world wherever an
+LLM response would go.
+"""
+
+import itertools
+import random
+
+from schemas import (
+    CharacterSchema,
+    PlaceSchema,
+    WorldEntitiesResponse,
+    PlayerCharacterResponse,
+    NarrativeArcSchema,
+    NarrativeArcsResponse,
+)
+
+# Place type -> (names, items found there, what the place feels like)
+PLACE_TABLE = {
+    "synthwave tavern": (
+        ["The Rusty Pickaxe", "Neon Anvil Taproom", "The Low-G Lounge"],
+        ["moonshine flask", "jukebox token", "cracked ale mug"],
+        ["a synth ballad drowns out nervous whispers", "miners drink in silence"],
+    ),
+    "black market bazaar": (
+        ["Crater Row Bazaar", "The Undervault Market", "Shadowdome Exchange"],
+        ["stolen datachip", "forged permit", "crate of ore"],
+        ["hagglers shout over flickering holo-signs", "stalls close as drones pass"],
+    ),
+    "abandoned mining tunnel": (
+        ["Shaft 9", "The Old Deepcut", "Collapsed Vein 4"],
+        ["rusted drill bit", "dead headlamp", "ore sample"],
+        ["dust drifts in the low gravity", "something scrapes deep in the dark"],
+    ),
+    "forgotten server room": (
+        ["Archive Node Theta", "The Cold Stacks", "Relay Room 12"],
+        ["magnetic tape reel", "access keycard", "burnt circuit board"],
+        ["dead terminals hum back to life", "coolant fog rolls over the floor"],
+    ),
+    "docking bay": (
+        ["Bay 3 Airlock", "Freight Dock Kappa", "The Ore Barge Pier"],
+        ["cargo manifest", "vacuum suit", "mag-clamp"],
+        ["a freighter vents steam into the dome", "loaders idle behind a lockdown"],
+    ),
+    "hydroponics dome": (
+        ["Greenhouse Sigma", "The Moss Gardens", "Verdant Dome 2"],
+        ["nutrient canister", "pruning shears", "seed vial"],
+        ["grow lamps cast everything violet", "wilting vines drip on the walkway"],
+    ),
+    "elven data shrine": (
+        ["Shrine of the Silver Signal", "The Lumen Archive", "Starlight Node"],
+        ["crystal datashard", "incense cartridge", "runed modem"],
+        ["chanting loops through old speakers", "holograms of elders flicker"],
+    ),
+    "ore refinery": (
+        ["Smelter Deep", "Ironhold Refinery", "The Slag Works"],
+        ["heat-proof gloves", "ingot of moonsteel", "pressure gauge"],
+        ["furnaces roar behind blast glass", "alarms blink but nobody answers"],
+    ),
+}
+
+# Role -> (items they carry, what they might be doing right now)
+ROLE_TABLE = {
+    "ore smuggler": (
+        ["crowbar", "hidden ore pouch", "fake manifest"],
+        ["counting ore behind a crate", "bribing a dock guard"],
+    ),
+    "corporate enforcer": (
+        ["stun baton", "company badge", "riot visor"],
+        ["questioning a frightened miner", "scanning the crowd for faces"],
+    ),
+    "elven netrunner": (
+        ["cyberdeck", "neural jack", "datachip"],
+        ["jacked into a wall terminal", "muttering code under their breath"],
+    ),
+    "dwarven foreman": (
+        ["plasma cutter", "shift ledger", "hard hat"],
+        ["shouting orders at an empty crew", "inspecting a cracked support beam"],
+    ),
+    "bartender": (
+        ["shotgun", "bar rag", "ledger of debts"],
+        ["polishing the same glass for an hour", "listening to every rumor"],
+    ),
+    "back-alley medic": (
+        ["stim injector", "bone saw", "bandage roll"],
+        ["stitching up a bleeding miner", "haggling over painkillers"],
+    ),
+    "syndicate fixer": (
+        ["encrypted pager", "bundle of credits", "silenced pistol"],
+        ["waiting for a contact who is late", "arranging a quiet deal"],
+    ),
+    "drifter": (
+        ["moonshine", "lucky coin", "tattered map"],
+        ["sleeping off a hangover", "watching the door nervously"],
+    ),
+}
+
+# Roles that make a good antagonist; at least one character gets one
+ANTAGONIST_ROLES = ["corporate enforcer", "syndicate fixer", "ore smuggler"]
+
+FIRST_NAMES = [
+    "Grimbold", "Ithilwen", "Brokk", "Saelith", "Dagna", "Vex", "Torvin",
+    "Lirael", "Maz", "Orla", "Kestrel", "Durin", "Nyx", "Faelar", "Rook",
+]
+SURNAMES = [
+    "Ironvein", "Starwhisper", "Deepdelve", "Voss", "Coldforge", "Silverline",
+    "Kade", "Ashmantle", "Moonfall", "Rask",
+]
+
+SKILLS = [
+    "lockpicking", "hacking terminals", "fast talking", "demolitions",
+    "zero-g brawling", "reading people", "piloting ore barges", "field medicine",
+]
+FLAWS = [
+    "greed", "crippling debt", "a hot temper", "blind loyalty",
+    "moonshine habit", "can't resist a bet", "wanted by the corps", "trusts too easily",
+]
+STARTING_ITEMS = [
+    "flashlight", "multitool", "credit chip", "rebreather", "switchblade",
+]
+
+# Situation pieces: "{calamity} {event} {target}, and {consequence}."
+CALAMITIES = [
+    "A reactor coolant leak", "A rogue mining AI", "A syndicate data heist",
+    "A dome breach", "A vanished ore shipment", "A plague of nanite rust",
+]
+EVENTS = ["has crippled", "has locked down", "has set off a panic in", "threatens"]
+TARGETS = [
+    "the lower tunnels of Sector 7", "Sector 7's main dome",
+    "the sector's air supply", "the Ironhold mining corp", "the elven relay network",
+]
+CONSEQUENCES = [
+    "everyone suspects the elves", "the corps have sealed the exits",
+    "looters are already moving in", "the air scrubbers have hours left",
+    "a bounty has been posted for whoever is responsible",
+]
+
+# Arc templates, filled with names from the world
+ARC_TEMPLATES = [
+    (
+        "Find the Culprit",
+        "Someone in {place} knows who caused the crisis, and {antagonist} wants "
+        "them silenced.",
+        "Expose the truth and earn the sector's trust, or be blamed yourself.",
+        "The person responsible is identified and confronted.",
+        ["interrogate {antagonist}", "search {place} for evidence", "bribe a witness"],
+    ),
+    (
+        "The Missing Cargo",
+        "A crate that could fix the crisis has vanished somewhere near {place}.",
+        "Recover it for a fortune, or watch the sector fall apart.",
+        "The cargo is found and delivered or destroyed.",
+        ["track the smugglers", "hack the dock manifests", "cut a deal with {ally}"],
+    ),
+    (
+        "Debt Comes Due",
+        "{antagonist} claims {player} owes them, and wants payment tonight.",
+        "Clear the debt and walk free, or lose everything you carry.",
+        "The debt is paid, cancelled, or {antagonist} is dealt with.",
+        ["pay in stolen ore", "turn {ally} against them", "skip out on the debt"],
+    ),
+]
+
+# Opening scene used by offline mode
+OPENING_TEMPLATE = (
+    "{place_mood}, here in {place}. {situation} "
+    "{player}, what do you do?"
+)
+
+
+def roman(number: int) -> str:
+    """Roman numeral for a positive integer, for telling namesakes apart."""
+    numerals = [
+        (1000, "M"), (900, "CM"), (500, "D"), (400, "CD"), (100, "C"), (90, "XC"),
+        (50, "L"), (40, "XL"), (10, "X"), (9, "IX"), (5, "V"), (4, "IV"), (1, "I"),
+    ]
+    result = ""
+    for value, numeral in numerals:
+        count, number = divmod(number, value)
+        result += numeral * count
+    return result
+
+
+class ProceduralGenerator:
+    """Builds world content from the tables above. Seed it for repeatable worlds."""
+
+    def __init__(self, seed: int | None = None):
+        self.rng = random.Random(seed)
+
+    def situation(self) -> str:
+        rng = self.rng
+        return (
+            f"{rng.choice(CALAMITIES)} {rng.choice(EVENTS)} {rng.choice(TARGETS)}, "
+            f"and {rng.choice(CONSEQUENCES)}."
+        )
+
+    def name(self, taken: set[str]) -> str:
+        """A character name not already in taken.
+
+        Once the first name and surname pairings run short, names get a
+        numeral ("Vex Kade II"), so any number of characters can be named.
+        """
+        pairings = len(FIRST_NAMES) * len(SURNAMES)
+        for generation in itertools.count(1):
+            suffix = f" {roman(generation)}" if generation > 1 else ""
+            for _ in range(pairings):
+                base = f"{self.rng.choice(FIRST_NAMES)} {self.rng.choice(SURNAMES)}"
+                name = base + suffix
+                if name not in taken:
+                    taken.add(name)
+                    return name
+
+    def entities(
+        self, num_places: int = 3, num_characters: int = 3
+    ) -> WorldEntitiesResponse:
+        """Places, then characters placed in them; the first is an antagonist.
+
+        Each place is a different type from PLACE_TABLE, so num_places can be
+        at most len(PLACE_TABLE). Raises ValueError outside 1 to that.
+        """
+        if not 1 <= num_places <= len(PLACE_TABLE):
+            raise ValueError(
+                f"Procedural worlds have 1 to {len(PLACE_TABLE)} places, "
+                f"not {num_places}"
+            )
+        rng = self.rng
+        place_types = rng.sample(list(PLACE_TABLE), num_places)
+        places = []
+        for place_type in place_types:
+            names, items, _ = PLACE_TABLE[place_type]
+            places.append(
+                PlaceSchema(
+                    name=rng.choice(names),
+                    type=place_type,
+                    inventory=rng.sample(items, rng.randint(1, 2)),
+                )
+            )
+
+        roles = [rng.choice(ANTAGONIST_ROLES)]
+        roles += [rng.choice(list(ROLE_TABLE)) for _ in range(num_characters - 1)]
+        taken: set[str] = set()
+        characters = [
+            CharacterSchema(
+                name=self.name(taken),
+                role=role,
+                location=rng.choice(places).name,
+                inventory=rng.sample(ROLE_TABLE[role][0], rng.randint(1, 2)),
+            )
+            for role in roles[:num_characters]
+        ]
+        return WorldEntitiesResponse(characters=characters, places=places)
+
+    def adjacency(self, place_names: list[str]) -> dict[str, list[str]]:
+        """Connect the places in a random chain, plus one shortcut if there's room."""
+        order = list(place_names)
+        self.rng.shuffle(order)
+        edges = set(zip(order, order[1:]))
+        if len(order) > 3:
+            a, b = self.rng.sample(order, 2)
+            edges.add((a, b))
+        adjacent: dict[str, list[str]] = {name: [] for name in place_names}
+        for a, b in edges:
+            if b not in adjacent[a]:
+                adjacent[a].append(b)
+                adjacent[b].append(a)
+        return adjacent
+
+    def character_state(self, name: str, role: str, location: str) -> str:
+        """A one-sentence initial state, like ENTITY_STATE_PROMPT returns."""
+        activities = ROLE_TABLE.get(role, ROLE_TABLE["drifter"])[1]
+        return f"{name} is {self.rng.choice(activities)} in {location}."
+
+    def place_state(self, place_type: str) -> str:
+        moods = PLACE_TABLE.get(place_type, PLACE_TABLE["synthwave tavern"])[2]
+        mood = self.rng.choice(moods)
+        return f"{mood[0].upper()}{mood[1:]}."
+
+    def player(
+        self, place_names: list[str], taken: set[str] = frozenset()
+    ) -> PlayerCharacterResponse:
+        """A player character starting in one of the places, named unlike taken."""
+        rng = self.rng
+        return PlayerCharacterResponse(
+            name=self.name(set(taken)),
+            skill=rng.choice(SKILLS),
+            fatal_flaw=rng.choice(FLAWS),
+            location=rng.choice(place_names),
+            inventory=rng.sample(STARTING_ITEMS, 2),
+        )
+
+    def arcs(
+        self,
+        player: str,
+        place_names: list[str],
+        character_names: list[str],
+        count: int = 2,
+    ) -> NarrativeArcsResponse:
+        """Arcs from the templates, naming the world's own places and people."""
+        rng = self.rng
+        antagonist = character_names[0] if character_names else "a corporate enforcer"
+        ally = character_names[-1] if len(character_names) > 1 else "an old friend"
+        fields = {"player": player, "antagonist": antagonist, "ally": ally}
+
+        arcs = []
+        for name, problem, stakes, criteria, ideas in rng.sample(
+            ARC_TEMPLATES, min(count, len(ARC_TEMPLATES))
+        ):
+            fields["place"] = rng.choice(place_names)
+            arcs.append(
+                NarrativeArcSchema(
+                    name=name,
+                    problem=problem.format(**fields),
+                    stakes=stakes.format(**fields),
+                    resolution_criteria=criteria.format(**fields),
+                    possible_resolutions=[idea.format(**fields) for idea in ideas],
+                )
+            )
+        return NarrativeArcsResponse(arcs=arcs)
+
+    def opening(self, situation: str, player: str, place: str, place_type: str) -> str:
+        """The opening message, for when even that should not cost a call."""
+        mood = self.place_state(place_type).rstrip(".")
+        return OPENING_TEMPLATE.format(
+            place_mood=mood, place=place, situation=situation, player=player
+        )
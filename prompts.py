@@ -157,8 +157,14 @@ CHARACTER:
 Name: {name}
 Role: {role}
 Location: {location}
+Carrying: {inventory}
 Current state: {current_state}
 
+AROUND THEM:
+People here: {people_here}
+Items here: {items_here}
+Places they can go: {destinations}
+
 TIME PASSING: {time_elapsed}
 
 What does {name} do during this time? Focus on actions that might affect the world or other characters.
@@ -170,7 +176,18 @@ CRITICAL: The action MUST be realistic for the time elapsed!
 - 8 hours: They can complete major work, travel far, sleep
 If the time is short, the action should be proportionally small or a continuation of what they were doing.
 
-BE EXTREMELY BRIEF: One sentence only."""
+Respond with JSON in this exact format:
+{{
+    "action": "what they do, one sentence",
+    "moved_to": "a place they can go, or null if they stay",
+    "items_given": [{{"item": "something they carry", "other": "a person here, or the place to leave it in"}}],
+    "items_taken": [{{"item": "an item here", "other": "the person or place it came from"}}],
+    "new_state": "their state now, one short line"
+}}
+
+Only use the names and items listed above. Usually nobody moves and nothing changes hands, so leave those empty.
+
+BE EXTREMELY BRIEF: One sentence each for action and new_state."""
 
 PLACE_SIMULATION_PROMPT = """You are simulating what happens at a location during a time period.
 
@@ -180,6 +197,8 @@ SITUATION:
 PLACE:
 Name: {name}
 Type: {type}
+Items here: {inventory}
+People here: {people_here}
 Current state: {current_state}
 
 TIME PASSING: {time_elapsed}
@@ -193,7 +212,17 @@ CRITICAL: The change MUST be realistic for the time elapsed!
 - 8 hours: Major transitions - day/night cycle, complete crowd turnover, repairs completed
 If the time is short, changes should be subtle or nothing significant happens.
 
-BE EXTREMELY BRIEF: One sentence only."""
+Respond with JSON in this exact format:
+{{
+    "event": "what changes here, one sentence",
+    "items_added": ["an item that turns up here"],
+    "items_removed": ["an item here that is used up or destroyed"],
+    "new_state": "its state now, one short line"
+}}
+
+The people listed are simulated separately, so don't move them or their belongings. Usually no items change, so leave those empty.
+
+BE EXTREMELY BRIEF: One sentence each for event and new_state."""
 
 # =============================================================================
 # NARRATIVE ARC PROMPTS
@@ -254,6 +283,49 @@ Respond with JSON:
 
 Include ALL active arcs in your response. BE BRIEF."""
 
+# =============================================================================
+# COMBINED ADJUDICATION PROMPT
+# =============================================================================
+
+ADJUDICATION_PROMPT = """You are the Game Master for a text-based dungeon crawler.
+
+CURRENT WORLD STATE:
+{world_context}
+
+ACTIVE NARRATIVE ARCS:
+{arcs_summary}
+
+THE PLAYER'S ACTION:
+{player_action}
+
+Adjudicate this action in one pass:
+1. Is this action feasible given the world state?
+2. Does the player's fatal flaw ({fatal_flaw}) interfere?
+3. Is there an immediate interruption from the environment or NPCs?
+4. Should dice be rolled? (If so, roll them and report the result)
+5. How many in-game minutes does the action take?
+6. Does the outcome resolve any active arc? An arc is resolved when its resolution criteria are met - either successfully or through failure.
+
+Respond with JSON:
+{{
+    "feasible": true/false,
+    "immediate_interruption": "description of interruption, or null if none",
+    "flaw_triggered": true/false,
+    "flaw_effect": "how the flaw affects this, or null if not triggered",
+    "dice_roll": {{"needed": true/false, "result": 1-20, "success": true/false}},
+    "initial_outcome": "One sentence: what happens immediately when the player tries this",
+    "duration_minutes": 5,
+    "resolutions": [
+        {{
+            "arc_name": "name of arc",
+            "resolved": true/false,
+            "resolution_outcome": "how it was resolved (1 sentence), or null if not resolved"
+        }}
+    ]
+}}
+
+Include ALL active arcs in resolutions. BE BRIEF."""
+
 # =============================================================================
 # GAME SYSTEM PROMPT
 # =============================================================================
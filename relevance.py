@@ -0,0 +1,104 @@
+"""
+Local relevance scoring for PEACE_COM.
+
+Cheap lexical matching used to decide which narrative arcs are worth sending
+to the LLM for a resolution check.
+"""
+
+import math
+import re
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset(
+    """
+    a an and are as at be been but by can could did do does for from had has
+    have he her him his how i if in into is it its me my no not of on or our
+    out she so than that the their them then there they this to up was we were
+    what when where which who will with would you your
+    """.split()
+)
+
+# How much a term counts depending on which part of the arc it came from
+FIELD_WEIGHTS = {
+    "name": 1.0,
+    "resolution_criteria": 1.0,
+    "possible_resolutions": 1.0,
+    "problem": 0.5,
+}
+
+
+def normalize_token(token: str) -> str:
+    """Reduce a token to a crude stem so plurals and simple verb forms match.
+
+    A final "e" is dropped too, so "bribe", "bribed", and "bribes" all become
+    "brib", the same stem the suffixes leave behind.
+    """
+    for suffix in ("ing", "ed", "es", "s"):
+        if len(token) > len(suffix) + 2 and token.endswith(suffix):
+            token = token[: -len(suffix)]
+            break
+    if len(token) > 3 and token.endswith("e"):
+        token = token[:-1]
+    return token
+
+
+def tokenize(text: str) -> list[str]:
+    """Split text into lowercase, stemmed, non-stopword tokens."""
+    return [
+        normalize_token(token)
+        for token in TOKEN_PATTERN.findall(text.lower())
+        if token not in STOPWORDS and len(token) > 1
+    ]
+
+
+class ArcIndex:
+    """Inverted index over the vocabulary of narrative arcs.
+
+    Each arc is indexed once, the first time it is seen. Scoring a piece of
+    text is then a lookup per query term rather than a scan over every arc.
+    """
+
+    def __init__(self):
+        self.postings: dict[str, dict[str, float]] = {}
+        self.indexed: set[str] = set()
+
+    def add(self, arc) -> None:
+        """Index an arc's name, problem, and resolution text."""
+        if arc.name in self.indexed:
+            return
+        self.indexed.add(arc.name)
+
+        fields = {
+            "name": arc.name,
+            "resolution_criteria": arc.resolution_criteria,
+            "possible_resolutions": " ".join(arc.possible_resolutions),
+            "problem": arc.problem,
+        }
+        weights: dict[str, float] = {}
+        for field_name, text in fields.items():
+            for term in set(tokenize(text)):
+                weight = max(weights.get(term, 0.0), FIELD_WEIGHTS[field_name])
+                weights[term] = weight
+        for term, weight in weights.items():
+            self.postings.setdefault(term, {})[arc.name] = weight
+
+    def score(self, text: str) -> dict[str, float]:
+        """Score every indexed arc against the text. Unmatched arcs are omitted."""
+        total = max(len(self.indexed), 1)
+        scores: dict[str, float] = {}
+        for term in set(tokenize(text)):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + total / len(posting))
+            for arc_name, weight in posting.items():
+                scores[arc_name] = scores.get(arc_name, 0.0) + weight * idf
+        return scores
+
+    def candidates(self, arcs: list, text: str, threshold: float) -> list:
+        """Return the arcs whose score against the text exceeds the threshold."""
+        for arc in arcs:
+            self.add(arc)
+        scores = self.score(text)
+        return [arc for arc in arcs if scores.get(arc.name, 0.0) > threshold]
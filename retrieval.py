@@ -0,0 +1,78 @@
+"""
+Lexical retrieval over PEACE_COM session history.
+
+An incrementally built BM25 index over past messages, entity updates, and
+arc outcomes, so context builders can pull in the few old events relevant to
+the current action instead of carrying the whole history.
+"""
+
+import math
+from dataclasses import dataclass
+
+from relevance import tokenize
+
+# BM25 parameters
+K1 = 1.5
+B = 0.75
+
+
+@dataclass(slots=True)
+class HistoryEntry:
+    """One indexed past event."""
+
+    kind: str  # "message", "update", or "arc"
+    text: str
+    clock: int = 0  # world clock offset when it happened
+
+
+class HistoryIndex:
+    """In-memory BM25 inverted index, appended to as the session runs."""
+
+    def __init__(self):
+        self.entries: list[HistoryEntry] = []
+        self.postings: dict[str, dict[int, int]] = {}
+        self.lengths: list[int] = []
+        self.total_length = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def add(self, kind: str, text: str, clock: int = 0) -> None:
+        """Index a new event."""
+        doc_id = len(self.entries)
+        terms = tokenize(text)
+        self.entries.append(HistoryEntry(kind=kind, text=text, clock=clock))
+        self.lengths.append(len(terms))
+        self.total_length += len(terms)
+        for term in terms:
+            posting = self.postings.setdefault(term, {})
+            posting[doc_id] = posting.get(doc_id, 0) + 1
+
+    def search(
+        self, query: str, k: int = 5, kinds: tuple[str, ...] | None = None
+    ) -> list[HistoryEntry]:
+        """Return up to k past events ranked by BM25 relevance to the query."""
+        if not self.entries:
+            return []
+        count = len(self.entries)
+        average_length = self.total_length / count or 1.0
+        scores: dict[int, float] = {}
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + (count - len(posting) + 0.5) / (len(posting) + 0.5))
+            for doc_id, frequency in posting.items():
+                norm = K1 * (1 - B + B * self.lengths[doc_id] / average_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * (
+                    frequency * (K1 + 1) / (frequency + norm)
+                )
+        ranked = sorted(scores, key=lambda doc_id: (-scores[doc_id], -doc_id))
+        results = []
+        for doc_id in ranked:
+            entry = self.entries[doc_id]
+            if kinds is None or entry.kind in kinds:
+                results.append(entry)
+                if len(results) == k:
+                    break
+        return results
@@ -0,0 +1,124 @@
+"""
+Global LLM request scheduler for PEACE_COM.
+
+Every LLM call waits for a slot here. Player-facing calls (foreground) are
+always admitted ahead of background work, and background calls can never
+take the slots reserved for the foreground. The total concurrency limit
+adapts AIMD-style: it creeps up while calls are fast and is halved when the
+provider rate-limits us.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+from config import (
+    LLM_CALL_SITE_PRIORITIES,
+    LLM_INITIAL_CONCURRENCY,
+    LLM_MAX_CONCURRENCY,
+    LLM_FOREGROUND_RESERVE,
+    LLM_LATENCY_TARGET_SECONDS,
+)
+
+FOREGROUND = "foreground"
+BACKGROUND = "background"
+PRIORITIES = (FOREGROUND, BACKGROUND)
+
+
+def priority_for(call_site: str) -> str:
+    """Return the priority class for a call site (foreground if unlisted)."""
+    return LLM_CALL_SITE_PRIORITIES.get(call_site, FOREGROUND)
+
+
+def is_rate_limit(error: BaseException) -> bool:
+    """Whether an exception from the provider is a rate-limit response."""
+    return (
+        getattr(error, "status_code", None) == 429
+        or type(error).__name__ == "RateLimitError"
+    )
+
+
+class LLMScheduler:
+    """Priority admission control with an AIMD concurrency limit."""
+
+    def __init__(
+        self,
+        initial_limit: int = LLM_INITIAL_CONCURRENCY,
+        max_limit: int = LLM_MAX_CONCURRENCY,
+        foreground_reserve: int = LLM_FOREGROUND_RESERVE,
+        latency_target: float = LLM_LATENCY_TARGET_SECONDS,
+    ):
+        self.limit = float(initial_limit)
+        self.max_limit = max_limit
+        self.foreground_reserve = foreground_reserve
+        self.latency_target = latency_target
+        self.waiting = {priority: 0 for priority in PRIORITIES}
+        self.in_flight = {priority: 0 for priority in PRIORITIES}
+        self.condition = threading.Condition()
+
+    def _can_start(self, priority: str) -> bool:
+        limit = int(self.limit)
+        if sum(self.in_flight.values()) >= limit:
+            return False
+        if priority == BACKGROUND:
+            if self.waiting[FOREGROUND]:
+                return False
+            background_limit = max(limit - self.foreground_reserve, 1)
+            if self.in_flight[BACKGROUND] >= background_limit:
+                return False
+        return True
+
+    def acquire(self, priority: str) -> None:
+        """Block until a call of this priority may start."""
+        with self.condition:
+            self.waiting[priority] += 1
+            try:
+                while not self._can_start(priority):
+                    self.condition.wait()
+            finally:
+                self.waiting[priority] -= 1
+            self.in_flight[priority] += 1
+
+    def release(
+        self, priority: str, latency: float, rate_limited: bool = False
+    ) -> None:
+        """Finish a call and adapt the concurrency limit to how it went."""
+        with self.condition:
+            self.in_flight[priority] -= 1
+            if rate_limited:
+                # Multiplicative decrease
+                self.limit = max(self.limit / 2, 1.0)
+            elif latency > self.latency_target:
+                self.limit = max(self.limit * 0.9, 1.0)
+            else:
+                # Additive increase: roughly +1 per limit's worth of fast calls
+                self.limit = min(self.limit + 1 / self.limit, float(self.max_limit))
+            self.condition.notify_all()
+
+    @contextmanager
+    def slot(self, call_site: str):
+        """Hold a scheduler slot for the duration of one LLM call."""
+        priority = priority_for(call_site)
+        self.acquire(priority)
+        start = time.monotonic()
+        rate_limited = False
+        try:
+            yield
+        except BaseException as error:
+            rate_limited = is_rate_limit(error)
+            raise
+        finally:
+            self.release(priority, time.monotonic() - start, rate_limited)
+
+    def queue_depths(self) -> dict:
+        """Report waiting and in-flight calls per priority class, and the limit."""
+        with self.condition:
+            return {
+                "limit": int(self.limit),
+                "waiting": dict(self.waiting),
+                "in_flight": dict(self.in_flight),
+            }
+
+
+# Shared by every session and stage in the process
+scheduler = LLMScheduler()
@@ -86,3 +86,36 @@ class ArcResolutionResponse(BaseModel):
     """Response schema for arc resolution check."""
 
     resolutions: list[ArcResolutionSchema]
+
+
+class AdjudicationResponse(FeasibilityResponse):
+    """Response schema for the combined feasibility, time, and arc check."""
+
+    duration_minutes: int  # in-game time the action takes
+    resolutions: list[ArcResolutionSchema]
+
+
+class ItemTransferSchema(BaseModel):
+    """Schema for an item changing hands during a simulation step."""
+
+    item: str
+    other: str  # the character, place, or player on the other side
+
+
+class CharacterDeltaSchema(BaseModel):
+    """Response schema for simulating a character over a time period."""
+
+    action: str  # what they did, in one sentence
+    moved_to: str | None = None  # name of the place they went, if they moved
+    items_given: list[ItemTransferSchema] = []  # handed over or left behind
+    items_taken: list[ItemTransferSchema] = []  # picked up or received
+    new_state: str  # their state now, in one line
+
+
+class PlaceDeltaSchema(BaseModel):
+    """Response schema for simulating a place over a time period."""
+
+    event: str  # what changed here, in one sentence
+    items_added: list[str] = []  # items that turned up here
+    items_removed: list[str] = []  # items used up or destroyed here
+    new_state: str  # its state now, in one line
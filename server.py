@@ -0,0 +1,203 @@
+"""
+PEACE_COM multi-session game server.
+
+An asyncio TCP service that hosts many concurrent game sessions in one
+process. The protocol is plain text, one action per line, so any line-based
+client works:
+
+    python server.py
+    nc 127.0.0.1 7777
+
+Game turns run in a shared, bounded thread pool, so every session uses the
+same LLM client and connection pool.
+"""
+
+import argparse
+import asyncio
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from config import (
+    QUIT_COMMANDS,
+    UNDO_COMMANDS,
+    STATS_COMMANDS,
+    SERVER_HOST,
+    SERVER_PORT,
+    SERVER_MAX_SESSIONS,
+    SERVER_WORKERS,
+    SERVER_JOURNAL_DIR,
+    METRICS_PORT,
+    METRICS_PATH,
+)
+from game import (
+    open_session,
+    play_turn,
+    undo_turn,
+    prefetching,
+    set_dev_output,
+)
+from usage import BudgetExceededError
+from metrics import start_exporter
+from ui import SEPARATOR, TITLE_TEXT, GOODBYE_TEXT
+
+
+class GameServer:
+    """Hosts concurrent game sessions, one per connection."""
+
+    def __init__(
+        self,
+        max_sessions: int = SERVER_MAX_SESSIONS,
+        journal_dir: str | None = SERVER_JOURNAL_DIR,
+    ):
+        self.slots = asyncio.Semaphore(max_sessions)
+        self.journal_dir = journal_dir
+        self.active_sessions = 0
+
+    async def handle_client(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Run one player's session over a connection."""
+        async def send(text: str) -> None:
+            writer.write(text.encode())
+            await writer.drain()
+
+        if self.slots.locked():
+            await send("Server is full. Try again later.\n")
+            writer.close()
+            return
+
+        async with self.slots:
+            self.active_sessions += 1
+            session = None
+            try:
+                await send(TITLE_TEXT)
+                session = await asyncio.to_thread(open_session, **self.session_paths())
+                await send(f"\n{session.last_narration}\n")
+                await self.serve_turns(session, reader, send)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                pass
+            except Exception as error:
+                # Only session setup gets here; serve_turns survives failed turns
+                print(f"[Session failed to start: {error!r}]")
+                try:
+                    await send("Could not start a game. Try again later.\n")
+                except ConnectionError:
+                    pass
+            finally:
+                self.active_sessions -= 1
+                if session is not None:
+                    await asyncio.to_thread(session.close)
+                writer.close()
+
+    def session_paths(self) -> dict:
+        """Journal, save, and trace locations for a new session."""
+        if not self.journal_dir:
+            return {"journal_path": None, "save_path": None, "trace_path": None}
+        os.makedirs(self.journal_dir, exist_ok=True)
+        session_id = uuid.uuid4().hex[:12]
+        return {
+            "journal_path": os.path.join(self.journal_dir, f"{session_id}.jsonl"),
+            "save_path": os.path.join(self.journal_dir, f"{session_id}.save.json"),
+            "trace_path": os.path.join(self.journal_dir, f"{session_id}.trace.json"),
+        }
+
+    async def serve_turns(self, session, reader, send) -> None:
+        """Read actions and play turns until the player quits or disconnects."""
+        loop = asyncio.get_running_loop()
+        while True:
+            await send(f"\n{SEPARATOR}\n> ")
+            with prefetching(session):
+                line = await reader.readline()
+            if not line:
+                return
+            user_input = line.decode(errors="replace").strip()
+            if not user_input:
+                continue
+
+            if user_input.lower() in QUIT_COMMANDS:
+                await send(f"{GOODBYE_TEXT}\n")
+                return
+
+            if user_input.lower() in UNDO_COMMANDS:
+                try:
+                    narration = await asyncio.to_thread(undo_turn, session)
+                except Exception as error:
+                    await self.report_error(session, send, "undo", error)
+                    continue
+                await send(f"\n{narration or 'There is nothing to undo.'}\n")
+                continue
+
+            if user_input.lower() in STATS_COMMANDS:
+                await send(f"\n{session.usage.report()}\n")
+                continue
+
+            def on_outcome(outcome: str) -> None:
+                # Called from the worker thread; hand the write to the event loop
+                asyncio.run_coroutine_threadsafe(send(f"\n{outcome}\n"), loop)
+
+            try:
+                response = await asyncio.to_thread(
+                    play_turn, session, user_input, on_outcome
+                )
+            except BudgetExceededError as error:
+                await send(f"\nThis session has reached its budget: {error}.\n")
+                await send(f"{GOODBYE_TEXT}\n")
+                return
+            except Exception as error:
+                # One failed turn shouldn't cost the player their session
+                await self.report_error(session, send, "turn", error)
+                continue
+            await send(f"\n{response}\n")
+
+    async def report_error(self, session, send, action: str, error: Exception) -> None:
+        """Log a failed action and tell the player, leaving the session open."""
+        print(f"[{action.capitalize()} failed on turn {session.turn}: {error!r}]")
+        session.record("error", action=action, error=repr(error))
+        await send(f"\nSomething went wrong ({type(error).__name__}). Try again.\n")
+
+
+async def serve(host: str, port: int, workers: int) -> None:
+    """Start the server and run until cancelled."""
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=workers))
+    server = GameServer()
+    listener = await asyncio.start_server(server.handle_client, host, port)
+    print(f"PEACE_COM server listening on {host}:{port}")
+    async with listener:
+        await listener.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PEACE_COM multi-session server")
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=SERVER_WORKERS)
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=METRICS_PORT,
+        help="serve Prometheus metrics at http://127.0.0.1:PORT/metrics",
+    )
+    parser.add_argument(
+        "--metrics-file",
+        default=METRICS_PATH,
+        help="write Prometheus metrics to this file periodically",
+    )
+    args = parser.parse_args()
+
+    # Sessions share stdout, so per-turn debug output would interleave
+    set_dev_output(False)
+    start_exporter(args.metrics_port, args.metrics_file)
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
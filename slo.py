@@ -0,0 +1,139 @@
+"""
+Turn latency budget for PEACE_COM.
+
+Each turn gets TURN_LATENCY_BUDGET_SECONDS. Before every stage the budget
+compares the time left with how long the remaining stages usually take. If
+the turn would run over, non-essential work is degraded in a fixed order
+until the estimate fits:
+
+1. defer arc resolution to a later turn
+2. simulate only entities near the player
+3. shrink the world context in prompts
+4. narrate with the fast model
+"""
+
+import threading
+import time
+
+from config import TURN_LATENCY_BUDGET_SECONDS
+
+# Degradation steps, in the order they are applied
+DEFER_ARCS = "defer_arcs"
+NEARBY_SIMULATION = "nearby_simulation"
+SMALL_CONTEXT = "small_context"
+FAST_NARRATION = "fast_narration"
+DEGRADATION_ORDER = (DEFER_ARCS, NEARBY_SIMULATION, SMALL_CONTEXT, FAST_NARRATION)
+
+# Stages of a turn, in order
+TURN_STAGES = (
+    "feasibility",
+    "time_estimate",
+    "simulation",
+    "arc_resolution",
+    "narration",
+)
+# With combined adjudication, feasibility also covers time and arcs
+COMBINED_TURN_STAGES = ("feasibility", "simulation", "narration")
+
+# Starting guesses for stage durations, in seconds
+DEFAULT_STAGE_SECONDS = {
+    "feasibility": 4.0,
+    "time_estimate": 1.5,
+    "simulation": 6.0,
+    "arc_resolution": 4.0,
+    "narration": 4.0,
+}
+
+# Rough fraction of a stage's time left after each degradation
+DEGRADATION_EFFECTS = {
+    DEFER_ARCS: {"arc_resolution": 0.0},
+    NEARBY_SIMULATION: {"simulation": 0.3},
+    SMALL_CONTEXT: {"arc_resolution": 0.8, "narration": 0.8, "feasibility": 0.8},
+    FAST_NARRATION: {"narration": 0.4},
+}
+
+
+class StageEstimates:
+    """Exponentially weighted moving averages of stage durations.
+
+    Shared across sessions, so a slow provider raises the estimates for every
+    turn in the process.
+    """
+
+    def __init__(self, alpha: float = 0.3):
+        self.alpha = alpha
+        self.lock = threading.Lock()
+        self.seconds = dict(DEFAULT_STAGE_SECONDS)
+
+    def observe(self, stage: str, seconds: float) -> None:
+        with self.lock:
+            previous = self.seconds.get(stage, seconds)
+            self.seconds[stage] = previous + self.alpha * (seconds - previous)
+
+    def get(self, stage: str) -> float:
+        with self.lock:
+            return self.seconds.get(stage, 0.0)
+
+
+stage_estimates = StageEstimates()
+
+
+class TurnBudget:
+    """Tracks one turn's time and decides which stages to degrade."""
+
+    def __init__(
+        self,
+        budget_seconds: float = TURN_LATENCY_BUDGET_SECONDS,
+        estimates: StageEstimates = stage_estimates,
+        stages: tuple[str, ...] = TURN_STAGES,
+    ):
+        self.budget_seconds = budget_seconds
+        self.estimates = estimates
+        self.stages = stages  # the stages this turn will run, in order
+        self.start = time.monotonic()
+        self.active: list[str] = []  # degradations applied so far, in order
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.start
+
+    def remaining(self) -> float:
+        return self.budget_seconds - self.elapsed()
+
+    def is_degraded(self, degradation: str) -> bool:
+        return degradation in self.active
+
+    def estimate(self, stages: tuple[str, ...]) -> float:
+        """Expected seconds for the given stages under the current degradations."""
+        total = 0.0
+        for stage in stages:
+            seconds = self.estimates.get(stage)
+            for degradation in self.active:
+                seconds *= DEGRADATION_EFFECTS[degradation].get(stage, 1.0)
+            total += seconds
+        return total
+
+    def plan(self, next_stage: str) -> list[str]:
+        """Degrade further until the rest of the turn fits. Returns new degradations."""
+        stages = self.stages[self.stages.index(next_stage) :]
+        added = []
+        for degradation in DEGRADATION_ORDER:
+            if self.estimate(stages) <= self.remaining():
+                break
+            if degradation not in self.active:
+                self.active.append(degradation)
+                added.append(degradation)
+        return added
+
+    def finish_stage(self, stage: str, started: float) -> None:
+        """Feed a completed stage's duration back into the estimates.
+
+        Durations of degraded stages are scaled back up, so the estimates
+        always describe the full version of each stage.
+        """
+        seconds = time.monotonic() - started
+        for degradation in self.active:
+            effect = DEGRADATION_EFFECTS[degradation].get(stage, 1.0)
+            if effect == 0.0:
+                return
+            seconds /= effect
+        self.estimates.observe(stage, seconds)
@@ -2,13 +2,111 @@
 Unit tests for PEACE_COM dungeon crawler.
 """
 
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import asyncio
 import unittest
+import urllib.request
+from functools import partial
+from types import SimpleNamespace
 from unittest.mock import patch, MagicMock
 
 from config import MODEL, QUIT_COMMANDS
 from prompts import SYSTEM_PROMPT
-from game import create_session
-from llm import get_response
+from game import (
+    GameSession,
+    check_feasibility,
+    estimate_time,
+    open_session,
+    play_turn,
+    undo_turn,
+    narration_messages,
+    start_prefetch,
+    create_session,
+    initialize_world,
+    start_session,
+    format_duration,
+    parse_duration,
+    apply_arc_resolutions,
+    simulate_time_passage,
+    apply_character_delta,
+    apply_place_delta,
+)
+from llm import (
+    get_response,
+    add_listener,
+    remove_listener,
+    listening,
+    SingleFlight,
+    LatencyTracker,
+    LLMTimeoutError,
+    get_structured_response,
+)
+from models import (
+    Character,
+    Place,
+    PlayerCharacter,
+    GameWorld,
+    NarrativeArc,
+    UpdateLog,
+)
+from relevance import ArcIndex, tokenize
+from context import build_world_context, rank_entities
+from retrieval import HistoryIndex
+from persistence import save_session, load_session
+from world_pool import WorldPool, situation_similarity, trigger_refill
+from journal import Journal, read_journal
+from timeline import Timeline
+from server import GameServer
+from scheduler import LLMScheduler, FOREGROUND, BACKGROUND
+from loadtest import (
+    FakeBackend,
+    fake_value,
+    installed,
+    percentile,
+    run as run_load_test,
+)
+from llm_client import LLMClient, get_client, model_endpoint, schema_models
+from metrics import MetricsRegistry, serve_metrics, write_metrics
+from usage import (
+    Usage,
+    UsageLedger,
+    BudgetExceededError,
+    accounting,
+    usage_from_response,
+)
+from tracing import Tracer, tracing, span, chrome_trace, waterfall
+from slo import (
+    COMBINED_TURN_STAGES,
+    TurnBudget,
+    StageEstimates,
+    DEGRADATION_ORDER,
+    DEFER_ARCS,
+    NEARBY_SIMULATION,
+)
+from procgen import ProceduralGenerator
+from prefetch import (
+    Prefetcher,
+    PrefetchCache,
+    prefetch_cache,
+    likely_actions,
+    normalize_action,
+)
+from schemas import (
+    AdjudicationResponse,
+    CharacterDeltaSchema,
+    FeasibilityResponse,
+    NarrativeArcsResponse,
+    PlaceDeltaSchema,
+    WorldEntitiesResponse,
+)
 from ui import print_separator, SEPARATOR
 
 
@@ -64,6 +162,7 @@ class TestGetResponse(unittest.TestCase):
         mock_completion.assert_called_once_with(
             model=MODEL,
             messages=messages,
+            client=get_client().http,
         )
 
     @patch("llm.litellm.completion")
@@ -80,6 +179,1829 @@ class TestGetResponse(unittest.TestCase):
         self.assertEqual(result, "The dwarf looks at you suspiciously.")
 
 
+class TestArcIndex(unittest.TestCase):
+    """Tests for the local arc relevance pre-filter."""
+
+    def setUp(self):
+        self.reactor = NarrativeArc(
+            name="Reactor Meltdown",
+            problem="The dwarven reactor core is overheating.",
+            stakes="The whole sector could be vaporized.",
+            resolution_criteria="Someone must vent the coolant valves.",
+            possible_resolutions=["vent coolant manually", "bribe the engineer"],
+        )
+        self.heist = NarrativeArc(
+            name="Elven Data Heist",
+            problem="A syndicate server holds stolen memories.",
+            stakes="The player's past is on that server.",
+            resolution_criteria="Recover or destroy the memory drive.",
+            possible_resolutions=["hack the server", "steal the drive"],
+        )
+        self.index = ArcIndex()
+
+    def test_tokenize_drops_stopwords_and_stems(self):
+        """Tokenizer should lowercase, drop stopwords, and stem plurals."""
+        self.assertEqual(tokenize("The Valves of the reactor"), ["valv", "reactor"])
+
+    def test_inflected_forms_share_a_stem(self):
+        """Words ending in e should stem the same as their inflections."""
+        for forms in (
+            ("valve", "valves"),
+            ("bribe", "bribed", "bribes", "bribing"),
+            ("place", "places", "placed"),
+            ("box", "boxes"),
+        ):
+            self.assertEqual(len({tuple(tokenize(form)) for form in forms}), 1, forms)
+
+        """An action using an inflected form should match an arc's base form."""
+        """'I bribed the engineer' should match an arc idea to bribe the engineer."""
+        arc = NarrativeArc(
+            name="Sabotage",
+            problem="Someone is sabotaging the docks.",
+            stakes="The docks close.",
+            resolution_criteria="The saboteur is exposed.",
+            possible_resolutions=["bribe the engineer"],
+        )
+        candidates = self.index.candidates([arc], "I bribed someone", 0.5)
+        self.assertEqual(candidates, [arc])
+
+    def test_matching_arc_is_candidate(self):
+        """An action mentioning an arc's vocabulary should select that arc."""
+        arcs = [self.reactor, self.heist]
+        candidates = self.index.candidates(arcs, "I vent the coolant", 0.5)
+        self.assertEqual(candidates, [self.reactor])
+
+    def test_unrelated_action_selects_nothing(self):
+        """An unrelated action should not select any arc."""
+        arcs = [self.reactor, self.heist]
+        candidates = self.index.candidates(arcs, "I order a drink", 0.5)
+        self.assertEqual(candidates, [])
+
+    def test_arc_indexed_once(self):
+        """Re-adding an arc should not change its postings."""
+        self.index.add(self.reactor)
+        postings = {term: dict(p) for term, p in self.index.postings.items()}
+        self.index.add(self.reactor)
+        self.assertEqual(self.index.postings, postings)
+
+
+class TestCombinedAdjudication(unittest.TestCase):
+    """Tests for the combined adjudication mode."""
+
+    def test_schema_parses_combined_response(self):
+        """One response should carry feasibility, duration, and arc results."""
+        data = AdjudicationResponse.model_validate_json(
+            '{"feasible": true, "flaw_triggered": false,'
+            ' "dice_roll": {"needed": false}, "initial_outcome": "You vent it.",'
+            ' "duration_minutes": 90,'
+            ' "resolutions": [{"arc_name": "Leak", "resolved": true,'
+            ' "resolution_outcome": "Sealed."}]}'
+        )
+        self.assertEqual(data.duration_minutes, 90)
+        self.assertTrue(data.resolutions[0].resolved)
+
+    def test_format_duration(self):
+        """Durations should read like time estimates."""
+        self.assertEqual(format_duration(1), "1 minute")
+        self.assertEqual(format_duration(45), "45 minutes")
+        self.assertEqual(format_duration(120), "2 hours")
+        self.assertEqual(format_duration(90), "1 hour 30 minutes")
+        self.assertEqual(format_duration(61), "1 hour 1 minute")
+        self.assertEqual(format_duration(2880), "2 days")
+
+    @patch("builtins.print")
+    def test_apply_arc_resolutions(self, mock_print):
+        """Resolved arcs should be marked and returned."""
+        data = AdjudicationResponse.model_validate_json(
+            '{"feasible": true, "flaw_triggered": false,'
+            ' "dice_roll": {"needed": false}, "initial_outcome": "x",'
+            ' "duration_minutes": 5,'
+            ' "resolutions": [{"arc_name": "Leak", "resolved": true,'
+            ' "resolution_outcome": "Sealed."}]}'
+        )
+        leak = NarrativeArc("Leak", "p", "s", "c")
+        other = NarrativeArc("Other", "p", "s", "c")
+        world = GameWorld(situation="s", narrative_arcs=[leak, other])
+        resolved = apply_arc_resolutions(world, data.resolutions, [leak, other])
+        self.assertEqual(resolved, [leak])
+        self.assertTrue(leak.resolved)
+        self.assertEqual(leak.resolution_outcome, "Sealed.")
+        self.assertFalse(other.resolved)
+
+
+class TestGameWorldIndexes(unittest.TestCase):
+    """Tests for the GameWorld name, location, and item indexes."""
+
+    def setUp(self):
+        self.world = GameWorld(
+            situation="s",
+            characters=[
+                Character("Grimbold", "smuggler", "Bazaar", ["crowbar"]),
+                Character("Ithilwen", "netrunner", "Bazaar", ["deck"]),
+            ],
+            places=[
+                Place("Bazaar", "market", inventory=["crate"]),
+                Place("Tunnel 9", "tunnel"),
+            ],
+            player=PlayerCharacter("Vex", "lockpicking", "greed", "Bazaar"),
+        )
+
+    def test_lookup_by_name(self):
+        """Entities should be found by name."""
+        self.assertEqual(self.world.get_character("Ithilwen").role, "netrunner")
+        self.assertEqual(self.world.get_place("Tunnel 9").type, "tunnel")
+        self.assertIsNone(self.world.get_character("Nobody"))
+
+    def test_move_character_updates_location_index(self):
+        """Moving a character should update who is where."""
+        grimbold = self.world.get_character("Grimbold")
+        self.world.move_character(grimbold, "Tunnel 9")
+        self.assertEqual(grimbold.location, "Tunnel 9")
+        self.assertEqual(
+            [c.name for c in self.world.characters_at("Bazaar")], ["Ithilwen"]
+        )
+        self.assertEqual(self.world.characters_at("Tunnel 9"), [grimbold])
+
+    def test_transfer_item_updates_holder_index(self):
+        """Giving an item away should update where it is."""
+        self.assertTrue(self.world.transfer_item("crowbar", "Grimbold", "Vex"))
+        self.assertEqual(self.world.holders_of("crowbar"), ["Vex"])
+        self.assertIn("crowbar", self.world.player.inventory)
+        self.assertNotIn("crowbar", self.world.get_character("Grimbold").inventory)
+
+    def test_transfer_missing_item_fails(self):
+        """Transferring an item the giver lacks should change nothing."""
+        self.assertFalse(self.world.transfer_item("deck", "Grimbold", "Vex"))
+        self.assertEqual(self.world.holders_of("deck"), ["Ithilwen"])
+
+    def test_add_arc_indexes_it(self):
+        """Added arcs should be found by name."""
+        arc = NarrativeArc("Leak", "p", "s", "c")
+        self.world.add_arc(arc)
+        self.assertIs(self.world.get_arc("Leak"), arc)
+
+
+class TestCompactEntities(unittest.TestCase):
+    """Tests for the slotted entity representation and update logs."""
+
+    def test_entities_have_no_instance_dict(self):
+        """Entities should be slotted."""
+        character = Character("Grimbold", "smuggler")
+        self.assertFalse(hasattr(character, "__dict__"))
+        self.assertFalse(hasattr(Place("Bazaar", "market"), "__dict__"))
+
+    def test_names_are_interned(self):
+        """Equal names built at runtime should share one string object."""
+        parts = ["Grim", "bold"]
+        first = Character("".join(parts), "smuggler", inventory=["".join(parts)])
+        second = Character("".join(parts), "smuggler", inventory=["".join(parts)])
+        self.assertIs(first.name, second.name)
+        self.assertIs(first.inventory[0], second.inventory[0])
+
+    def test_update_log_records(self):
+        """Update logs should store clock offsets and render on demand."""
+        log = UpdateLog()
+        log.append(0, "Wakes up.")
+        log.append(125, "Opens the shop.")
+        self.assertEqual(len(log), 2)
+        self.assertEqual(log.latest(), "Opens the shop.")
+        self.assertEqual(log[-1], "[T+2h05m] Opens the shop.")
+        self.assertEqual(
+            list(log.entries()), [(0, "Wakes up."), (125, "Opens the shop.")]
+        )
+
+    def test_parse_duration(self):
+        """Time estimates should normalize to minutes."""
+        self.assertEqual(parse_duration("5 minutes"), 5)
+        self.assertEqual(parse_duration("2 hours"), 120)
+        self.assertEqual(parse_duration("1 hour 30 minutes"), 90)
+        self.assertEqual(parse_duration("a day"), 1440)
+        self.assertEqual(parse_duration("a while"), 5)
+        self.assertEqual(parse_duration("5min"), 5)
+        self.assertEqual(parse_duration("1.5 hours"), 90)
+
+    def test_parse_fractional_duration(self):
+        """Halves should count as half a unit, not a whole one."""
+        self.assertEqual(parse_duration("half an hour"), 30)
+        self.assertEqual(parse_duration("Roughly half a day"), 720)
+        self.assertEqual(parse_duration("a half hour"), 30)
+        self.assertEqual(parse_duration("an hour and a half"), 90)
+        self.assertEqual(parse_duration("2 days and a half"), 3600)
+
+    def test_parse_duration_matches_whole_words(self):
+        """Articles inside other words should not be read as amounts."""
+        self.assertEqual(parse_duration("about an hour"), 60)
+        self.assertEqual(parse_duration("gone an hour"), 60)
+        self.assertEqual(parse_duration("about 10 minutes"), 10)
+        self.assertEqual(parse_duration("Around twenty or so"), 5)
+        self.assertEqual(parse_duration("another moment"), 5)
+
+
+class TestRankedContext(unittest.TestCase):
+    """Tests for relevance-ranked world context assembly."""
+
+    def setUp(self):
+        places = [Place("Bazaar", "market", adjacent=["Dock"]), Place("Dock", "dock")]
+        places += [Place(f"Tunnel {i}", "tunnel") for i in range(50)]
+        characters = [
+            Character(f"Miner {i:02d}", "ore miner", f"Tunnel {i}") for i in range(50)
+        ]
+        characters.append(Character("Grimbold", "smuggler", "Dock"))
+        characters.append(Character("Ithilwen", "netrunner", "Bazaar"))
+        self.world = GameWorld(
+            situation="The air recyclers are failing.",
+            characters=characters,
+            places=places,
+            player=PlayerCharacter("Vex", "lockpicking", "greed", "Bazaar"),
+        )
+
+    def test_nearby_and_mentioned_entities_rank_first(self):
+        """Entities here, next door, or named in the action should lead."""
+        ranked = [e.name for _, e in rank_entities(self.world, "talk to miner 30")]
+        self.assertEqual(set(ranked[:2]), {"Bazaar", "Ithilwen"})
+        self.assertIn("Grimbold", ranked[:5])
+        self.assertIn("Miner 30", ranked[:5])
+
+    def test_context_respects_budget(self):
+        """A small budget should detail the nearby entities and summarize the rest."""
+        context = build_world_context(self.world, "look around", token_budget=200)
+        self.assertIn("Ithilwen", context)
+        self.assertNotIn("Miner 40 ", context)
+        self.assertIn("more characters (", context)
+        self.assertIn("ore miner", context)
+
+    def test_large_budget_includes_everything(self):
+        """With room to spare, every entity should be detailed."""
+        context = build_world_context(self.world, token_budget=100000)
+        self.assertIn("Miner 49", context)
+        self.assertNotIn("...and", context)
+
+
+class TestHistoryIndex(unittest.TestCase):
+    """Tests for BM25 retrieval over session history."""
+
+    def setUp(self):
+        self.index = HistoryIndex()
+        self.index.add("message", "Player: I bribe the dwarven guard with moonshine")
+        self.index.add("update", "Grimbold: Counts ore in the back room.", 30)
+        self.index.add("update", "Bazaar: The neon sign above the guard post dies.", 60)
+        self.index.add("arc", "Reactor Meltdown resolved: the coolant was vented.", 90)
+
+    def test_search_ranks_relevant_events(self):
+        """The best lexical match should come first."""
+        results = self.index.search("give moonshine to the guard", k=2)
+        self.assertEqual(len(results), 2)
+        self.assertIn("moonshine", results[0].text)
+
+    def test_search_filters_kinds(self):
+        """Searches can be limited to certain kinds of events."""
+        results = self.index.search("guard", kinds=("update",))
+        self.assertEqual([r.kind for r in results], ["update"])
+
+    def test_no_match_returns_nothing(self):
+        """Queries with no shared terms should return no events."""
+        self.assertEqual(self.index.search("elven lullaby"), [])
+
+    def test_context_includes_retrieved_events(self):
+        """World context should surface old events relevant to the action."""
+        world = GameWorld(
+            situation="s", player=PlayerCharacter("Vex", "lockpicking", "greed")
+        )
+        world.history = self.index
+        context = build_world_context(world, "check on the reactor coolant")
+        self.assertIn("RELEVANT PAST EVENTS", context)
+        self.assertIn("[T+1h30m] Reactor Meltdown resolved", context)
+
+
+class TestPersistence(unittest.TestCase):
+    """Tests for saving and resuming sessions."""
+
+    def setUp(self):
+        grimbold = Character("Grimbold", "smuggler", "Bazaar", ["crowbar"], "Lurks.")
+        grimbold.updates.append(30, "Counts ore.")
+        self.world = GameWorld(
+            situation="The air recyclers are failing.",
+            characters=[grimbold],
+            places=[Place("Bazaar", "market", ["Dock"], ["crate"], "Busy.")],
+            player=PlayerCharacter("Vex", "lockpicking", "greed", "Bazaar", ["pick"]),
+            clock=30,
+        )
+        self.world.add_arc(NarrativeArc("Leak", "p", "s", "c", ["fix it"]))
+        self.world.history.add("update", "Grimbold: Counts ore.", 30)
+        self.messages = [
+            {"role": "system", "content": "prompt"},
+            {"role": "assistant", "content": "You wake up."},
+        ]
+        handle, self.path = tempfile.mkstemp(suffix=".json")
+        os.close(handle)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_round_trip(self):
+        """A loaded session should match the saved one, indexes included."""
+        save_session(self.path, self.world, self.messages, turn=3)
+        world, messages, turn = load_session(self.path)
+        self.assertEqual(world, self.world)
+        self.assertEqual(messages, self.messages)
+        self.assertEqual(turn, 3)
+        self.assertEqual(world.holders_of("crowbar"), ["Grimbold"])
+        self.assertEqual(world.get_arc("Leak").possible_resolutions, ["fix it"])
+        self.assertEqual(world.history.search("ore")[0].clock, 30)
+
+    def test_rejects_unknown_version(self):
+        """Saves from another format version should not load."""
+        save_session(self.path, self.world, self.messages)
+        with open(self.path) as f:
+            data = json.load(f)
+        data["version"] = 999
+        with open(self.path, "w") as f:
+            json.dump(data, f)
+        with self.assertRaises(ValueError):
+            load_session(self.path)
+
+
+class TestWorldPool(unittest.TestCase):
+    """Tests for the pre-generated world pool."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.pool = WorldPool(self.directory, max_age_hours=1)
+        self.messages = [{"role": "assistant", "content": "You wake up."}]
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def make_world(self, situation: str) -> GameWorld:
+        return GameWorld(
+            situation=situation, player=PlayerCharacter("Vex", "lockpicking", "greed")
+        )
+
+    def test_claim_removes_oldest_world(self):
+        """Claiming should hand out the oldest world exactly once."""
+        first = self.pool.add(
+            self.make_world("The reactor is melting down."), self.messages
+        )
+        os.utime(first, (time.time() - 60, time.time() - 60))
+        self.pool.add(self.make_world("Elves stole the payroll."), self.messages)
+
+        world, messages = self.pool.claim()
+        self.assertEqual(world.situation, "The reactor is melting down.")
+        self.assertEqual(messages, self.messages)
+        self.assertEqual(len(self.pool), 1)
+
+    def test_empty_pool_claims_nothing(self):
+        """An empty pool should return None."""
+        self.assertIsNone(self.pool.claim())
+
+    def test_stale_worlds_are_discarded(self):
+        """Worlds past the maximum age should never be claimed."""
+        path = self.pool.add(self.make_world("Old news."), self.messages)
+        os.utime(path, (time.time() - 7200, time.time() - 7200))
+        self.assertIsNone(self.pool.claim())
+        self.assertEqual(len(self.pool), 0)
+
+    def test_stats_report_diversity(self):
+        """Stats should track size and how different the worlds are."""
+        self.pool.add(self.make_world("The reactor is melting down."), self.messages)
+        self.pool.add(self.make_world("The reactor is melting down."), self.messages)
+        stats = self.pool.stats()
+        self.assertEqual(stats["size"], 2)
+        self.assertEqual(stats["diversity"], 0.0)
+        self.assertEqual(situation_similarity("reactor leak", "elven heist"), 0.0)
+
+    def test_vanished_worlds_are_skipped(self):
+        """Worlds claimed by another process mid-listing should be skipped."""
+        path = self.pool.add(self.make_world("Still here."), self.messages)
+        os.utime(path, (time.time() - 7200, time.time() - 7200))
+        names = os.listdir(self.directory) + ["world-0-gone.json"]
+        with patch("world_pool.os.listdir", return_value=names):
+            self.assertEqual(self.pool.paths(), [path])
+            self.assertEqual(self.pool.prune(), 1)
+            self.assertEqual(self.pool.stats()["size"], 0)
+
+    def test_refill_lock_admits_one_refiller(self):
+        """Only one process should refill at a time; dead holders lose the lock."""
+        self.assertTrue(self.pool.acquire_refill_lock())
+        self.assertTrue(self.pool.refilling())
+        self.assertFalse(WorldPool(self.directory).acquire_refill_lock())
+        self.pool.release_refill_lock()
+        self.assertFalse(self.pool.refilling())
+
+        with open(self.pool.lock_path, "w") as f:
+            f.write("999999999")
+        self.assertTrue(self.pool.acquire_refill_lock())
+        self.assertEqual(self.pool.paths(), [])
+
+    @patch("world_pool._refiller", None)
+    @patch("world_pool.subprocess.Popen")
+    def test_trigger_refill_starts_one_process(self, mock_popen):
+        """Repeated triggers should not start a second refiller."""
+        mock_popen.return_value.poll.return_value = None
+        self.assertTrue(trigger_refill(directory=self.directory))
+        self.assertFalse(trigger_refill(directory=self.directory))
+        mock_popen.assert_called_once()
+
+        mock_popen.return_value.poll.return_value = 0
+        self.pool.acquire_refill_lock()
+        self.assertFalse(trigger_refill(directory=self.directory))
+        mock_popen.assert_called_once()
+
+
+class TestJournal(unittest.TestCase):
+    """Tests for the append-only session journal."""
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix=".jsonl")
+        os.close(handle)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_events_are_appended_per_turn(self):
+        """Events should be written in order and tagged with their turn."""
+        journal = Journal(self.path, fsync_policy="turn")
+        journal.record("input", text="look around")
+        journal.end_turn()
+        journal.record("input", text="wait")
+        journal.close()
+
+        events = read_journal(self.path)
+        self.assertEqual([e["text"] for e in events], ["look around", "wait"])
+        self.assertEqual([e["turn"] for e in events], [0, 1])
+
+    def test_reopening_appends(self):
+        """A new journal on the same file should not overwrite old events."""
+        for text in ("first", "second"):
+            journal = Journal(self.path, fsync_policy="never")
+            journal.record("input", text=text)
+            journal.close()
+        self.assertEqual(len(read_journal(self.path)), 2)
+
+    def test_llm_calls_are_stored_as_deltas(self):
+        """Growing requests should store only new messages and replay in full."""
+        narration = []
+        check = [
+            {"role": "system", "content": "check"},
+            {"role": "user", "content": "?"},
+        ]
+        requests = []
+        for reopen in (False, True):
+            journal = Journal(self.path, fsync_policy="never")
+            for turn in range(3):
+                # The system prompt is rewritten every turn, as refresh_session does
+                system = {"role": "system", "content": f"world at turn {turn}"}
+                narration = [system, *narration[1:]]
+                narration.append({"role": "user", "content": f"act {turn}"})
+                requests.append(list(narration))
+                journal.record_llm_call(narration, f"story {turn}")
+                requests.append(check)
+                journal.record_llm_call(check, "yes")
+                narration.append({"role": "assistant", "content": f"story {turn}"})
+            journal.close()
+
+        with open(self.path) as f:
+            stored = [json.loads(line) for line in f]
+        # After each file's first pair, a call writes only what it added
+        self.assertEqual([len(e["added"]) for e in stored[:6]], [1, 1, 2, 0, 2, 0])
+        self.assertEqual(stored[2]["first"]["content"], "world at turn 1")
+        self.assertIsNone(stored[3]["first"])
+        self.assertEqual(stored[6]["keep"], 0)
+        self.assertNotIn("request", stored[2])
+
+        events = read_journal(self.path)
+        self.assertEqual([e["request"] for e in events], requests)
+        self.assertEqual(events[2]["response"], "story 1")
+        self.assertNotIn("added", events[2])
+
+    def test_played_turns_journal_only_new_messages(self):
+        """Narration calls from real turns should not rewrite the history."""
+        import game
+
+        previous = game._dev_output
+        game.set_dev_output(False)
+        self.addCleanup(game.set_dev_output, previous)
+        backend = FakeBackend()
+        sent = []
+        completion = backend.completion
+
+        def recording_completion(**kwargs):
+            sent.append([dict(m) for m in kwargs["messages"]])
+            return completion(**kwargs)
+
+        backend.completion = recording_completion
+        with installed(backend):
+            session = open_session(
+                journal_path=self.path, save_path=None, trace_path=None
+            )
+            sent.clear()
+            for _ in range(4):
+                play_turn(session, "look around")
+            session.close()
+
+        calls = [e for e in read_journal(self.path) if e["event"] == "llm_call"]
+        self.assertEqual([e["request"] for e in calls[-len(sent) :]], sent)
+        with open(self.path) as f:
+            stored = [json.loads(line) for line in f]
+        stored = [e for e in stored if e["event"] == "llm_call"][-len(sent) :]
+        narration = [
+            delta
+            for delta, request in zip(stored, sent)
+            if request[0]["role"] == "system" and len(request) > 2
+        ]
+        self.assertEqual(len(narration), 4)
+        # The first turn's narration repeats the opening; later ones add a turn
+        self.assertTrue(all(0 < len(d["added"]) <= 3 for d in narration[1:]))
+
+    def test_rejects_unknown_policy(self):
+        """Unknown fsync policies should be rejected."""
+        with self.assertRaises(ValueError):
+            Journal(self.path, fsync_policy="sometimes")
+
+    @patch("llm.litellm.completion")
+    def test_llm_calls_reach_listeners(self, mock_completion):
+        """LLM requests and responses should be reported to listeners."""
+        mock_response = MagicMock()
+        mock_response.choices = [MagicMock()]
+        mock_response.choices[0].message.content = "Noted."
+        mock_completion.return_value = mock_response
+        calls = []
+        listener = lambda messages, response: calls.append((messages, response))
+
+        add_listener(listener)
+        try:
+            get_response([{"role": "user", "content": "hi"}])
+        finally:
+            remove_listener(listener)
+        self.assertEqual(calls, [([{"role": "user", "content": "hi"}], "Noted.")])
+
+
+class TestTimeline(unittest.TestCase):
+    """Tests for copy-on-write snapshots, undo, and branching."""
+
+    def setUp(self):
+        characters = [
+            Character(f"Miner {i:02d}", "ore miner", "Tunnel") for i in range(20)
+        ]
+        self.world = GameWorld(
+            situation="The air recyclers are failing.",
+            characters=characters,
+            places=[Place("Tunnel", "tunnel")],
+            player=PlayerCharacter("Vex", "lockpicking", "greed", "Tunnel"),
+        )
+        self.messages = [
+            {"role": "system", "content": "prompt v1"},
+            {"role": "assistant", "content": "You wake up."},
+        ]
+        self.timeline = Timeline(self.world, self.messages)
+
+    def play_turn(self, action: str):
+        self.world.clock += 5
+        self.world.get_character("Miner 03").updates.append(self.world.clock, action)
+        self.messages[0] = {"role": "system", "content": f"prompt after {action}"}
+        self.messages.append({"role": "user", "content": action})
+        self.messages.append({"role": "assistant", "content": f"You {action}."})
+        return self.timeline.commit(self.world, self.messages, label=action)
+
+    def test_snapshot_stores_only_the_delta(self):
+        """A turn touching one character should record only that character."""
+        snapshot = self.play_turn("dig")
+        changed = {key for key in snapshot.changes}
+        self.assertEqual(changed, {("world",)})
+        self.assertEqual(
+            snapshot.updates, {("character", "Miner 03"): (0, ((5, "dig"),))}
+        )
+        self.assertEqual(len(snapshot.messages), 2)
+
+    def test_snapshot_size_stays_flat(self):
+        """Long update logs should not be copied into every snapshot."""
+        sizes = []
+        for turn in range(60):
+            self.world.clock += 5
+            for character in self.world.characters:
+                character.updates.append(self.world.clock, f"Dug tunnel {turn % 10}.")
+                character.state = f"Tired ({turn % 10})."
+            self.messages.append({"role": "user", "content": "wait"})
+            sizes.append(self.timeline.commit(self.world, self.messages).size)
+        self.assertLessEqual(sizes[-1], sizes[4] * 1.1)
+
+        world, _ = self.timeline.undo()
+        miner = world.get_character("Miner 03")
+        self.assertEqual(len(miner.updates), 59)
+        self.assertEqual(miner.state, "Tired (8).")
+        self.assertEqual(list(miner.updates.entries())[0], (5, "Dug tunnel 0."))
+
+    def test_undo_restores_previous_state(self):
+        """Undo should return the world and messages before the last turn."""
+        self.play_turn("dig")
+        self.play_turn("rest")
+        world, messages = self.timeline.undo()
+        self.assertEqual(world.clock, 5)
+        self.assertEqual(world.get_character("Miner 03").updates.latest(), "dig")
+        self.assertEqual(messages[-1]["content"], "You dig.")
+        self.assertEqual(messages[0]["content"], "prompt after dig")
+        self.assertEqual(len(world.characters), 20)
+
+    def test_undo_at_start_returns_none(self):
+        """There is nothing to undo before the first turn."""
+        self.assertIsNone(self.timeline.undo())
+
+    def test_fork_creates_independent_branch(self):
+        """A forked branch should diverge without affecting the original."""
+        self.play_turn("dig")
+        self.timeline.fork("what-if")
+        self.play_turn("rest")
+        world, messages = self.timeline.switch("what-if")
+        self.assertEqual(messages[-1]["content"], "You dig.")
+        self.assertEqual(world.clock, 5)
+
+        usage = self.timeline.memory_usage("main")
+        self.assertGreater(usage["exclusive"], 0)
+        self.assertLess(usage["exclusive"], usage["total"])
+        self.assertEqual(self.timeline.memory_usage("what-if")["exclusive"], 0)
+
+
+class TestGameServer(unittest.IsolatedAsyncioTestCase):
+    """Tests for the multi-session async server."""
+
+    async def asyncSetUp(self):
+        self.server = GameServer(max_sessions=4, journal_dir=None)
+        self.listener = await asyncio.start_server(
+            self.server.handle_client, "127.0.0.1", 0
+        )
+        self.port = self.listener.sockets[0].getsockname()[1]
+
+    async def asyncTearDown(self):
+        self.listener.close()
+        await self.listener.wait_closed()
+
+    async def play(self, actions: list[str]) -> str:
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+        for action in actions:
+            writer.write(f"{action}\n".encode())
+        await writer.drain()
+        output = await reader.read()
+        writer.close()
+        return output.decode()
+
+    async def test_concurrent_sessions(self):
+        """Each connection should get its own session and turns."""
+        def fake_open_session(**paths):
+            return MagicMock(last_narration="You wake up.")
+
+        def fake_play_turn(session, user_input, on_outcome):
+            on_outcome(f"You try to {user_input}.")
+            return f"Done: {user_input}"
+
+        with patch("server.open_session", fake_open_session), patch(
+            "server.play_turn", fake_play_turn
+        ):
+            first, second = await asyncio.gather(
+                self.play(["dance", "quit"]), self.play(["sing", "quit"])
+            )
+
+        self.assertIn("You wake up.", first)
+        self.assertIn("Done: dance", first)
+        self.assertNotIn("sing", first)
+        self.assertIn("Done: sing", second)
+        self.assertIn("Thanks for playing", second)
+        self.assertEqual(self.server.active_sessions, 0)
+
+    async def test_failed_turn_leaves_session_unchanged(self):
+        """A turn failing late should not leave its partial changes behind."""
+        world = GameWorld(
+            situation="The air recyclers are failing.",
+            places=[Place("Dock", "bay")],
+            characters=[Character("Ana", "pilot", "Dock")],
+            player=PlayerCharacter("Vex", "lockpicking", "greed", "Dock"),
+        )
+        messages = [
+            {"role": "system", "content": "You are the GM."},
+            {"role": "assistant", "content": "You wake up."},
+        ]
+        session = GameSession(
+            world=world, messages=list(messages), journal_path=None, trace_path=None
+        )
+        rng = random.Random(0)
+
+        def fake_structured(messages, model, **kwargs):
+            schema = model.model_json_schema()
+            data = fake_value(schema, schema.get("$defs", {}), rng)
+            return model.model_validate(data)
+
+        def fake_response(messages, call_site="narration", **kwargs):
+            if call_site == "narration":
+                raise RuntimeError("provider returned garbage")
+            return "10 minutes"
+
+        with patch("server.open_session", return_value=session), patch(
+            "game.get_structured_response", fake_structured
+        ), patch("game.get_response", fake_response), patch("builtins.print"):
+            output = await self.play(["dance", "quit"])
+
+        self.assertIn("Something went wrong (RuntimeError)", output)
+        self.assertEqual(session.messages, messages)
+        self.assertEqual(session.world.clock, 0)
+        self.assertEqual(len(session.world.get_character("Ana").updates), 0)
+        self.assertEqual(len(session.world.history.entries), 0)
+        self.assertEqual(session.turn, 0)
+
+    async def test_failed_turn_keeps_session_open(self):
+        """A turn that raises should report an error and take the next action."""
+        session = MagicMock(last_narration="You wake up.", turn=3)
+
+        def fake_play_turn(session, user_input, on_outcome):
+            if user_input == "explode":
+                raise RuntimeError("schema mismatch")
+            return f"Done: {user_input}"
+
+        with patch("server.open_session", return_value=session), patch(
+            "server.play_turn", fake_play_turn
+        ), patch("builtins.print"):
+            output = await self.play(["explode", "dance", "quit"])
+
+        self.assertIn("Something went wrong (RuntimeError)", output)
+        self.assertIn("Done: dance", output)
+        self.assertIn("Thanks for playing", output)
+        session.record.assert_called_once_with(
+            "error", action="turn", error="RuntimeError('schema mismatch')"
+        )
+
+
+class TestScopedListeners(unittest.TestCase):
+    """Tests for context-scoped LLM listeners."""
+
+    @patch("llm.litellm.completion")
+    def test_listener_only_hears_its_own_context(self, mock_completion):
+        """A scoped listener should stop hearing calls once its block exits."""
+        mock_response = MagicMock()
+        mock_response.choices = [MagicMock()]
+        mock_response.choices[0].message.content = "Noted."
+        mock_completion.return_value = mock_response
+        calls = []
+
+        with listening(lambda messages, response: calls.append(response)):
+            get_response([{"role": "user", "content": "inside"}])
+        get_response([{"role": "user", "content": "outside"}])
+        self.assertEqual(calls, ["Noted."])
+
+
+class TestLLMScheduler(unittest.TestCase):
+    """Tests for priority admission and adaptive concurrency."""
+
+    def test_foreground_admitted_before_background(self):
+        """When a slot frees up, waiting foreground calls go first."""
+        scheduler = LLMScheduler(initial_limit=1, foreground_reserve=0)
+        scheduler.acquire(FOREGROUND)
+        order = []
+
+        def call(priority):
+            scheduler.acquire(priority)
+            order.append(priority)
+            scheduler.release(priority, 0.0)
+
+        background = threading.Thread(target=call, args=(BACKGROUND,))
+        background.start()
+        while not scheduler.waiting[BACKGROUND]:
+            time.sleep(0.001)
+        foreground = threading.Thread(target=call, args=(FOREGROUND,))
+        foreground.start()
+        while not scheduler.waiting[FOREGROUND]:
+            time.sleep(0.001)
+        self.assertEqual(
+            scheduler.queue_depths()["waiting"], {FOREGROUND: 1, BACKGROUND: 1}
+        )
+
+        scheduler.release(FOREGROUND, 0.0)
+        background.join()
+        foreground.join()
+        self.assertEqual(order, [FOREGROUND, BACKGROUND])
+
+    def test_background_cannot_take_reserved_slots(self):
+        """Background work should leave the foreground reserve free."""
+        scheduler = LLMScheduler(initial_limit=3, foreground_reserve=2)
+        scheduler.acquire(BACKGROUND)
+        self.assertFalse(scheduler._can_start(BACKGROUND))
+        self.assertTrue(scheduler._can_start(FOREGROUND))
+
+    def test_aimd_limit(self):
+        """Rate limits halve the limit; fast calls grow it slowly."""
+        scheduler = LLMScheduler(initial_limit=8, latency_target=1.0)
+        scheduler.acquire(FOREGROUND)
+        scheduler.release(FOREGROUND, 0.1, rate_limited=True)
+        self.assertEqual(scheduler.limit, 4.0)
+        scheduler.acquire(FOREGROUND)
+        scheduler.release(FOREGROUND, 0.1)
+        self.assertEqual(scheduler.limit, 4.25)
+
+    def test_slot_detects_rate_limits(self):
+        """A 429 error raised inside a slot should shrink the limit."""
+        scheduler = LLMScheduler(initial_limit=8)
+        error = Exception("slow down")
+        error.status_code = 429
+        with self.assertRaises(Exception):
+            with scheduler.slot("narration"):
+                raise error
+        self.assertEqual(scheduler.limit, 4.0)
+        self.assertEqual(scheduler.queue_depths()["in_flight"][FOREGROUND], 0)
+
+
+class TestSingleFlight(unittest.TestCase):
+    """Tests for coalescing identical in-flight LLM requests."""
+
+    def test_concurrent_identical_requests_share_one_call(self):
+        """Waiters on the same key should all get the leader's result."""
+        flight = SingleFlight()
+        release = threading.Event()
+        calls = []
+
+        def slow_call():
+            calls.append(1)
+            release.wait()
+            return "5 minutes"
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(flight.do("k", slow_call)))
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        while flight.stats()["coalesced"] < 3:
+            time.sleep(0.001)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ["5 minutes"] * 4)
+        self.assertEqual(flight.stats(), {"calls": 1, "coalesced": 3, "in_flight": 0})
+
+    def test_finished_requests_are_not_cached(self):
+        """A repeat request after completion should call the provider again."""
+        flight = SingleFlight()
+        flight.do("k", lambda: "first")
+        self.assertEqual(flight.do("k", lambda: "second"), "second")
+
+    def test_errors_reach_every_waiter(self):
+        """If the shared call fails, the caller should see the error."""
+        flight = SingleFlight()
+
+        def failing():
+            raise RuntimeError("provider down")
+
+        with self.assertRaises(RuntimeError):
+            flight.do("k", failing)
+        self.assertEqual(flight.stats()["in_flight"], 0)
+
+    def test_waiters_keep_their_own_deadline(self):
+        """A waiter should give up at its timeout even if the leader has none."""
+        flight = SingleFlight()
+        release = threading.Event()
+        leader = threading.Thread(target=flight.do, args=("k", release.wait))
+        leader.start()
+        self.addCleanup(leader.join)
+        self.addCleanup(release.set)
+        while flight.stats()["in_flight"] == 0:
+            time.sleep(0.001)
+        started = time.monotonic()
+        with self.assertRaises(LLMTimeoutError):
+            flight.do("k", lambda: "never called", timeout=0.05)
+        self.assertLess(time.monotonic() - started, 1.0)
+
+    @patch("llm.LLM_MAX_RETRIES", 0)
+    @patch("llm.litellm.completion")
+    def test_foreground_call_does_not_join_background_one(self, mock_completion):
+        """A turn's call should not wait behind an identical slow prefetch."""
+        started = threading.Event()
+
+        def slow_completion(**kwargs):
+            started.set()
+            time.sleep(1.0)
+            return make_completion("5 minutes")
+
+        mock_completion.side_effect = slow_completion
+        messages = [{"role": "user", "content": "how long to pick the lock?"}]
+        prefetch = threading.Thread(
+            target=get_response, args=(messages,), kwargs={"call_site": "prefetch"}
+        )
+        prefetch.start()
+        self.addCleanup(prefetch.join)
+        started.wait(5)
+
+        begun = time.monotonic()
+        with self.assertRaises(LLMTimeoutError):
+            get_response(messages, call_site="time_estimate", timeout=0.3)
+        self.assertLess(time.monotonic() - begun, 0.9)
+        self.assertEqual(mock_completion.call_count, 2)
+
+
+def make_completion(content: str) -> MagicMock:
+    """Build a fake litellm completion response."""
+    response = MagicMock()
+    response.choices = [MagicMock()]
+    response.choices[0].message.content = content
+    return response
+
+
+class ProviderError(Exception):
+    """Stand-in for a provider exception carrying an HTTP status."""
+
+    def __init__(self, status_code: int):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+@patch("llm.backoff_delay", return_value=0)
+class TestLLMResilience(unittest.TestCase):
+    """Tests for deadlines, retries, and hedging in the LLM layer."""
+
+    @patch("llm.litellm.completion")
+    def test_transient_errors_are_retried(self, mock_completion, _):
+        """A 503 followed by a success should return the success."""
+        mock_completion.side_effect = [ProviderError(503), make_completion("ok")]
+        self.assertEqual(get_response([{"role": "user", "content": "a"}]), "ok")
+        self.assertEqual(mock_completion.call_count, 2)
+
+    @patch("llm.litellm.completion")
+    def test_permanent_errors_are_not_retried(self, mock_completion, _):
+        """Errors like bad credentials should surface immediately."""
+        mock_completion.side_effect = ProviderError(401)
+        with self.assertRaises(ProviderError):
+            get_response([{"role": "user", "content": "b"}])
+        self.assertEqual(mock_completion.call_count, 1)
+
+    @patch("llm.litellm.completion")
+    def test_malformed_json_is_retried(self, mock_completion, _):
+        """Invalid structured output should be retried rather than crash."""
+        mock_completion.side_effect = [
+            make_completion("{not json"),
+            make_completion('{"arcs": []}'),
+        ]
+        from schemas import NarrativeArcsResponse
+
+        result = get_structured_response(
+            [{"role": "user", "content": "c"}], NarrativeArcsResponse
+        )
+        self.assertEqual(result.arcs, [])
+        self.assertEqual(mock_completion.call_count, 2)
+
+    @patch("llm.LLM_MAX_RETRIES", 0)
+    @patch("llm.LLM_TIMEOUT_SECONDS", 0.05)
+    @patch("llm.litellm.completion")
+    def test_deadline_raises_timeout(self, mock_completion, _):
+        """A call running past its deadline should raise instead of hanging."""
+        mock_completion.side_effect = lambda **kwargs: time.sleep(0.5)
+        with self.assertRaises(LLMTimeoutError):
+            get_response([{"role": "user", "content": "d"}])
+
+    @patch("llm.litellm.completion")
+    def test_spent_deadline_skips_the_call(self, mock_completion, _):
+        """A structured call with no time left should fail without a request."""
+        from schemas import NarrativeArcsResponse
+
+        with self.assertRaises(LLMTimeoutError):
+            get_structured_response(
+                [{"role": "user", "content": "f"}], NarrativeArcsResponse, timeout=-1.0
+            )
+        mock_completion.assert_not_called()
+
+    @patch("llm.LLM_HEDGING", True)
+    @patch("llm.litellm.completion")
+    def test_slow_call_is_hedged(self, mock_completion, _):
+        """A call past the p95 latency should get a duplicate that can win."""
+        tracker = LatencyTracker()
+        for _ in range(30):
+            tracker.record("narration", 0.01)
+        replies = iter([(0.5, "slow"), (0.0, "fast")])
+
+        def completion(**kwargs):
+            delay, content = next(replies)
+            time.sleep(delay)
+            return make_completion(content)
+
+        mock_completion.side_effect = completion
+        with patch("llm.latency_tracker", tracker):
+            self.assertEqual(get_response([{"role": "user", "content": "e"}]), "fast")
+
+
+class TestTurnBudget(unittest.TestCase):
+    """Tests for the per-turn latency budget."""
+
+    def test_no_degradation_with_time_to_spare(self):
+        """A turn that fits its budget should run in full."""
+        budget = TurnBudget(budget_seconds=100.0, estimates=StageEstimates())
+        self.assertEqual(budget.plan("feasibility"), [])
+
+    def test_degrades_in_order(self):
+        """A late turn should shed work in the configured order."""
+        budget = TurnBudget(budget_seconds=19.0, estimates=StageEstimates())
+        self.assertEqual(budget.plan("feasibility"), [DEFER_ARCS])
+        budget = TurnBudget(budget_seconds=0.0, estimates=StageEstimates())
+        self.assertEqual(budget.plan("feasibility"), list(DEGRADATION_ORDER))
+        self.assertEqual(budget.plan("narration"), [])
+
+    def test_only_stages_that_run_are_budgeted(self):
+        """Combined adjudication has no separate time or arc stages to wait for."""
+        budget = TurnBudget(budget_seconds=16.0, estimates=StageEstimates())
+        self.assertEqual(budget.plan("feasibility"), [DEFER_ARCS])
+        budget = TurnBudget(
+            budget_seconds=16.0,
+            estimates=StageEstimates(),
+            stages=COMBINED_TURN_STAGES,
+        )
+        self.assertEqual(budget.plan("feasibility"), [])
+
+    def test_degraded_durations_are_scaled_back(self):
+        """Estimates should describe the full stage, not the degraded one."""
+        estimates = StageEstimates(alpha=1.0)
+        budget = TurnBudget(budget_seconds=0.0, estimates=estimates)
+        budget.plan("feasibility")
+        budget.finish_stage("simulation", time.monotonic() - 0.3)
+        self.assertAlmostEqual(estimates.get("simulation"), 1.0, places=1)
+        budget.finish_stage("arc_resolution", time.monotonic() - 5.0)
+        self.assertEqual(estimates.get("arc_resolution"), 4.0)
+
+    @patch("game.get_structured_response")
+    @patch("builtins.print")
+    def test_nearby_simulation(self, mock_print, mock_llm):
+        """Degraded simulation should skip entities far from the player."""
+        world = GameWorld(
+            situation="s",
+            places=[
+                Place("Dock", "bay", adjacent=["Hall"]),
+                Place("Hall", "corridor"),
+                Place("Vault", "vault"),
+            ],
+            characters=[
+                Character("Ana", "pilot", "Hall"),
+                Character("Bo", "guard", "Vault"),
+            ],
+            player=PlayerCharacter("Vex", "lockpicking", "greed", "Dock"),
+        )
+        mock_llm.side_effect = lambda messages, model, **kw: model(
+            action="Nothing changes.", event="Nothing changes.", new_state="Idle."
+        )
+        updates = simulate_time_passage(world, "10 minutes", nearby_only=True)
+        self.assertEqual(set(updates), {"Ana", "Dock", "Hall"})
+
+    @patch("game.get_structured_response")
+    @patch("builtins.print")
+    def test_simulation_stops_at_deadline(self, mock_print, mock_llm):
+        """Entities not reached before the deadline should be left alone."""
+        world = GameWorld(
+            situation="s",
+            places=[Place("Dock", "bay")],
+            characters=[Character("Ana", "pilot", "Dock")],
+            player=PlayerCharacter("Vex", "lockpicking", "greed", "Dock"),
+        )
+        mock_llm.side_effect = [
+            CharacterDeltaSchema(action="Ana waits.", new_state="Bored."),
+            LLMTimeoutError("late"),
+        ]
+        updates = simulate_time_passage(world, "10 minutes", timeout=2.0)
+        self.assertEqual(updates, {"Ana": "Ana waits."})
+        self.assertEqual(world.clock, 10)
+        self.assertLessEqual(mock_llm.call_args.kwargs["timeout"], 2.0)
+
+    @patch("game.check_arc_resolution", side_effect=LLMTimeoutError("late"))
+    @patch("game.get_structured_response", side_effect=LLMTimeoutError("late"))
+    @patch("game.get_response", side_effect=LLMTimeoutError("late"))
+    @patch("builtins.print")
+    def test_every_stage_falls_back_when_out_of_time(self, mock_print, *mocks):
+        """A turn whose calls all time out should still finish with fallbacks."""
+        world = GameWorld(
+            situation="s",
+            places=[Place("Dock", "bay")],
+            characters=[Character("Ana", "pilot", "Dock")],
+            player=PlayerCharacter("Vex", "lockpicking", "greed", "Dock"),
+        )
+        session = GameSession(world=world, messages=[], journal_path=None)
+        with patch.object(session, "record") as mock_record:
+            response = play_turn(session, "pick the lock")
+
+        self.assertEqual(response, "You pick the lock.")
+        self.assertEqual(world.clock, 5)
+        self.assertEqual(
+            session.deferred_arc_checks, [("pick the lock", "You pick the lock.")]
+        )
+        # Budget-planned degradations also carry the time remaining
+        fallbacks = [
+            (c.kwargs["stage"], c.kwargs["degradation"])
+            for c in mock_record.call_args_list
+            if c.args == ("degradation",) and "remaining" not in c.kwargs
+        ]
+        self.assertEqual(
+            fallbacks,
+            [
+                ("feasibility", "assume_feasible"),
+                ("time_estimate", "default_duration"),
+                ("arc_resolution", DEFER_ARCS),
+                ("narration", "initial_outcome"),
+            ],
+        )
+        for mock in mocks:
+            self.assertIn("timeout", mock.call_args.kwargs)
+
+    @patch("game.check_arc_resolution", side_effect=LLMTimeoutError("late"))
+    @patch("game.get_structured_response", side_effect=LLMTimeoutError("late"))
+    @patch("game.get_response", side_effect=LLMTimeoutError("late"))
+    @patch("builtins.print")
+    def test_undo_drops_deferred_arc_checks_of_undone_turn(self, *mocks):
+        """An undone action should never reach a later arc check."""
+        world = GameWorld(
+            situation="s",
+            places=[Place("Dock", "bay")],
+            characters=[Character("Ana", "pilot", "Dock")],
+            player=PlayerCharacter("Vex", "lockpicking", "greed", "Dock"),
+        )
+        session = GameSession(world=world, messages=[], journal_path=None)
+        play_turn(session, "pick the lock")
+        play_turn(session, "open the door")
+        self.assertEqual(len(session.deferred_arc_checks), 2)
+
+        undo_turn(session)
+        self.assertEqual(
+            session.deferred_arc_checks, [("pick the lock", "You pick the lock.")]
+        )
+        undo_turn(session)
+        self.assertEqual(session.deferred_arc_checks, [])
+
+
+class TestTracing(unittest.TestCase):
+    """Tests for stage-level tracing."""
+
+    def test_spans_nest_and_are_noops_without_a_tracer(self):
+        """Spans should record depth under a tracer and nothing otherwise."""
+        with span("orphan") as orphan:
+            self.assertIsNone(orphan)
+
+        tracer = Tracer()
+        with tracing(tracer):
+            with span("turn", turn=0):
+                with span("feasibility"):
+                    pass
+        spans = tracer.snapshot()
+        self.assertEqual(
+            [(s.name, s.depth) for s in spans], [("turn", 0), ("feasibility", 1)]
+        )
+        self.assertGreaterEqual(spans[0].duration, spans[1].duration)
+
+    @patch("llm.backoff_delay", return_value=0)
+    @patch("llm.litellm.completion")
+    def test_llm_calls_are_traced(self, mock_completion, _):
+        """Each LLM call should record its model, call site, size, and retries."""
+        mock_completion.side_effect = [ProviderError(503), make_completion("ok")]
+        tracer = Tracer()
+        with tracing(tracer):
+            get_response([{"role": "user", "content": "traced"}], call_site="opening")
+
+        (call,) = tracer.snapshot()
+        self.assertEqual(call.category, "llm")
+        self.assertEqual(call.attrs["call_site"], "opening")
+        self.assertEqual(call.attrs["model"], MODEL)
+        self.assertEqual(call.attrs["prompt_chars"], len("traced"))
+        self.assertEqual(call.attrs["retries"], 1)
+
+    def test_exports(self):
+        """Spans should export as trace events and a per-turn waterfall."""
+        tracer = Tracer()
+        with tracing(tracer):
+            with span("initialize_world"):
+                pass
+            with span("turn", turn=0):
+                with span("narration"):
+                    time.sleep(0.01)
+
+        events = chrome_trace(tracer.snapshot())["traceEvents"]
+        self.assertEqual({e["ph"] for e in events}, {"X"})
+        self.assertEqual(len(events), 3)
+
+        lines = waterfall(tracer.last_turn()).splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[0].startswith("turn"))
+        self.assertTrue(lines[1].startswith("  narration"))
+        self.assertIn("█", lines[1])
+
+
+class TestUsageAccounting(unittest.TestCase):
+    """Tests for per-call-site token and cost accounting."""
+
+    def test_reads_provider_usage(self):
+        """Prompt, completion, and cached tokens should all be picked up."""
+        response = SimpleNamespace(
+            usage=SimpleNamespace(
+                prompt_tokens=1200,
+                completion_tokens=80,
+                prompt_tokens_details=SimpleNamespace(cached_tokens=1000),
+            )
+        )
+        usage = usage_from_response(response, cost=0.002)
+        self.assertEqual(
+            (usage.prompt_tokens, usage.completion_tokens, usage.cached_tokens),
+            (1200, 80, 1000),
+        )
+        self.assertEqual(usage_from_response(SimpleNamespace()).total_tokens, 0)
+
+    @patch("llm.litellm.completion")
+    def test_calls_are_charged_to_the_session(self, mock_completion):
+        """Calls inside accounting() should land in that ledger by call site."""
+        reply = make_completion("ok")
+        reply.usage = SimpleNamespace(prompt_tokens=300, completion_tokens=20)
+        mock_completion.return_value = reply
+
+        ledger = UsageLedger()
+        with accounting(ledger):
+            get_response([{"role": "user", "content": "u1"}], call_site="opening")
+            get_response([{"role": "user", "content": "u2"}], call_site="narration")
+            get_response([{"role": "user", "content": "u3"}], call_site="narration")
+        get_response([{"role": "user", "content": "u4"}], call_site="narration")
+
+        self.assertEqual(ledger.by_call_site["narration"].calls, 2)
+        self.assertEqual(ledger.by_call_site["opening"].prompt_tokens, 300)
+        self.assertEqual(ledger.session.total_tokens, 960)
+        self.assertEqual(ledger.end_turn().calls, 3)
+        self.assertEqual(ledger.turn.calls, 0)
+
+        report = ledger.report().splitlines()
+        self.assertTrue(report[1].startswith("narration"))
+        self.assertTrue(report[3].startswith("total"))
+
+    def test_budget_ceiling(self):
+        """A session at its ceiling should refuse to start another turn."""
+        ledger = UsageLedger(token_budget=1000, cost_budget=None)
+        ledger.record("narration", Usage(calls=1, prompt_tokens=600))
+        ledger.check()
+        ledger.record("narration", Usage(calls=1, prompt_tokens=400))
+        with self.assertRaises(BudgetExceededError):
+            ledger.check()
+
+
+class TestMetrics(unittest.TestCase):
+    """Tests for the Prometheus metrics exporter."""
+
+    def test_render_histogram_and_counter(self):
+        """Histograms should expose cumulative buckets, sum, and count."""
+        metrics = MetricsRegistry()
+        latency = metrics.histogram("t_seconds", "Latency.", ("stage",), (1.0, 5.0))
+        latency.observe(0.5, stage="narration")
+        latency.observe(3.0, stage="narration")
+        latency.observe(9.0, stage="narration")
+        metrics.counter("t_total", "Calls.").inc()
+
+        lines = metrics.render().splitlines()
+        self.assertIn("# TYPE t_seconds histogram", lines)
+        self.assertIn('t_seconds_bucket{stage="narration",le="1"} 1', lines)
+        self.assertIn('t_seconds_bucket{stage="narration",le="5"} 2', lines)
+        self.assertIn('t_seconds_bucket{stage="narration",le="+Inf"} 3', lines)
+        self.assertIn('t_seconds_sum{stage="narration"} 12.5', lines)
+        self.assertIn("t_total 1", lines)
+        with self.assertRaises(ValueError):
+            latency.observe(1.0)
+
+    def test_exporters(self):
+        """Metrics should be scrapeable over HTTP and writable to a file."""
+        metrics = MetricsRegistry()
+        metrics.callback("t_sessions", "Sessions.", "gauge", lambda: {(): 3})
+
+        server = serve_metrics(0, "127.0.0.1", metrics)
+        try:
+            url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+            with urllib.request.urlopen(url) as reply:
+                self.assertIn("t_sessions 3", reply.read().decode())
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, "metrics.prom")
+            write_metrics(path, metrics)
+            with open(path) as f:
+                self.assertIn("t_sessions 3", f.read())
+        finally:
+            shutil.rmtree(directory)
+
+    @patch("llm.litellm.completion")
+    def test_llm_calls_are_counted(self, mock_completion):
+        """Each LLM call should land in the per-call-site metrics."""
+        import llm
+
+        mock_completion.return_value = make_completion("ok")
+        before = llm.llm_calls.get(call_site="metrics_test", outcome="ok")
+        get_response([{"role": "user", "content": "m"}], call_site="metrics_test")
+        self.assertEqual(
+            llm.llm_calls.get(call_site="metrics_test", outcome="ok"), before + 1
+        )
+        self.assertEqual(llm.llm_call_seconds.count(call_site="metrics_test"), 1)
+
+
+class TestStartup(unittest.TestCase):
+    """Tests for fast startup."""
+
+    def test_import_game_does_not_import_litellm(self):
+        """litellm should load on first use, not when the game is imported."""
+        result = subprocess.run(
+            [sys.executable, "-c", "import sys, game; print('litellm' in sys.modules)"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+        self.assertEqual(result.stdout.strip(), "False")
+
+    def test_litellm_is_reachable_through_llm(self):
+        """llm.litellm should still resolve, so existing patches keep working."""
+        import llm
+
+        self.assertTrue(callable(llm.litellm.completion))
+
+
+class TestLLMClient(unittest.TestCase):
+    """Tests for the shared client and its compiled schemas."""
+
+    def test_schemas_are_compiled_once(self):
+        """Every schemas.py model should compile once and then be reused."""
+        client = LLMClient()
+        self.addCleanup(client.close)
+        client.precompile()
+        self.assertEqual(set(client.schemas), set(schema_models()))
+        self.assertIn(AdjudicationResponse, client.schemas)
+        self.assertIs(
+            client.response_format(AdjudicationResponse),
+            client.schemas[AdjudicationResponse],
+        )
+
+    @patch("llm.litellm.completion")
+    def test_structured_calls_use_the_shared_client(self, mock_completion):
+        """Structured calls should pass the compiled schema and the pool."""
+        import llm
+
+        mock_completion.return_value = make_completion('{"arcs": []}')
+        from schemas import NarrativeArcsResponse
+
+        get_structured_response(
+            [{"role": "user", "content": "client"}], NarrativeArcsResponse
+        )
+        kwargs = mock_completion.call_args.kwargs
+        client = llm.get_client()
+        self.assertIs(kwargs["client"], client.http)
+        self.assertIs(
+            kwargs["response_format"], client.response_format(NarrativeArcsResponse)
+        )
+
+    def test_prewarm_opens_connections(self):
+        """Pre-warming should reach the endpoint once per connection."""
+        import httpx
+
+        hits = []
+        client = LLMClient(endpoint="https://provider.test")
+        client.pool = httpx.Client(
+            transport=httpx.MockTransport(
+                lambda request: hits.append(request) or httpx.Response(404)
+            )
+        )
+        self.addCleanup(client.close)
+        self.assertEqual(client.prewarm(3), 3)
+        self.assertEqual(len(hits), 3)
+        self.assertEqual({r.method for r in hits}, {"HEAD"})
+
+    def test_endpoint_follows_the_provider_base_url(self):
+        """Pre-warming should reach wherever litellm will send MODEL's calls."""
+        import litellm
+
+        environ = {"ANTHROPIC_BASE_URL": "https://proxy.test"}
+        with patch.dict(os.environ, environ):
+            os.environ.pop("ANTHROPIC_API_BASE", None)
+            self.assertEqual(model_endpoint(MODEL), "https://proxy.test")
+            with patch.object(litellm, "api_base", "https://gateway.test"):
+                self.assertEqual(model_endpoint(MODEL), "https://gateway.test")
+                client = LLMClient()
+                self.addCleanup(client.close)
+                self.assertEqual(client.endpoint, "https://gateway.test")
+
+
+class TestLoadTest(unittest.TestCase):
+    """Tests for the headless load-test mode."""
+
+    def test_fake_values_satisfy_schemas(self):
+        """The fake backend should only produce schema-valid responses."""
+        import random
+
+        for model in schema_models():
+            schema = model.model_json_schema()
+            data = fake_value(schema, schema.get("$defs", {}), random.Random(1))
+            model.model_validate(data)
+
+    def test_percentile(self):
+        """Percentiles should use the nearest rank."""
+        values = [float(v) for v in range(1, 101)]
+        self.assertEqual(percentile(values, 0.5), 50.0)
+        self.assertEqual(percentile(values, 0.99), 99.0)
+        self.assertEqual(percentile([], 0.5), 0.0)
+
+    def test_concurrent_sessions_against_fake_backend(self):
+        """A short run should play every turn and report LLM calls per turn."""
+        import game
+
+        previous = game._dev_output
+        game.set_dev_output(False)
+        self.addCleanup(game.set_dev_output, previous)
+
+        report = run_load_test(
+            sessions=2, turns=2, script=["look around"], backend=FakeBackend()
+        )
+        self.assertEqual(report["turns"], 4)
+        self.assertEqual(report["turn_error_rate"], 0.0)
+        self.assertEqual(report["session_error_rate"], 0.0)
+        self.assertGreater(report["llm_calls_per_turn"], 0)
+        self.assertGreater(report["turns_per_second"], 0)
+
+
+class TestProcgen(unittest.TestCase):
+    """Tests for procedural world generation."""
+
+    def setUp(self):
+        import game
+
+        previous = game._dev_output
+        game.set_dev_output(False)
+        self.addCleanup(game.set_dev_output, previous)
+
+    def test_entities_are_consistent(self):
+        """Characters should stand in generated places, with an antagonist first."""
+        from procgen import ANTAGONIST_ROLES
+
+        for seed in range(20):
+            entities = ProceduralGenerator(seed).entities(3, 4)
+            WorldEntitiesResponse.model_validate(entities.model_dump())
+            place_names = {p.name for p in entities.places}
+            self.assertEqual(len(place_names), 3)
+            self.assertEqual(len(entities.characters), 4)
+            self.assertIn(entities.characters[0].role, ANTAGONIST_ROLES)
+            for character in entities.characters:
+                self.assertIn(character.location, place_names)
+
+    def test_large_casts_get_unique_names(self):
+        """More characters than name pairings should still all be named."""
+        from procgen import FIRST_NAMES, SURNAMES, roman
+
+        count = len(FIRST_NAMES) * len(SURNAMES) + 50
+        entities = ProceduralGenerator(1).entities(3, count)
+        names = [c.name for c in entities.characters]
+        self.assertEqual(len(set(names)), count)
+        self.assertTrue(any(name.endswith(" II") for name in names))
+        self.assertEqual(roman(1994), "MCMXCIV")
+
+    def test_place_count_is_enforced(self):
+        """Asking for more places than there are place types should fail."""
+        from procgen import PLACE_TABLE
+
+        self.assertEqual(
+            len(ProceduralGenerator(1).entities(len(PLACE_TABLE), 1).places),
+            len(PLACE_TABLE),
+        )
+        for count in (0, len(PLACE_TABLE) + 1):
+            with self.assertRaises(ValueError):
+                ProceduralGenerator(1).entities(count, 3)
+
+    def test_adjacency_is_symmetric_and_connected(self):
+        """Every place should be reachable, and paths should run both ways."""
+        names = ["A", "B", "C", "D", "E"]
+        adjacent = ProceduralGenerator(3).adjacency(names)
+        for name, neighbours in adjacent.items():
+            self.assertNotIn(name, neighbours)
+            for neighbour in neighbours:
+                self.assertIn(name, adjacent[neighbour])
+        reached, frontier = {"A"}, ["A"]
+        while frontier:
+            for neighbour in adjacent[frontier.pop()]:
+                if neighbour not in reached:
+                    reached.add(neighbour)
+                    frontier.append(neighbour)
+        self.assertEqual(reached, set(names))
+
+    def test_seeded_generation_is_repeatable(self):
+        """The same seed should give the same world."""
+        first, second = ProceduralGenerator(7), ProceduralGenerator(7)
+        self.assertEqual(first.situation(), second.situation())
+        self.assertEqual(first.entities(), second.entities())
+
+    @patch("game.get_structured_response", side_effect=AssertionError("LLM call"))
+    @patch("game.get_response", side_effect=AssertionError("LLM call"))
+    def test_offline_mode_makes_no_llm_calls(self, mock_response, mock_structured):
+        """Offline worlds and openings should come entirely from the tables."""
+        world = initialize_world("offline")
+        messages = start_session(world, "offline")
+
+        self.assertTrue(world.situation)
+        self.assertIsNotNone(world.get_place(world.player.location))
+        self.assertTrue(all(p.initial_state and p.adjacent for p in world.places))
+        self.assertTrue(all(c.initial_state for c in world.characters))
+        self.assertTrue(world.narrative_arcs)
+        self.assertIn(world.player.name, messages[-1]["content"])
+
+    @patch("game.warm_up")
+    @patch("game.get_structured_response")
+    @patch("game.get_response", return_value="The dome is breached.")
+    def test_hybrid_mode_uses_llm_for_situation_and_arcs(
+        self, mock_response, mock_structured, mock_warm_up
+    ):
+        """Hybrid mode should make exactly one situation and one arcs call."""
+        mock_structured.return_value = NarrativeArcsResponse(
+            arcs=[
+                {
+                    "name": "Breach",
+                    "problem": "The dome is breached.",
+                    "stakes": "Everyone's air.",
+                    "resolution_criteria": "The breach is sealed.",
+                    "possible_resolutions": ["seal it"],
+                }
+            ]
+        )
+        world = initialize_world("hybrid")
+
+        mock_response.assert_called_once()
+        mock_structured.assert_called_once()
+        self.assertIs(mock_structured.call_args.args[1], NarrativeArcsResponse)
+        self.assertEqual(world.situation, "The dome is breached.")
+        self.assertEqual([arc.name for arc in world.narrative_arcs], ["Breach"])
+
+    def test_unknown_mode_is_rejected(self):
+        """A typo in the mode should fail loudly rather than fall back."""
+        with self.assertRaises(ValueError):
+            initialize_world("procedural")
+
+
+class TestPrefetch(unittest.TestCase):
+    """Tests for speculative prefetch during input idle time."""
+
+    def setUp(self):
+        self.world = GameWorld(
+            situation="The air recyclers are failing.",
+            characters=[Character("Grimbold", "smuggler", "Bazaar")],
+            places=[Place("Bazaar", "market", adjacent=["Dock"]), Place("Dock", "dock")],
+            player=PlayerCharacter("Vex", "lockpicking", "greed", "Bazaar"),
+        )
+        self.feasibility = FeasibilityResponse(
+            feasible=True,
+            flaw_triggered=False,
+            dice_roll={"needed": False},
+            initial_outcome="You look around.",
+        )
+        prefetch_cache.clear()
+        self.addCleanup(prefetch_cache.clear)
+
+    def test_world_version_changes_on_mutation(self):
+        """Every mutation should move the version, and no two worlds share one."""
+        other = GameWorld(situation="Another world.")
+        self.assertNotEqual(self.world.version, other.version)
+        versions = [self.world.version]
+        self.world.move_character(self.world.get_character("Grimbold"), "Dock")
+        versions.append(self.world.version)
+        self.world.add_item("Vex", "lamp")
+        versions.append(self.world.version)
+        self.world.touch()
+        versions.append(self.world.version)
+        self.assertEqual(len(set(versions)), 4)
+
+    def test_likely_actions(self):
+        """Guesses should cover looking, talking to people here, and moving on."""
+        actions = likely_actions(self.world, 5)
+        self.assertEqual(actions, ["look around", "talk to Grimbold", "go to Dock"])
+        self.assertEqual(likely_actions(self.world, 1), ["look around"])
+        self.assertEqual(normalize_action("  Look   AROUND. "), "look around")
+
+    def test_cache_expires_entries(self):
+        """Results older than the TTL should be dropped."""
+        cache = PrefetchCache(ttl=0.0)
+        cache.reserve(("feasibility", 1, "look")).set_result("stale")
+        self.assertIsNone(cache.take(("feasibility", 1, "look")))
+
+    def test_take_waits_for_running_prefetch(self):
+        """A turn should wait on a prefetch in flight rather than repeat it."""
+        cache = PrefetchCache()
+        future = cache.reserve(("feasibility", 1, "look"))
+        self.assertIsNone(cache.reserve(("feasibility", 1, "look")))
+        threading.Timer(0.05, future.set_result, ("done",)).start()
+        self.assertEqual(cache.take(("feasibility", 1, "look")), "done")
+        self.assertIsNone(cache.take(("feasibility", 1, "look")))
+
+    def test_take_gives_up_on_slow_prefetch(self):
+        """A prefetch still queued behind the turn's own calls should be a miss."""
+        cache = PrefetchCache(wait_seconds=0.05)
+        future = cache.reserve(("feasibility", 1, "look"))
+        started = time.monotonic()
+        self.assertIsNone(cache.take(("feasibility", 1, "look")))
+        self.assertLess(time.monotonic() - started, 1.0)
+        self.assertFalse(future.done())
+
+    @patch("game.get_response", return_value="10 minutes")
+    @patch("game.get_structured_response")
+    def test_turn_uses_prefetched_feasibility(self, mock_structured, mock_response):
+        """A matching action should skip the call until the world changes."""
+        mock_structured.return_value = self.feasibility
+        session = GameSession(
+            world=self.world, messages=[], journal_path=None, save_path=None
+        )
+        prefetcher = start_prefetch(session)
+        prefetcher.thread.join(5)
+        self.assertTrue(
+            all(c.kwargs["call_site"] == "prefetch" for c in mock_structured.mock_calls)
+        )
+        prefetched_calls = mock_structured.call_count
+
+        self.assertIs(check_feasibility(self.world, "Look around."), self.feasibility)
+        self.assertEqual(estimate_time("look around"), "10 minutes")
+        self.assertEqual(mock_structured.call_count, prefetched_calls)
+        self.assertEqual(mock_response.call_count, prefetched_calls)
+
+        self.world.move_character(self.world.get_character("Grimbold"), "Dock")
+        check_feasibility(self.world, "talk to Grimbold")
+        self.assertEqual(mock_structured.call_count, prefetched_calls + 1)
+        self.assertEqual(
+            mock_structured.call_args.kwargs["call_site"], "feasibility"
+        )
+
+    def test_cancel_stops_new_tasks(self):
+        """Once input arrives no further prefetches should start."""
+        started = []
+        tasks = [(("task", None, i), partial(started.append, i)) for i in range(3)]
+        prefetcher = Prefetcher(tasks, PrefetchCache())
+        prefetcher.cancel()
+        prefetcher.start().thread.join(5)
+        self.assertEqual(started, [])
+
+
+class TestStateDeltas(unittest.TestCase):
+    """Tests for structured simulation deltas applied to the world."""
+
+    def setUp(self):
+        self.world = GameWorld(
+            situation="The air recyclers are failing.",
+            places=[
+                Place("Bazaar", "market", adjacent=["Dock"], inventory=["crate"]),
+                Place("Dock", "bay", adjacent=["Bazaar"]),
+                Place("Vault", "vault"),
+            ],
+            characters=[
+                Character("Grimbold", "smuggler", "Bazaar", ["crowbar", "ore"]),
+                Character("Ithilwen", "netrunner", "Bazaar", initial_state="Typing."),
+                Character("Bo", "guard", "Vault", ["key"]),
+            ],
+            player=PlayerCharacter("Vex", "lockpicking", "greed", "Bazaar"),
+        )
+
+    def test_character_delta_updates_world_and_indexes(self):
+        """Moves and trades within reach should go through the indexes."""
+        grimbold = self.world.get_character("Grimbold")
+        delta = CharacterDeltaSchema(
+            action="Grimbold pays off Vex and slips out.",
+            moved_to="Dock",
+            items_given=[
+                {"item": "ore", "other": "Vex"},
+                {"item": "crowbar", "other": "Bo"},  # not in reach
+                {"item": "laser", "other": "Ithilwen"},  # not held
+            ],
+            items_taken=[{"item": "crate", "other": "Bazaar"}],
+            new_state="Lurking at the dock.",
+        )
+        changes = apply_character_delta(self.world, grimbold, delta)
+
+        self.assertEqual(
+            changes, ["gave ore to Vex", "took crate from Bazaar", "moved to Dock"]
+        )
+        self.assertEqual(grimbold.location, "Dock")
+        self.assertEqual(
+            [c.name for c in self.world.characters_at("Dock")], ["Grimbold"]
+        )
+        self.assertEqual(self.world.holders_of("ore"), ["Vex"])
+        self.assertEqual(self.world.holders_of("crate"), ["Grimbold"])
+        self.assertEqual(self.world.holders_of("crowbar"), ["Grimbold"])
+        self.assertEqual(grimbold.current_state, "Lurking at the dock.")
+
+    def test_moves_are_limited_to_destinations(self):
+        """Unconnected or unknown places should be ignored."""
+        grimbold = self.world.get_character("Grimbold")
+        for place in ("Vault", "The Moon"):
+            delta = CharacterDeltaSchema(action="a", moved_to=place, new_state="s")
+            self.assertEqual(apply_character_delta(self.world, grimbold, delta), [])
+        self.assertEqual(grimbold.location, "Bazaar")
+        # Places without a map may be left for any known place
+        bo = self.world.get_character("Bo")
+        delta = CharacterDeltaSchema(action="a", moved_to="Dock", new_state="s")
+        apply_character_delta(self.world, bo, delta)
+        self.assertEqual(bo.location, "Dock")
+
+    def test_place_delta(self):
+        """Places should gain and lose items through the item index."""
+        bazaar = self.world.get_place("Bazaar")
+        delta = PlaceDeltaSchema(
+            event="A crate is smashed and a drone crashes.",
+            items_added=["drone wreck"],
+            items_removed=["crate", "piano"],
+            new_state="Littered with debris.",
+        )
+        changes = apply_place_delta(self.world, bazaar, delta)
+        self.assertEqual(changes, ["lost crate", "gained drone wreck"])
+        self.assertEqual(self.world.holders_of("crate"), [])
+        self.assertEqual(self.world.holders_of("drone wreck"), ["Bazaar"])
+
+    @patch("game.get_structured_response")
+    @patch("builtins.print")
+    def test_simulation_keeps_state_compact(self, mock_print, mock_llm):
+        """Context should carry the current state, not the whole update log."""
+
+        def respond(messages, model, **kwargs):
+            turn = mock_llm.call_count
+            if model is CharacterDeltaSchema:
+                return CharacterDeltaSchema(
+                    action=f"Action {turn}.", new_state=f"State {turn}."
+                )
+            return PlaceDeltaSchema(event=f"Event {turn}.", new_state=f"Mood {turn}.")
+
+        mock_llm.side_effect = respond
+        for _ in range(3):
+            simulate_time_passage(self.world, "10 minutes")
+
+        ithilwen = self.world.get_character("Ithilwen")
+        self.assertEqual(len(ithilwen.updates), 3)
+        context = build_world_context(self.world)
+        self.assertIn(ithilwen.current_state, context)
+        self.assertNotIn("Typing.", context)
+        self.assertNotIn(ithilwen.updates[0], context)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "save.json")
+            save_session(path, self.world, [])
+            loaded, _, _ = load_session(path)
+        self.assertEqual(
+            loaded.get_character("Ithilwen").current_state, ithilwen.current_state
+        )
+        self.assertEqual(
+            loaded.get_place("Dock").state, self.world.get_place("Dock").state
+        )
+
+
+class TestNarrationWindow(unittest.TestCase):
+    """Tests for the history window sent to narration."""
+
+    def exchange(self, n):
+        return [
+            {"role": "user", "content": f"action {n}"},
+            {"role": "system", "content": f"WHAT JUST HAPPENED {n}"},
+            {"role": "assistant", "content": f"story {n}"},
+        ]
+
+    def test_window_slides_in_blocks(self):
+        """Old exchanges should be dropped a block at a time."""
+        head = [
+            {"role": "system", "content": "world"},
+            {"role": "assistant", "content": "opening"},
+        ]
+        messages = list(head)
+        kept = []
+        for n in range(7):
+            messages += self.exchange(n)[:2]
+            window = narration_messages(messages, 2)
+            self.assertEqual(window[:2], head)
+            self.assertEqual(window[-2:], messages[-2:])
+            kept.append(sum(m["role"] == "user" for m in window))
+            messages.append(self.exchange(n)[2])
+        # Past exchanges kept, plus the current one
+        self.assertEqual(kept, [1, 2, 3, 4, 3, 4, 3])
+        self.assertEqual(narration_messages(messages, None), messages)
+
+    def test_narration_prompt_stays_bounded(self):
+        """A long session should not grow the narration prompt past the window."""
+        import game
+
+        previous = game._dev_output
+        game.set_dev_output(False)
+        self.addCleanup(game.set_dev_output, previous)
+        backend = FakeBackend()
+        narrated = []
+        completion = backend.completion
+
+        def recording_completion(**kwargs):
+            messages = kwargs["messages"]
+            if messages[0]["role"] == "system" and len(messages) > 2:
+                narrated.append(messages)
+            return completion(**kwargs)
+
+        backend.completion = recording_completion
+        with installed(backend), patch("game.NARRATION_HISTORY_EXCHANGES", 2):
+            session = open_session(journal_path=None, save_path=None, trace_path=None)
+            for _ in range(12):
+                play_turn(session, "look around")
+            session.close()
+
+        self.assertEqual(len(narrated), 12)
+        # System prompt, opening, at most three past exchanges, the current one
+        self.assertLessEqual(max(len(m) for m in narrated), 2 + 3 * 3 + 2)
+        self.assertEqual(len(session.messages), 2 + 12 * 3)
+
+
 class TestUI(unittest.TestCase):
     """Tests for UI functions."""
 
@@ -97,7 +2019,18 @@ class TestUI(unittest.TestCase):
         self.assertIn("═", call_arg)
 
 
-class TestGameLoop(unittest.TestCase):
+class InTempDirectory(unittest.TestCase):
+    """Runs each test from a scratch directory, so saves, journals, and traces
+    the game writes to relative paths never land in the repository."""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(directory)
+
+
+class TestGameLoop(InTempDirectory):
     """Integration tests for the main game loop."""
 
     @patch("game.get_response")
@@ -116,6 +2049,17 @@ class TestGameLoop(unittest.TestCase):
         goodbye_printed = any("Thanks for playing" in call for call in print_calls)
         self.assertTrue(goodbye_printed)
 
+    @patch("game.warm_up")
+    @patch("game.WORLD_GENERATION_MODE", "offline")
+    @patch("game.get_input", return_value="quit")
+    @patch("builtins.print")
+    def test_offline_mode_skips_warm_up(self, mock_print, mock_input, mock_warm_up):
+        """An offline world needs no provider connection to start."""
+        from game import run_game
+        run_game()
+
+        mock_warm_up.assert_not_called()
+
     @patch("game.get_response")
     @patch("game.get_input")
     @patch("builtins.print")
@@ -176,7 +2120,7 @@ class TestGameLoop(unittest.TestCase):
         self.assertEqual(mock_llm.call_count, 1)
 
 
-class TestMessageHistory(unittest.TestCase):
+class TestMessageHistory(InTempDirectory):
     """Tests for message history management."""
 
     @patch("game.get_response")
@@ -0,0 +1,305 @@
+"""
+Copy-on-write session timeline for PEACE_COM.
+
+Each turn is committed as a snapshot holding only what changed since its
+parent: the entity records that differ, the update log entries, messages,
+and history events added. Unchanged state is shared with the parent, so undo,
+forking a "what if" branch, and replaying prompts from an identical state
+never require deep-copying the world.
+
+Messages are assumed to be append-only apart from the system prompt at
+index 0, which is tracked separately. That matches how run_game uses them.
+Update logs are assumed to be append-only too, except that a log shorter
+than last time (a replaced entity) is stored again in full.
+"""
+
+import json
+
+from models import GameWorld, UpdateLog
+from persistence import (
+    encode_character,
+    encode_place,
+    encode_arc,
+    encode_player,
+    decode_world,
+)
+
+ORDER_KEY = ("order",)
+
+
+def freeze(value):
+    """Convert nested lists into tuples so records are immutable and hashable."""
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def thaw(value):
+    """Convert nested tuples back into lists for the persistence decoders."""
+    if isinstance(value, tuple):
+        return [thaw(item) for item in value]
+    return value
+
+
+def capture_records(world: GameWorld) -> dict[tuple, tuple]:
+    """Encode every entity as an immutable record, keyed by kind and name.
+
+    Character and place records leave out their update logs, which
+    capture_updates tracks separately so they can be stored as deltas.
+    """
+    records = {("world",): (world.situation, world.clock)}
+    records[("player",)] = freeze(encode_player(world.player))
+    for character in world.characters:
+        records[("character", character.name)] = freeze(
+            encode_character(character)[:-1]
+        )
+    for place in world.places:
+        records[("place", place.name)] = freeze(encode_place(place)[:-1])
+    for arc in world.narrative_arcs:
+        records[("arc", arc.name)] = freeze(encode_arc(arc))
+    return records
+
+
+def capture_updates(world: GameWorld) -> dict[tuple, UpdateLog]:
+    """Every character's and place's update log, keyed like capture_records."""
+    logs = {("character", c.name): c.updates for c in world.characters}
+    logs.update({("place", p.name): p.updates for p in world.places})
+    return logs
+
+
+class Snapshot:
+    """One committed turn: a parent pointer plus the delta from that parent."""
+
+    __slots__ = (
+        "parent",
+        "label",
+        "changes",
+        "updates",
+        "system",
+        "messages",
+        "message_count",
+        "history",
+        "history_count",
+        "extra",
+        "size",
+    )
+
+    def __init__(self, parent, label, changes, updates, system, messages, history):
+        self.parent = parent
+        self.label = label
+        self.changes = changes  # key -> record, or None if the entity was removed
+        # key -> (index of the first entry, (clock, text) entries from there on)
+        self.updates = updates
+        self.system = system  # new system message, or None if unchanged
+        self.messages = messages  # messages appended since the parent
+        self.history = history  # history events added since the parent
+        base_messages = parent.message_count if parent else 0
+        base_history = parent.history_count if parent else 0
+        self.message_count = base_messages + len(messages)
+        self.history_count = base_history + len(history)
+        self.extra = None  # caller state restored along with this snapshot
+        # Approximate bytes owned by this snapshot alone
+        self.size = len(
+            json.dumps(
+                [
+                    list(changes.items()),
+                    list(updates.items()),
+                    system,
+                    messages,
+                    history,
+                ]
+            )
+        )
+
+    def lineage(self):
+        """Yield this snapshot and its ancestors, newest first."""
+        node = self
+        while node is not None:
+            yield node
+            node = node.parent
+
+
+def materialize(snapshot: Snapshot) -> tuple[GameWorld, list[dict]]:
+    """Rebuild the full world and messages as of a snapshot."""
+    records: dict[tuple, tuple] = {}
+    system = None
+    message_chunks, history_chunks, update_chunks = [], [], []
+    for node in snapshot.lineage():
+        for key, record in node.changes.items():
+            records.setdefault(key, record)
+        if system is None and node.system is not None:
+            system = node.system
+        message_chunks.append(node.messages)
+        history_chunks.append(node.history)
+        update_chunks.append(node.updates)
+
+    logs: dict[tuple, list] = {}
+    for chunks in reversed(update_chunks):
+        for key, (start, entries) in chunks.items():
+            logs[key] = logs.get(key, [])[:start] + list(entries)
+
+    order = records[ORDER_KEY]
+    by_kind: dict[str, list] = {"character": [], "place": [], "arc": []}
+    for key in order:
+        if len(key) == 2 and records.get(key) is not None:
+            record = thaw(records[key])
+            if key[0] != "arc":
+                entries = logs.get(key, [])
+                record.append([[c for c, _ in entries], [t for _, t in entries]])
+            by_kind[key[0]].append(record)
+    situation, clock = records[("world",)]
+    world = decode_world(
+        {
+            "situation": situation,
+            "clock": clock,
+            "player": thaw(records[("player",)]),
+            "characters": by_kind["character"],
+            "places": by_kind["place"],
+            "arcs": by_kind["arc"],
+            "history": [
+                list(event) for chunk in reversed(history_chunks) for event in chunk
+            ],
+        }
+    )
+    messages = [dict(m) for chunk in reversed(message_chunks) for m in chunk]
+    if system is not None:
+        messages[0] = dict(system)
+    return world, messages
+
+
+class Timeline:
+    """Named branches of snapshots over one session.
+
+    Creating a branch is O(1): it is just another name pointing at an
+    existing snapshot.
+    """
+
+    def __init__(
+        self, world: GameWorld, messages: list[dict], label: str = "start"
+    ):
+        self.branches: dict[str, Snapshot] = {}
+        self.current = "main"
+        self._head_records: dict[tuple, tuple] = {}
+        self._head_update_counts: dict[tuple, int] = {}
+        self._head_system = None
+        root = self._build(None, world, messages, label)
+        self.branches["main"] = root
+
+    @property
+    def head(self) -> Snapshot:
+        return self.branches[self.current]
+
+    def _build(self, parent, world, messages, label) -> Snapshot:
+        records = capture_records(world)
+        order = tuple(records)
+        changes = {
+            key: record
+            for key, record in records.items()
+            if self._head_records.get(key) != record
+        }
+        for key in self._head_records:
+            if key not in records and key != ORDER_KEY:
+                changes[key] = None
+        if self._head_records.get(ORDER_KEY) != order:
+            changes[ORDER_KEY] = order
+        records[ORDER_KEY] = order
+
+        updates = {}
+        update_counts = {}
+        for key, log in capture_updates(world).items():
+            previous = self._head_update_counts.get(key)
+            if previous is None or len(log) != previous:
+                start = previous if previous is not None and len(log) > previous else 0
+                updates[key] = (
+                    start,
+                    tuple(zip(log.offsets[start:], log.texts[start:])),
+                )
+            update_counts[key] = len(log)
+
+        system = messages[0] if messages else None
+        if system == self._head_system:
+            system = None
+        elif system is not None:
+            self._head_system = dict(system)
+        message_start = parent.message_count if parent else 0
+        history_start = parent.history_count if parent else 0
+        history = tuple(
+            (e.kind, e.text, e.clock) for e in world.history.entries[history_start:]
+        )
+        snapshot = Snapshot(
+            parent,
+            label,
+            changes,
+            updates,
+            system,
+            tuple(dict(m) for m in messages[message_start:]),
+            history,
+        )
+        self._head_records = records
+        self._head_update_counts = update_counts
+        return snapshot
+
+    def commit(
+        self, world: GameWorld, messages: list[dict], label: str = "", extra=None
+    ) -> Snapshot:
+        """Record the current state as a new snapshot on the current branch.
+
+        `extra` is kept as is on the snapshot, for callers that need state
+        of their own back when they return to it.
+        """
+        snapshot = self._build(self.head, world, messages, label)
+        snapshot.extra = extra
+        self.branches[self.current] = snapshot
+        return snapshot
+
+    def _move_head(self, snapshot: Snapshot) -> tuple[GameWorld, list[dict]]:
+        self.branches[self.current] = snapshot
+        world, messages = materialize(snapshot)
+        self._head_records = capture_records(world)
+        self._head_records[ORDER_KEY] = tuple(
+            key for key in self._head_records if key != ORDER_KEY
+        )
+        self._head_update_counts = {
+            key: len(log) for key, log in capture_updates(world).items()
+        }
+        self._head_system = dict(messages[0]) if messages else None
+        return world, messages
+
+    def revert(self) -> tuple[GameWorld, list[dict]]:
+        """Return the current head's state, to discard changes not committed."""
+        return self._move_head(self.head)
+
+    def undo(self, steps: int = 1) -> tuple[GameWorld, list[dict]] | None:
+        """Step the current branch back. Returns None if there is nothing to undo."""
+        target = self.head
+        for _ in range(steps):
+            if target.parent is None:
+                return None
+            target = target.parent
+        return self._move_head(target)
+
+    def fork(self, name: str, at: Snapshot | None = None) -> None:
+        """Create a branch at a snapshot (the current head by default)."""
+        if name in self.branches:
+            raise ValueError(f"Branch {name!r} already exists")
+        self.branches[name] = at or self.head
+
+    def switch(self, name: str) -> tuple[GameWorld, list[dict]]:
+        """Make another branch current and return its state."""
+        if name not in self.branches:
+            raise KeyError(f"No branch named {name!r}")
+        self.current = name
+        return self._move_head(self.branches[name])
+
+    def memory_usage(self, name: str) -> dict[str, int]:
+        """Bytes used by a branch: in total, and not shared with any other branch."""
+        shared = set()
+        for other, head in self.branches.items():
+            if other != name:
+                shared.update(id(node) for node in head.lineage())
+        total = exclusive = 0
+        for node in self.branches[name].lineage():
+            total += node.size
+            if id(node) not in shared:
+                exclusive += node.size
+        return {"total": total, "exclusive": exclusive}
@@ -0,0 +1,175 @@
+"""
+Stage-level tracing for PEACE_COM.
+
+Spans time the stages of world generation, each stage of a turn, and every
+LLM call. A Tracer collects the spans of one session. They can be exported
+as Chrome trace-event JSON (open it in chrome://tracing or Perfetto) or
+rendered as a text waterfall for a single turn.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from config import TRACE_MAX_SPANS
+
+WATERFALL_WIDTH = 40  # characters in the bar column
+WATERFALL_LABEL_WIDTH = 28
+
+
+@dataclass(slots=True)
+class Span:
+    """One timed piece of work."""
+
+    name: str
+    category: str  # "stage" or "llm"
+    start: float  # seconds since the tracer was created
+    depth: int  # nesting level; 0 for top-level spans
+    thread: int
+    duration: float = 0.0
+    attrs: dict = field(default_factory=dict)
+
+    @property
+    def end(self) -> float:
+        return self.start + self.duration
+
+
+class Tracer:
+    """Collects finished spans for one session.
+
+    Only the most recent max_spans are kept, so a long session cannot grow
+    without bound.
+    """
+
+    def __init__(self, max_spans: int = TRACE_MAX_SPANS):
+        self.origin = time.monotonic()
+        self.spans: deque[Span] = deque(maxlen=max_spans)
+        self.lock = threading.Lock()
+
+    def record(self, finished: Span) -> None:
+        with self.lock:
+            self.spans.append(finished)
+
+    def snapshot(self) -> list[Span]:
+        """The recorded spans, ordered by start time."""
+        with self.lock:
+            return sorted(self.spans, key=lambda s: (s.start, s.depth))
+
+    def last_turn(self) -> list[Span]:
+        """The spans of the most recent finished turn, or [] if there is none."""
+        spans = self.snapshot()
+        turns = [s for s in spans if s.name == "turn"]
+        if not turns:
+            return []
+        root = turns[-1]
+        return [s for s in spans if root.start <= s.start <= root.end]
+
+
+_current_tracer: ContextVar[Tracer | None] = ContextVar("tracer", default=None)
+_current_span: ContextVar[Span | None] = ContextVar("span", default=None)
+
+
+@contextmanager
+def tracing(tracer: Tracer | None):
+    """Record spans opened within this context (and its tasks) to tracer."""
+    token = _current_tracer.set(tracer)
+    try:
+        yield tracer
+    finally:
+        _current_tracer.reset(token)
+
+
+def current_span() -> Span | None:
+    """The innermost open span, if tracing is active."""
+    return _current_span.get()
+
+
+@contextmanager
+def span(name: str, category: str = "stage", **attrs):
+    """Time the enclosed block. A no-op when no tracer is active.
+
+    Yields the span so the block can add attributes to it, or None.
+    """
+    tracer = _current_tracer.get()
+    if tracer is None:
+        yield None
+        return
+
+    parent = _current_span.get()
+    started = time.monotonic()
+    current = Span(
+        name=name,
+        category=category,
+        start=started - tracer.origin,
+        depth=parent.depth + 1 if parent else 0,
+        thread=threading.get_ident(),
+        attrs=attrs,
+    )
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as error:
+        current.attrs["error"] = type(error).__name__
+        raise
+    finally:
+        _current_span.reset(token)
+        current.duration = time.monotonic() - started
+        tracer.record(current)
+
+
+def chrome_trace(spans: list[Span]) -> dict:
+    """Convert spans to the Chrome trace-event format."""
+    return {
+        "traceEvents": [
+            {
+                "name": s.name,
+                "cat": s.category,
+                "ph": "X",
+                "ts": round(s.start * 1_000_000),
+                "dur": round(s.duration * 1_000_000),
+                "pid": os.getpid(),
+                "tid": s.thread,
+                "args": s.attrs,
+            }
+            for s in spans
+        ],
+        "displayTimeUnit": "ms",
+    }
+
+
+def write_chrome_trace(path: str, spans: list[Span]) -> None:
+    """Write spans to path as Chrome trace-event JSON."""
+    with open(path, "w") as f:
+        json.dump(chrome_trace(spans), f, default=str)
+
+
+def waterfall(spans: list[Span], width: int = WATERFALL_WIDTH) -> str:
+    """Render spans as a text waterfall, one line per span in start order."""
+    if not spans:
+        return ""
+    origin = min(s.start for s in spans)
+    total = max(max(s.end for s in spans) - origin, 1e-9)
+
+    lines = []
+    for s in sorted(spans, key=lambda s: (s.start, s.depth)):
+        offset = min(int((s.start - origin) / total * width), width - 1)
+        length = max(1, round(s.duration / total * width))
+        bar = (" " * offset + "█" * length)[:width]
+        label = "  " * s.depth + s.name
+        line = (
+            f"{label[:WATERFALL_LABEL_WIDTH]:<{WATERFALL_LABEL_WIDTH}} "
+            f"{s.duration * 1000:8.0f}ms |{bar:<{width}}|"
+        )
+        if s.category == "llm":
+            line += f" {s.attrs.get('model', '')}"
+            if s.attrs.get("retries"):
+                line += f" retries={s.attrs['retries']}"
+        if "error" in s.attrs:
+            line += f" error={s.attrs['error']}"
+        lines.append(line)
+    return "\n".join(lines)
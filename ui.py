@@ -4,15 +4,23 @@ CLI display functions for PEACE_COM.
 
 SEPARATOR = "═" * 60
 
+TITLE_TEXT = f"""{SEPARATOR}
+  PEACE_COM: LUNAR DUNGEON CRAWLER
+  [ 1987 - Luna Station Omega - Sector 7 ]
+{SEPARATOR}
+
+Initializing neural link...
+Type 'quit' to exit the simulation.
+"""
+
+GOODBYE_TEXT = """
+Disconnecting from neural link...
+Thanks for playing PEACE_COM."""
+
 
 def print_title():
     """Print the game title screen."""
-    print(SEPARATOR)
-    print("  PEACE_COM: LUNAR DUNGEON CRAWLER")
-    print("  [ 1987 - Luna Station Omega - Sector 7 ]")
-    print(SEPARATOR)
-    print("\nInitializing neural link...")
-    print("Type 'quit' to exit the simulation.\n")
+    print(TITLE_TEXT)
 
 
 def print_separator():
@@ -28,8 +36,7 @@ def print_response(text: str):
 
 def print_goodbye():
     """Print the exit message."""
-    print("\nDisconnecting from neural link...")
-    print("Thanks for playing PEACE_COM.")
+    print(GOODBYE_TEXT)
 
 
 def get_input() -> str:
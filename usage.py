@@ -0,0 +1,163 @@
+"""
+Token and cost accounting for PEACE_COM.
+
+Every LLM call's usage is charged to the active session's ledger, broken
+down by call site, so it is easy to see which stages dominate. Sessions can
+be given token and cost ceilings. They are checked before each turn, so a
+session overshoots by at most the turn that crossed the line.
+"""
+
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+
+from config import SESSION_TOKEN_BUDGET, SESSION_COST_BUDGET_USD
+
+
+class BudgetExceededError(RuntimeError):
+    """Raised when a session has spent its token or cost budget."""
+
+
+@dataclass(slots=True)
+class Usage:
+    """Tokens and cost summed over some number of calls."""
+
+    calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0  # prompt tokens served from the provider's cache
+    cost: float = 0.0  # USD
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    def add(self, other: "Usage") -> None:
+        self.calls += other.calls
+        self.prompt_tokens += other.prompt_tokens
+        self.completion_tokens += other.completion_tokens
+        self.cached_tokens += other.cached_tokens
+        self.cost += other.cost
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def _count(value) -> int:
+    # Providers omit fields they don't report; mocks and None count as zero
+    return value if isinstance(value, int) else 0
+
+
+def usage_from_response(response, cost: float = 0.0) -> Usage:
+    """Read the token counts a provider reported for one completion."""
+    usage = getattr(response, "usage", None)
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = max(
+        _count(getattr(details, "cached_tokens", None)),
+        # Anthropic reports cache reads as a separate field
+        _count(getattr(usage, "cache_read_input_tokens", None)),
+    )
+    return Usage(
+        calls=1,
+        prompt_tokens=_count(getattr(usage, "prompt_tokens", None)),
+        completion_tokens=_count(getattr(usage, "completion_tokens", None)),
+        cached_tokens=cached,
+        cost=cost,
+    )
+
+
+class UsageLedger:
+    """Usage for one session: per call site, per turn, and in total."""
+
+    def __init__(
+        self,
+        token_budget: int | None = SESSION_TOKEN_BUDGET,
+        cost_budget: float | None = SESSION_COST_BUDGET_USD,
+    ):
+        self.token_budget = token_budget
+        self.cost_budget = cost_budget
+        self.lock = threading.Lock()
+        self.by_call_site: dict[str, Usage] = {}
+        self.session = Usage()
+        self.turn = Usage()  # the turn in progress
+        self.turns: list[Usage] = []  # finished turns, in order
+
+    def record(self, call_site: str, usage: Usage) -> None:
+        with self.lock:
+            self.by_call_site.setdefault(call_site, Usage()).add(usage)
+            self.session.add(usage)
+            self.turn.add(usage)
+
+    def end_turn(self) -> Usage:
+        """Close the current turn and return its usage."""
+        with self.lock:
+            finished, self.turn = self.turn, Usage()
+            self.turns.append(finished)
+            return finished
+
+    def check(self) -> None:
+        """Raise BudgetExceededError if a session ceiling has been reached."""
+        with self.lock:
+            tokens, cost = self.session.total_tokens, self.session.cost
+        if self.token_budget is not None and tokens >= self.token_budget:
+            raise BudgetExceededError(
+                f"session used {tokens} of its {self.token_budget} token budget"
+            )
+        if self.cost_budget is not None and cost >= self.cost_budget:
+            raise BudgetExceededError(
+                f"session spent ${cost:.4f} of its ${self.cost_budget:.2f} budget"
+            )
+
+    def report(self) -> str:
+        """A table of usage by call site, largest first, with session totals."""
+        with self.lock:
+            rows = sorted(
+                self.by_call_site.items(),
+                key=lambda item: item[1].total_tokens,
+                reverse=True,
+            )
+            session = Usage(**self.session.to_dict())
+            last_turn = self.turns[-1] if self.turns else None
+
+        lines = [
+            f"{'call site':<22}{'calls':>6}{'prompt':>9}{'cached':>9}"
+            f"{'output':>9}{'share':>7}{'cost':>10}"
+        ]
+        for call_site, usage in [*rows, ("total", session)]:
+            share = usage.total_tokens / max(session.total_tokens, 1)
+            lines.append(
+                f"{call_site:<22}{usage.calls:>6}{usage.prompt_tokens:>9}"
+                f"{usage.cached_tokens:>9}{usage.completion_tokens:>9}"
+                f"{share:>7.0%}{usage.cost:>10.4f}"
+            )
+        if last_turn is not None:
+            lines.append(
+                f"Last turn: {last_turn.total_tokens} tokens in {last_turn.calls}"
+                f" calls, ${last_turn.cost:.4f}"
+            )
+        for name, used, ceiling in (
+            ("Token budget", session.total_tokens, self.token_budget),
+            ("Cost budget", session.cost, self.cost_budget),
+        ):
+            if ceiling is not None:
+                lines.append(f"{name}: {used:g} of {ceiling:g} used")
+        return "\n".join(lines)
+
+
+_current_ledger: ContextVar[UsageLedger | None] = ContextVar("ledger", default=None)
+
+
+@contextmanager
+def accounting(ledger: UsageLedger | None):
+    """Charge LLM calls made within this context (and its tasks) to ledger."""
+    token = _current_ledger.set(ledger)
+    try:
+        yield ledger
+    finally:
+        _current_ledger.reset(token)
+
+
+def current_ledger() -> UsageLedger | None:
+    """The ledger LLM calls are currently charged to, if any."""
+    return _current_ledger.get()
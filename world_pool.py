@@ -0,0 +1,235 @@
+"""
+Pre-generated world pool for PEACE_COM.
+
+Ready-to-play worlds (world plus opening messages) are stored as save files
+in a local directory. The game claims one at startup instead of generating a
+world, and pool.py refills the store in the background. A lock file in the
+directory keeps that to one refiller at a time.
+"""
+
+import os
+import subprocess
+import sys
+import time
+import uuid
+
+from config import WORLD_POOL_DIR, WORLD_POOL_MAX_AGE_HOURS, WORLD_POOL_TARGET
+from models import GameWorld
+from persistence import save_session, load_session
+from relevance import tokenize
+
+
+REFILL_LOCK = "refill.lock"
+
+# The refill this process last started, so a burst of claims starts only one
+_refiller: subprocess.Popen | None = None
+
+
+def pid_alive(pid: int) -> bool:
+    """Whether a process with this pid is still running."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def situation_similarity(first: str, second: str) -> float:
+    """Jaccard similarity between the vocabularies of two situations."""
+    a, b = set(tokenize(first)), set(tokenize(second))
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class WorldPool:
+    """A directory of pre-generated worlds, claimed oldest first."""
+
+    def __init__(
+        self,
+        directory: str = WORLD_POOL_DIR,
+        max_age_hours: float = WORLD_POOL_MAX_AGE_HOURS,
+    ):
+        self.directory = directory
+        self.max_age = max_age_hours * 3600
+        self.lock_path = os.path.join(directory, REFILL_LOCK)
+
+    def _mtimes(self) -> dict[str, float]:
+        """Modification times of the pooled world files, keyed by path."""
+        if not os.path.isdir(self.directory):
+            return {}
+        mtimes = {}
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                mtimes[path] = os.path.getmtime(path)
+            except FileNotFoundError:
+                # Claimed or pruned by another process since the listing
+                continue
+        return mtimes
+
+    def paths(self) -> list[str]:
+        """Return the pooled world files, oldest first."""
+        mtimes = self._mtimes()
+        return sorted(mtimes, key=mtimes.get)
+
+    def age(self, path: str) -> float:
+        """Seconds since a pooled world was generated.
+
+        Raises FileNotFoundError if the world has already been claimed.
+        """
+        return time.time() - os.path.getmtime(path)
+
+    def prune(self) -> int:
+        """Delete worlds older than the maximum age. Returns how many were removed."""
+        now = time.time()
+        removed = 0
+        for path, mtime in self._mtimes().items():
+            if now - mtime <= self.max_age:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            removed += 1
+        return removed
+
+    def __len__(self) -> int:
+        return len(self.paths())
+
+    def add(self, world: GameWorld, messages: list[dict]) -> str:
+        """Store a ready world and return its path."""
+        os.makedirs(self.directory, exist_ok=True)
+        name = f"world-{int(time.time())}-{uuid.uuid4().hex[:8]}.json"
+        path = os.path.join(self.directory, name)
+        save_session(path, world, messages)
+        return path
+
+    def claim(self) -> tuple[GameWorld, list[dict]] | None:
+        """Take the oldest fresh world out of the pool, or None if it is empty."""
+        self.prune()
+        for path in self.paths():
+            claimed_path = f"{path}.claimed"
+            try:
+                # Renaming is atomic, so two processes never claim the same world
+                os.rename(path, claimed_path)
+            except FileNotFoundError:
+                continue
+            try:
+                world, messages, _ = load_session(claimed_path)
+            except ValueError:
+                continue
+            finally:
+                os.remove(claimed_path)
+            return world, messages
+        return None
+
+    def situations(self) -> list[str]:
+        """Return the situation of every pooled world."""
+        situations = []
+        for path in self.paths():
+            try:
+                world, _, _ = load_session(path)
+            except (FileNotFoundError, ValueError):
+                continue
+            situations.append(world.situation)
+        return situations
+
+    def max_similarity(self, situation: str) -> float:
+        """How close a situation is to the most similar world already pooled."""
+        return max(
+            (situation_similarity(situation, s) for s in self.situations()),
+            default=0.0,
+        )
+
+    def stats(self) -> dict:
+        """Report the pool's size, freshness, and diversity."""
+        now = time.time()
+        ages = [now - mtime for mtime in self._mtimes().values()]
+        situations = self.situations()
+        pairs = [
+            situation_similarity(a, b)
+            for i, a in enumerate(situations)
+            for b in situations[i + 1 :]
+        ]
+        return {
+            "size": len(ages),
+            "oldest_age_hours": max(ages, default=0.0) / 3600,
+            "newest_age_hours": min(ages, default=0.0) / 3600,
+            # 1.0 means no shared vocabulary between any two situations
+            "diversity": 1.0 - (sum(pairs) / len(pairs) if pairs else 0.0),
+        }
+
+
+    def refilling(self) -> bool:
+        """Whether a running process holds the refill lock."""
+        try:
+            with open(self.lock_path) as f:
+                pid = int(f.read())
+        except (FileNotFoundError, ValueError):
+            return False
+        return pid_alive(pid)
+
+    def acquire_refill_lock(self) -> bool:
+        """Become the pool's only refiller. Returns False if another one is running.
+
+        A lock left behind by a refiller that died is taken over.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        # Linking a finished file into place is atomic, so the lock always
+        # holds a whole pid and only one process can create it
+        temp_path = f"{self.lock_path}.{os.getpid()}"
+        with open(temp_path, "w") as f:
+            f.write(str(os.getpid()))
+        try:
+            for _ in range(2):
+                try:
+                    os.link(temp_path, self.lock_path)
+                    return True
+                except FileExistsError:
+                    if self.refilling():
+                        return False
+                    try:
+                        os.remove(self.lock_path)
+                    except FileNotFoundError:
+                        pass
+            return False
+        finally:
+            os.remove(temp_path)
+
+    def release_refill_lock(self) -> None:
+        """Give up the refill lock if this process holds it."""
+        try:
+            with open(self.lock_path) as f:
+                held = int(f.read()) == os.getpid()
+        except (FileNotFoundError, ValueError):
+            return
+        if held:
+            os.remove(self.lock_path)
+
+
+def trigger_refill(
+    target: int = WORLD_POOL_TARGET, directory: str = WORLD_POOL_DIR
+) -> bool:
+    """Start pool.py in the background to top the pool back up.
+
+    Does nothing while a refill is already running, whether this process
+    started it or another did. Returns whether a refill was started.
+    """
+    global _refiller
+    if _refiller is not None and _refiller.poll() is None:
+        return False
+    if WorldPool(directory).refilling():
+        return False
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pool.py")
+    _refiller = subprocess.Popen(
+        [sys.executable, script, "--target", str(target), "--directory", directory],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+    return True